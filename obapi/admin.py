@@ -3,13 +3,14 @@ from django.contrib.admin.helpers import Fieldset
 from django.contrib.admin.templatetags.admin_urls import add_preserved_filters
 from django.core.exceptions import PermissionDenied, SuspiciousOperation
 from django.db import IntegrityError
-from django.forms import BaseInlineFormSet
+from django.forms import BaseInlineFormSet, ModelForm
 from django.http import Http404, HttpResponseRedirect
 from django.template.response import TemplateResponse
 from django.urls import path, reverse
+from django.utils.html import format_html
 from ordered_model.admin import OrderedInlineModelAdminMixin, OrderedTabularInline
 
-from obapi import utils
+from obapi import autocomplete, jobs, utils
 from obapi.exceptions import APICallError
 from obapi.forms import (
     AddEssayContentItemForm,
@@ -23,6 +24,9 @@ from obapi.models import (
     ContentItem,
     Idea,
     IdeaAlias,
+    IngestBatch,
+    IngestJob,
+    Job,
     OBContentItem,
     Sequence,
     SequenceMember,
@@ -60,9 +64,30 @@ class AliasInlineFormset(BaseInlineFormSet):
             if alias == name_slug:
                 form.cleaned_data["DELETE"] = True
 
+        # Check all aliases against those of other owners at once
+        kept_forms = [
+            form for form in valid_forms if not form.cleaned_data.get("DELETE")
+        ]
+        # Texts of aliases which are not shown (e.g. the protected alias) clash too
+        conflicts = self.model.objects.find_conflicts(
+            [(form.cleaned_data["text"], self.instance.pk) for form in kept_forms],
+            edited_pks={form.instance.pk for form in self.initial_forms},
+        )
+        for form in kept_forms:
+            reason = conflicts.get((form.cleaned_data["text"], self.instance.pk))
+            if reason is not None:
+                form.add_error("text", reason)
+
+
+class AliasForm(ModelForm):
+    def validate_unique(self):
+        # Aliases are checked together, by `AliasInlineFormset`
+        pass
+
 
 class AliasInline(admin.TabularInline):
     extra = 0
+    form = AliasForm
     formset = AliasInlineFormset
 
     def get_queryset(self, request):
@@ -117,29 +142,20 @@ def merge_aliased_objects(modeladmin, request, queryset):
 
 
 def convert_aliased_objects(modeladmin, request, queryset, model):
-    # Track errors and successes
-    err_count = success_count = 0
-
-    # Attempt to convert each object in the queryset
-    for obj in queryset:
-        try:
-            obj.convert_object(model)
-            success_count = success_count + 1
-        except IntegrityError:
-            err_count = err_count + 1
-            pass
+    new_objects, conflicts = queryset.convert_objects(model)
 
     # Message user about errors and successes
-    if success_count > 0:
+    if new_objects:
         modeladmin.message_user(
             request,
-            f"{success_count} {model._meta.verbose_name_plural} successfully created",
+            f"{len(new_objects)} {model._meta.verbose_name_plural} "
+            "successfully created",
             messages.SUCCESS,
         )
-    if err_count > 0:
+    for obj, reason in conflicts.items():
         modeladmin.message_user(
             request,
-            f"{err_count} {model._meta.verbose_name_plural} could not be created",
+            f"{obj} could not be converted: {reason}",
             messages.WARNING,
         )
 
@@ -164,12 +180,49 @@ def convert_to_tags(modeladmin, request, queryset):
     convert_aliased_objects(modeladmin, request, queryset, Tag)
 
 
+def message_job(modeladmin, request, job):
+    """Tell the user that a job has been queued, with a link to its status."""
+    job_url = reverse(
+        "admin:obapi_job_change", args=[job.pk], current_app=modeladmin.admin_site.name
+    )
+    modeladmin.message_user(
+        request,
+        format_html('Queued job <a href="{}">{}</a>.', job_url, job),
+        messages.INFO,
+    )
+
+
 # Model Admins
 # https://docs.djangoproject.com/en/4.0/ref/contrib/admin/#modeladmin-objects
 
 
+class AliasedModelAdmin(admin.ModelAdmin):
+    """Admin for aliased models, which searches names and aliases by prefix."""
+
+    list_display = ("name", "item_count", "last_used")
+    search_fields = ("name",)
+    # Maximum number of search results
+    search_limit = 500
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        matches = autocomplete.get_index().search(
+            search_term,
+            limit=self.search_limit,
+            entities={self.model._meta.model_name},
+        )
+        if matches:
+            return queryset.filter(pk__in=[pk for _, pk, _ in matches]), False
+        # The index may not include objects created since it was built
+        slug = utils.to_slug(search_term, max_length=CLASSIFIER_SLUG_MAX_LENGTH)
+        if not slug:
+            return queryset.none(), False
+        return queryset.filter(alias__text__startswith=slug), True
+
+
 @admin.register(Author)
-class AuthorAdmin(admin.ModelAdmin):
+class AuthorAdmin(AliasedModelAdmin):
     inlines = [AuthorAliasInline]
     actions = [
         merge_aliased_objects,
@@ -177,11 +230,10 @@ class AuthorAdmin(admin.ModelAdmin):
         convert_to_topics,
         convert_to_tags,
     ]
-    search_fields = ("name",)
 
 
 @admin.register(Idea)
-class IdeaAdmin(admin.ModelAdmin):
+class IdeaAdmin(AliasedModelAdmin):
     inlines = [IdeaAliasInline]
     actions = [
         merge_aliased_objects,
@@ -189,11 +241,10 @@ class IdeaAdmin(admin.ModelAdmin):
         convert_to_topics,
         convert_to_tags,
     ]
-    search_fields = ("name",)
 
 
 @admin.register(Topic)
-class TopicAdmin(admin.ModelAdmin):
+class TopicAdmin(AliasedModelAdmin):
     inlines = [TopicAliasInline]
     actions = [
         merge_aliased_objects,
@@ -201,11 +252,10 @@ class TopicAdmin(admin.ModelAdmin):
         convert_to_ideas,
         convert_to_tags,
     ]
-    search_fields = ("name",)
 
 
 @admin.register(Tag)
-class TagAdmin(admin.ModelAdmin):
+class TagAdmin(AliasedModelAdmin):
     inlines = [TagAliasInline]
     actions = [
         merge_aliased_objects,
@@ -213,7 +263,6 @@ class TagAdmin(admin.ModelAdmin):
         convert_to_ideas,
         convert_to_topics,
     ]
-    search_fields = ("name",)
 
 
 @admin.register(ExternalLink)
@@ -308,20 +357,26 @@ class ContentItemAdminTemplate(admin.ModelAdmin):
 
     @admin.action(description="Update selected items", permissions=["change"])
     def update_selected_items(self, request, queryset):
-        queryset.update_items()
+        job = jobs.enqueue(
+            "obapi.update_items",
+            model=self.model._meta.label_lower,
+            pks=list(queryset.values_list("pk", flat=True)),
+        )
+        message_job(self, request, job)
 
     @admin.action(description="Internalize links", permissions=["change"])
     def internalize_links(self, request, queryset):
         try:
-            for item in queryset:
-                item.internalize_links(clear=False)
+            link_count = queryset.internalize_links(clear=False)
         except IntegrityError:
             self.message_user(
                 request, "Error when internalizing links.", messages.ERROR
             )
         else:
             self.message_user(
-                request, "Links internalized successfully.", messages.SUCCESS
+                request,
+                f"{link_count} links internalized successfully.",
+                messages.SUCCESS,
             )
 
 
@@ -334,9 +389,16 @@ class ContentItemAdmin(ContentItemAdminTemplate):
     @admin.action(description="Update selected items", permissions=["change"])
     def update_selected_items(self, request, queryset):
         for model in (YoutubeContentItem, SpotifyContentItem, OBContentItem):
-            model.objects.filter(
-                pk__in=queryset.select_subclasses(model)
-            ).update_items()
+            pks = list(
+                queryset.filter(item_type=model._meta.label_lower).values_list(
+                    "pk", flat=True
+                )
+            )
+            if pks:
+                job = jobs.enqueue(
+                    "obapi.update_items", model=model._meta.label_lower, pks=pks
+                )
+                message_job(self, request, job)
 
 
 @admin.register(YoutubeContentItem)
@@ -375,8 +437,8 @@ class OBContentItemAdmin(ContentItemAdminTemplate):
 
         Either downloads all new posts ("pull") or updates all edited posts ("sync").
 
-        Works by (1) performing the requested operation, (2) logging the results and
-        messaging the user, and (3) redirecting to list / index page.
+        Works by (1) queueing the requested operation as a background job,
+        (2) messaging the user, and (3) redirecting to list / index page.
         """
         # Accept POST requests only
         if request.method != "POST":
@@ -413,40 +475,16 @@ class OBContentItemAdmin(ContentItemAdminTemplate):
         return HttpResponseRedirect(post_url)
 
     def pull(self, request):
-        """Download new posts."""
-        # Pull items
-        created_items = OBContentItem.objects.download_new_items()
-        # Log additions
-        for item in created_items:
-            self.log_addition(request, item, f"Created item {item}.")
-        # Message user
-        changecount = len(created_items)
-        if changecount == 0:
-            msg = "No items were created."
-            status = messages.INFO
-        else:
-            msg = f"Successfully created {changecount} item(s)."
-            status = messages.SUCCESS
-        self.message_user(request, msg, status)
-        return changecount
+        """Queue a job to download new posts."""
+        job = jobs.enqueue("obapi.pull")
+        message_job(self, request, job)
+        return job
 
     def sync(self, request):
-        """Updated existing posts."""
-        # Sync items
-        updated_items = OBContentItem.objects.update_edited_items()
-        # Log changes
-        for item in updated_items:
-            self.log_change(request, item, f"Updated item {item}.")
-        # Message user
-        changecount = len(updated_items)
-        if changecount == 0:
-            msg = "No items were updated."
-            status = messages.INFO
-        else:
-            msg = f"Successfully updated {changecount} item(s)."
-            status = messages.SUCCESS
-        self.message_user(request, msg, status)
-        return changecount
+        """Queue a job to update existing posts."""
+        job = jobs.enqueue("obapi.sync")
+        message_job(self, request, job)
+        return job
 
 
 @admin.register(EssayContentItem)
@@ -469,3 +507,80 @@ class SequenceAdmin(OrderedInlineModelAdminMixin, admin.ModelAdmin):
     list_display = ("title",)
     inlines = (SequenceMemberInline,)
     readonly_fields = ("create_timestamp", "update_timestamp")
+
+
+class IngestBatchInline(admin.TabularInline):
+    model = IngestBatch
+    fields = (
+        "index",
+        "status",
+        "attempts",
+        "created_count",
+        "leased_by",
+        "lease_expires",
+        "error",
+    )
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(IngestJob)
+class IngestJobAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "status", "item_count", "create_timestamp")
+    list_filter = ("status", "model_label")
+    readonly_fields = ("model_label", "status", "item_count", "created_count")
+    inlines = (IngestBatchInline,)
+    actions = ("resume_jobs",)
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Resume selected jobs", permissions=["change"])
+    def resume_jobs(self, request, queryset):
+        job = jobs.enqueue(
+            "obapi.resume_ingest_jobs",
+            pks=list(queryset.unfinished().values_list("pk", flat=True)),
+        )
+        message_job(self, request, job)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        "__str__",
+        "status",
+        "progress_display",
+        "create_timestamp",
+        "finish_timestamp",
+    )
+    list_filter = ("status", "task")
+    readonly_fields = (
+        "task",
+        "arguments",
+        "status",
+        "progress_display",
+        "result",
+        "error",
+        "worker",
+        "lease_expires",
+        "create_timestamp",
+        "start_timestamp",
+        "finish_timestamp",
+    )
+    exclude = ("progress_done", "progress_total")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="progress")
+    def progress_display(self, obj):
+        if obj.progress is None:
+            return "-"
+        return f"{obj.progress_done}/{obj.progress_total} ({obj.progress:.0%})"
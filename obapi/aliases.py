@@ -0,0 +1,168 @@
+"""A cache of alias slugs, used to resolve names to classifiers without queries.
+
+For each aliased model (e.g. `Author`), the cache maps the text of every alias to the
+primary key of its owner. Each map is loaded from its alias table with one query,
+the first time it is used.
+
+New aliases are added to the maps when the transaction which saves them commits. When
+aliases are changed or deleted, the maps of their model are cleared, and reloaded
+when next used. Signal handlers in `obapi.signals` keep the cache up to date. A map
+loaded inside a transaction is only used by that transaction until it commits, so
+the cache never holds rows which are rolled back.
+
+Clearing a map also increases a version number, which other processes (e.g. the
+`obapi_worker` process) check in `refresh`, and clear their maps when it changes. The
+version is kept in a `Counter` row, or in the shared Django cache named by
+`OBAPI_ALIAS_CACHE` (e.g. "default") if it is set. A name which is missing from the
+cache is always looked up in the database, so aliases added by other processes are
+still found.
+"""
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.dispatch import Signal
+
+ALIAS_CACHE = getattr(settings, "OBAPI_ALIAS_CACHE", None)
+VERSION_KEY = "obapi.aliases.version"
+# Name of the counter which holds the version, when there is no shared cache
+VERSION_COUNTER = "obapi.aliases.version"
+
+# Sent when aliases of a model (the sender, or None for all models) are added,
+# changed or deleted in this process
+aliases_changed = Signal()
+
+
+class AliasCache:
+    """Maps from alias text to owner primary key, for each aliased model."""
+
+    def __init__(self, cache_alias=ALIAS_CACHE):
+        self.cache_alias = cache_alias
+        self.version = None
+        self._maps = {}
+        self._lock = threading.Lock()
+        # Increased whenever maps are cleared
+        self._generation = 0
+        # Maps loaded inside a transaction, by thread: {model: (atomic block, map)}
+        self._local = threading.local()
+
+    @property
+    def shared_cache(self):
+        if self.cache_alias is None:
+            return None
+        return caches[self.cache_alias]
+
+    def preload(self, models):
+        """Load the maps of some models, e.g. before starting a transaction."""
+        for model in models:
+            self._get_map(model)
+
+    def get(self, model, text):
+        """The primary key of the owner of an alias (or None if not found)."""
+        return self._get_map(model).get(text)
+
+    def add(self, model, text, pk, using="default"):
+        """Add an alias to the map of its model (if the map is loaded).
+
+        The alias is added once the current transaction commits, so aliases which
+        are rolled back are never cached.
+        """
+        self.add_many(model, [(text, pk)], using=using)
+
+    def add_many(self, model, aliases, using="default"):
+        """Like `add`, for many (text, owner primary key) pairs of one model."""
+        aliases = list(aliases)
+        transaction.on_commit(lambda: self._add(model, aliases), using=using)
+
+    def invalidate(self, model=None):
+        """Clear the map of a model (or all maps), in all processes."""
+        self.clear(model)
+        aliases_changed.send(sender=model)
+        if self.shared_cache is None:
+            # Committed (or rolled back) with the change which invalidates the maps
+            counters = apps.get_model("obapi", "Counter").objects
+            self.version = counters.increment(VERSION_COUNTER)
+            return
+        try:
+            self.version = self.shared_cache.incr(VERSION_KEY)
+        except ValueError:
+            # Key does not exist
+            self.shared_cache.add(VERSION_KEY, 1, timeout=None)
+            self.version = self.shared_cache.get(VERSION_KEY)
+
+    def clear(self, model=None):
+        """Clear the map of a model (or all maps), in this process only."""
+        with self._lock:
+            if model is None:
+                self._maps.clear()
+            else:
+                self._maps.pop(model, None)
+            self._generation += 1
+        if model is None:
+            self._local.maps = {}
+        else:
+            self._transaction_maps().pop(model, None)
+
+    def refresh(self):
+        """Clear all maps if they have been invalidated by another process."""
+        if self.shared_cache is None:
+            counters = apps.get_model("obapi", "Counter").objects
+            version = counters.get_value(VERSION_COUNTER)
+        else:
+            version = self.shared_cache.get(VERSION_KEY)
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+    def _add(self, model, aliases):
+        with self._lock:
+            if model in self._maps:
+                self._maps[model].update(aliases)
+        _, alias_map = self._transaction_maps().get(model, (None, None))
+        if alias_map is not None:
+            alias_map.update(aliases)
+        aliases_changed.send(sender=model)
+
+    def _get_map(self, model):
+        with self._lock:
+            alias_map = self._maps.get(model)
+        if alias_map is not None:
+            return alias_map
+        transaction_maps = self._transaction_maps()
+        if model in transaction_maps:
+            return transaction_maps[model][1]
+        generation = self._generation
+        alias_model = model.aliases.field.model
+        alias_map = dict(alias_model.objects.values_list("text", "owner_id"))
+        connection = transaction.get_connection()
+        if connection.in_atomic_block:
+            # The map may hold uncommitted rows: share it once they are committed
+            transaction_maps[model] = (connection.atomic_blocks[-1], alias_map)
+            transaction.on_commit(lambda: self._publish(model, alias_map, generation))
+        else:
+            with self._lock:
+                self._maps[model] = alias_map
+        return alias_map
+
+    def _transaction_maps(self):
+        """Maps loaded by this thread in transactions which are still open."""
+        maps = getattr(self._local, "maps", None)
+        if maps is None:
+            maps = self._local.maps = {}
+        atomic_blocks = transaction.get_connection().atomic_blocks
+        for model, (block, _) in list(maps.items()):
+            if not any(open_block is block for open_block in atomic_blocks):
+                # Its transaction (or savepoint) has committed or rolled back
+                del maps[model]
+        return maps
+
+    def _publish(self, model, alias_map, generation):
+        with self._lock:
+            # Skip maps loaded before the cache was last cleared
+            if generation == self._generation:
+                self._maps.setdefault(model, alias_map)
+
+
+alias_cache = AliasCache()
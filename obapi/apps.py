@@ -5,3 +5,10 @@ class OBAPIConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "obapi"
     verbose_name = "Overcoming Bias API"
+
+    def ready(self):
+        from obapi import signals  # noqa: F401
+        from obapi.models import ContentItem
+
+        # Build the URL router for content URLs
+        ContentItem.objects.get_url_router()
@@ -0,0 +1,162 @@
+"""Prefix search over the names and aliases of classifiers, and content titles.
+
+The index is a sorted list of slugs, searched with `bisect`, so lookups take a few
+microseconds however large the vocabulary is. Each alias and title is indexed from
+the start of each of its words, so "bias" finds "overcoming-bias".
+
+The index is built in memory with one query per table, and rebuilt when it is older
+than `OBAPI_AUTOCOMPLETE_SECONDS`, or when aliases or classifiers change. Like the
+alias cache, changes in other processes are seen through a version number in the
+shared cache named by `OBAPI_ALIAS_CACHE`, if it is set.
+"""
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from obapi import utils
+from obapi.aliases import ALIAS_CACHE
+from obapi.models import (
+    CLASSIFIER_SLUG_MAX_LENGTH,
+    Author,
+    ContentItem,
+    Idea,
+    Tag,
+    Topic,
+)
+
+AUTOCOMPLETE_LIFETIME = getattr(settings, "OBAPI_AUTOCOMPLETE_SECONDS", 300)
+VERSION_KEY = "obapi.autocomplete.version"
+
+CLASSIFIER_MODELS = (Author, Idea, Topic, Tag)
+
+# Titles are cut to this length before they are indexed
+TITLE_KEY_MAX_LENGTH = 100
+
+
+class AutocompleteIndex:
+    """A sorted index of slugs, each pointing to a classifier or content item."""
+
+    def __init__(self, rows=()):
+        """Create an index from (slug, entity, pk, name) rows."""
+        rows = sorted(
+            (key, entity, pk, name)
+            for slug, entity, pk, name in rows
+            for key in word_suffixes(slug)
+        )
+        self.keys = [key for key, _, _, _ in rows]
+        self.entries = [(entity, pk, name) for _, entity, pk, name in rows]
+
+    @classmethod
+    def build(cls, using="default"):
+        """Build an index from the alias tables and content item titles."""
+        rows = []
+        for model in CLASSIFIER_MODELS:
+            entity = model._meta.model_name
+            alias_model = model.aliases.field.model
+            rows.extend(
+                (text, entity, owner_pk, name)
+                for text, owner_pk, name in alias_model.objects.using(using)
+                .values_list("text", "owner_id", "owner__name")
+                .iterator()
+            )
+        rows.extend(
+            (
+                utils.to_slug(title, max_length=TITLE_KEY_MAX_LENGTH),
+                item_type.rpartition(".")[2],
+                pk,
+                title,
+            )
+            for pk, title, item_type in ContentItem.objects.using(using)
+            .values_list("pk", "title", "item_type")
+            .iterator()
+        )
+        return cls(rows)
+
+    def search(self, query, limit=10, entities=None):
+        """Find classifiers and content items matching the start of a query.
+
+        Parameters
+        ----------
+        query : str
+            The text typed so far.
+        limit : int | None
+            The maximum number of results. If None, all matches are returned.
+        entities : Collection[str] | None
+            If given, only return results of these types (e.g. "tag" or
+            "obcontentitem").
+
+        Returns
+        -------
+        List[Tuple[str, int, str]]
+            The (entity, primary key, name) of each match. Each object is returned
+            once, in the order of its first matching slug.
+        """
+        prefix = utils.to_slug(query, max_length=CLASSIFIER_SLUG_MAX_LENGTH)
+        if not prefix:
+            return []
+        results = []
+        seen = set()
+        start = bisect.bisect_left(self.keys, prefix)
+        end = bisect.bisect_left(self.keys, prefix + "\uffff", lo=start)
+        for entity, pk, name in self.entries[start:end]:
+            if entities is not None and entity not in entities:
+                continue
+            if (entity, pk) in seen:
+                continue
+            seen.add((entity, pk))
+            results.append((entity, pk, name))
+            if len(results) == limit:
+                break
+        return results
+
+
+def word_suffixes(slug):
+    """The parts of a slug which start at the start of a word."""
+    words = slug.split("-")
+    return ["-".join(words[i:]) for i in range(len(words)) if words[i]]
+
+
+_index = None
+_built = 0
+_version = None
+_lock = threading.Lock()
+
+
+def get_shared_cache():
+    if ALIAS_CACHE is None:
+        return None
+    return caches[ALIAS_CACHE]
+
+
+def get_index():
+    """Get the shared index, rebuilding it if it is stale."""
+    global _index, _built, _version
+    shared_cache = get_shared_cache()
+    version = None if shared_cache is None else shared_cache.get(VERSION_KEY)
+    with _lock:
+        if (
+            _index is None
+            or version != _version
+            or time.monotonic() - _built > AUTOCOMPLETE_LIFETIME
+        ):
+            _index = AutocompleteIndex.build()
+            _built = time.monotonic()
+            _version = version
+        return _index
+
+
+def invalidate():
+    """Rebuild the index when it is next used, in all processes."""
+    global _index
+    with _lock:
+        _index = None
+    shared_cache = get_shared_cache()
+    if shared_cache is not None:
+        try:
+            shared_cache.incr(VERSION_KEY)
+        except ValueError:
+            # Key does not exist
+            shared_cache.add(VERSION_KEY, 1, timeout=None)
@@ -72,3 +72,44 @@ class EssayURLConverter(URLConverter):
 
     def to_url(self, value):
         return f"https://mason.gmu.edu/~rhanson/{value}.html"
+
+
+class URLRouter:
+    """Match URLs against the patterns of many URL converters at once.
+
+    The converter patterns are combined into one compiled alternation, so a URL is
+    resolved with a single regex search. If several patterns match, the one which
+    matches earliest in the URL wins, with ties going to the earlier route.
+
+    Parameters
+    ----------
+    routes : Iterable[Tuple[Any, URLConverter]]
+        Pairs of (`target`, `converter`), where `target` is returned when a URL
+        matches the converter pattern.
+    """
+
+    def __init__(self, routes):
+        self.routes = {}
+        patterns = []
+        group_count = 0
+        for target, converter in routes:
+            # Wrap each pattern in a group, to find out which pattern matched
+            patterns.append(f"({converter.regex})")
+            self.routes[group_count + 1] = (target, group_count + 2)
+            group_count += re.compile(converter.regex).groups + 1
+        self.regex = re.compile("|".join(patterns)) if patterns else None
+
+    def resolve(self, url):
+        """Convert a URL to a (`target`, `item_id`) tuple.
+
+        Raises
+        ------
+        ValueError
+            If the URL does not match any route.
+        """
+        match = self.regex.search(url) if self.regex is not None else None
+        if match is None:
+            raise ValueError("No match found.")
+        # The outer group of the matching pattern is the last to be closed
+        target, id_group = self.routes[match.lastindex]
+        return target, match.group(id_group)
@@ -0,0 +1,304 @@
+"""Co-occurrence of ideas, topics and tags in content items.
+
+`CooccurrenceMatrix` holds a sparse matrix of the number of items which each pair of
+classifiers share. It is built from the through tables of `ContentItem.ideas`,
+`ContentItem.topics` and `ContentItem.tags`, saved to a file, and kept up to date by
+reading the change log. Related classifiers are then found from one row of the matrix,
+without querying the database.
+
+Requires NumPy and SciPy, which are installed with the "analysis" extra::
+
+    pip install django-overcomingbias-api[analysis]
+"""
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from obapi.models import ChangeLogEntry, ContentItem, Idea, Tag, Topic
+from obapi.models.classifiers import content_through
+
+COOCCURRENCE_PATH = getattr(
+    settings, "OBAPI_COOCCURRENCE_PATH", "obapi-cooccurrence.npz"
+)
+
+CLASSIFIER_MODELS = (Idea, Topic, Tag)
+
+MEASURES = ("pmi", "jaccard", "count")
+
+
+def import_scipy():
+    """Import NumPy and SciPy's sparse module.
+
+    Raises
+    ------
+    ImproperlyConfigured
+        If NumPy or SciPy is not installed.
+    """
+    try:
+        import numpy as np
+        from scipy import sparse
+    except ImportError as exc:
+        raise ImproperlyConfigured(
+            "Co-occurrence analysis requires NumPy and SciPy. Install them with "
+            '"pip install django-overcomingbias-api[analysis]".'
+        ) from exc
+    return np, sparse
+
+
+class CooccurrenceMatrix:
+    """Counts of content items shared by pairs of classifiers.
+
+    Attributes
+    ----------
+    keys : List[Tuple[str, int]]
+        The (model label, primary key) of the classifier of each row and column.
+    rows : Dict[int, numpy.ndarray]
+        Maps the primary key of each classified item to the columns of its
+        classifiers.
+    counts : scipy.sparse.csr_matrix
+        Number of items shared by each pair of classifiers. The diagonal holds the
+        number of items of each classifier.
+    cursor : int
+        Sequence of the last change log entry applied to the matrix.
+    """
+
+    def __init__(self, keys=(), rows=None, cursor=0):
+        self.np, self.sparse = import_scipy()
+        self.keys = list(keys)
+        self.columns = {key: column for column, key in enumerate(self.keys)}
+        self.rows = dict(rows or {})
+        self.cursor = cursor
+        self._set_counts(self._count(self.rows.values()))
+
+    @classmethod
+    def build(cls, using="default"):
+        """Build a matrix from the through tables."""
+        # Read the cursor first, so changes made while building are applied later
+        matrix = cls(cursor=ChangeLogEntry.objects.using(using).latest_cursor())
+        matrix.update(None, using=using)
+        return matrix
+
+    @classmethod
+    def load(cls, path=COOCCURRENCE_PATH):
+        """Load a matrix saved with `save`."""
+        np, _ = import_scipy()
+        with np.load(path) as data:
+            labels = [str(label) for label in data["labels"]]
+            keys = [
+                (labels[label_index], int(pk))
+                for label_index, pk in zip(data["key_labels"], data["key_pks"])
+            ]
+            indptr = data["indptr"]
+            indices = data["indices"]
+            rows = {
+                int(item_pk): indices[start:end]
+                for item_pk, start, end in zip(
+                    data["item_pks"], indptr[:-1], indptr[1:]
+                )
+            }
+            return cls(keys, rows, cursor=int(data["cursor"]))
+
+    def save(self, path=COOCCURRENCE_PATH):
+        """Save the matrix to a compressed NumPy file."""
+        np = self.np
+        labels = sorted({label for label, _ in self.keys})
+        label_indices = {label: index for index, label in enumerate(labels)}
+        item_pks = list(self.rows)
+        lengths = [len(self.rows[item_pk]) for item_pk in item_pks]
+        with open(path, "wb") as file:
+            np.savez_compressed(
+                file,
+                labels=np.array(labels, dtype=str),
+                key_labels=np.array(
+                    [label_indices[label] for label, _ in self.keys], dtype=np.int32
+                ),
+                key_pks=np.array([pk for _, pk in self.keys], dtype=np.int64),
+                item_pks=np.array(item_pks, dtype=np.int64),
+                indptr=np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+                indices=np.concatenate(
+                    [self.rows[item_pk] for item_pk in item_pks] or [[]]
+                ).astype(np.int32),
+                cursor=np.int64(self.cursor),
+            )
+
+    def update(self, item_pks, using="default"):
+        """Re-read the classifiers of some items, and update the counts.
+
+        Parameters
+        ----------
+        item_pks : Iterable[int] | None
+            Primary keys of the items. If None, all items are read.
+        """
+        if item_pks is not None:
+            item_pks = set(item_pks)
+            if not item_pks:
+                return
+        new_rows = self._read_rows(item_pks, using=using)
+        old_rows = [
+            self.rows.pop(item_pk)
+            for item_pk in (self.rows.copy() if item_pks is None else item_pks)
+            if item_pk in self.rows
+        ]
+        self.rows.update(new_rows)
+
+        column_count = len(self.keys)
+        counts = self.counts.copy()
+        counts.resize((column_count, column_count))
+        counts = counts + self._count(new_rows.values()) - self._count(old_rows)
+        counts.eliminate_zeros()
+        self._set_counts(counts)
+
+    def refresh(self, using="default", batch_size=1000):
+        """Apply changes to content items recorded in the change log since the
+        matrix was last built or refreshed.
+
+        Merges and conversions of classifiers record updates to their items, so
+        are applied too.
+
+        Returns
+        -------
+        int
+            The number of items updated.
+        """
+        content_labels = {
+            model._meta.label_lower
+            for model in apps.get_app_config("obapi").get_models()
+            if issubclass(model, ContentItem)
+        }
+        updated_count = 0
+        entries = ChangeLogEntry.objects.using(using)
+        while batch := list(
+            entries.after(self.cursor, limit=batch_size).values_list(
+                "sequence", "entity", "object_pk"
+            )
+        ):
+            item_pks = {
+                int(object_pk)
+                for _, entity, object_pk in batch
+                if entity in content_labels
+            }
+            self.update(item_pks, using=using)
+            self.cursor = batch[-1][0]
+            updated_count += len(item_pks)
+        return updated_count
+
+    def related(self, obj, k=10, measure="pmi"):
+        """The classifiers which share the most items with a classifier.
+
+        Parameters
+        ----------
+        obj : Idea | Topic | Tag
+            The classifier.
+        k : int
+            The maximum number of classifiers to return.
+        measure : str
+            How to score each classifier: "pmi" (pointwise mutual information),
+            "jaccard" (shared items over items of either) or "count" (shared items).
+
+        Returns
+        -------
+        List[Tuple[str, int, float]]
+            The (model label, primary key, score) of each classifier, best first.
+
+        Raises
+        ------
+        ValueError
+            If `measure` is not a known measure.
+        """
+        if measure not in MEASURES:
+            raise ValueError(f"Unknown measure {measure!r}.")
+        np = self.np
+        column = self.columns.get((obj._meta.label_lower, obj.pk))
+        if column is None:
+            return []
+        start, end = self.counts.indptr[column], self.counts.indptr[column + 1]
+        others = self.counts.indices[start:end]
+        shared = self.counts.data[start:end].astype(np.float64)
+        is_other = others != column
+        others, shared = others[is_other], shared[is_other]
+
+        totals = self.totals
+        if measure == "pmi":
+            scores = np.log(shared * len(self.rows) / (totals[column] * totals[others]))
+        elif measure == "jaccard":
+            scores = shared / (totals[column] + totals[others] - shared)
+        else:
+            scores = shared
+
+        if len(scores) > k:
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(*self.keys[others[i]], float(scores[i])) for i in top]
+
+    def related_objects(self, obj, k=10, measure="pmi"):
+        """Like `related`, but returns (classifier, score) pairs."""
+        related = self.related(obj, k=k, measure=measure)
+        pks_by_label = {}
+        for label, pk, _ in related:
+            pks_by_label.setdefault(label, []).append(pk)
+        objects = {
+            label: apps.get_model(label).objects.in_bulk(pks)
+            for label, pks in pks_by_label.items()
+        }
+        return [
+            (objects[label][pk], score)
+            for label, pk, score in related
+            if pk in objects[label]
+        ]
+
+    def _read_rows(self, item_pks, using="default"):
+        rows = {}
+        for model in CLASSIFIER_MODELS:
+            through, source, target = content_through(model)
+            queryset = through.objects.using(using)
+            if item_pks is not None:
+                queryset = queryset.filter(**{f"{source}__in": list(item_pks)})
+            label = model._meta.label_lower
+            for item_pk, classifier_pk in queryset.values_list(source, target):
+                rows.setdefault(item_pk, []).append(
+                    self._get_column((label, classifier_pk))
+                )
+        return {
+            item_pk: self.np.array(sorted(columns), dtype=self.np.int32)
+            for item_pk, columns in rows.items()
+        }
+
+    def _get_column(self, key):
+        column = self.columns.get(key)
+        if column is None:
+            column = self.columns[key] = len(self.keys)
+            self.keys.append(key)
+        return column
+
+    def _count(self, rows):
+        """Count the co-occurrences of classifiers in some rows."""
+        np = self.np
+        rows = list(rows)
+        column_count = len(self.keys)
+        indices = np.concatenate(rows or [[]]).astype(np.int32)
+        indptr = np.concatenate([[0], np.cumsum([len(row) for row in rows])])
+        incidence = self.sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.int32), indices, indptr),
+            shape=(len(rows), column_count),
+        )
+        return (incidence.T @ incidence).tocsr()
+
+    def _set_counts(self, counts):
+        self.counts = counts.tocsr()
+        self.counts.sort_indices()
+        self.totals = self.counts.diagonal().astype(self.np.float64)
+
+
+_loaded = {}
+
+
+def get_matrix(path=COOCCURRENCE_PATH):
+    """Load a saved matrix, reusing the loaded copy until the file changes."""
+    modified = os.stat(path).st_mtime
+    if path not in _loaded or _loaded[path][0] != modified:
+        _loaded[path] = (modified, CooccurrenceMatrix.load(path))
+    return _loaded[path][1]
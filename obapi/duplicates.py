@@ -0,0 +1,186 @@
+"""Find classifiers which are probably duplicates of each other.
+
+Tags are created automatically from the names of post tags, categories and video tags,
+so there are many near-duplicates (e.g. "signaling" and "signalling"). Each alias is
+turned into a vector of its character n-grams, and the cosine similarity of every pair
+of aliases is found with sparse matrix products. Pairs of classifiers with similar
+aliases are candidates for `AliasedModelQuerySet.merge_objects`.
+
+If a `CooccurrenceMatrix` is given, candidates are also scored by how similar the
+classifiers they appear with are, since duplicates are used in the same contexts.
+
+Requires NumPy and SciPy (see `obapi.cooccurrence`).
+"""
+from dataclasses import dataclass
+
+from obapi.cooccurrence import import_scipy
+from obapi.models import Author, Idea, Tag, Topic
+
+CLASSIFIER_MODELS = (Author, Idea, Topic, Tag)
+
+
+@dataclass
+class MergeCandidate:
+    """A pair of classifiers which may be duplicates."""
+
+    model: type
+    first_pk: int
+    second_pk: int
+    first_name: str
+    second_name: str
+    similarity: float
+    context_similarity: float
+    score: float
+
+    def merge(self):
+        """Merge the pair of classifiers."""
+        return self.model.objects.filter(
+            pk__in=[self.first_pk, self.second_pk]
+        ).merge_objects()
+
+
+def find_duplicates(
+    model,
+    threshold=0.8,
+    ngram_size=3,
+    cooccurrence=None,
+    context_weight=0.25,
+    chunk_size=2000,
+):
+    """Find pairs of classifiers of one type which have similar aliases.
+
+    Parameters
+    ----------
+    model : Type[AliasedModel]
+        The type of classifier.
+    threshold : float
+        The minimum cosine similarity of the n-grams of two aliases.
+    ngram_size : int
+        The number of characters in each n-gram.
+    cooccurrence : CooccurrenceMatrix | None
+        If given, the similarity of the classifiers' co-occurrences counts towards
+        the score of each candidate.
+    context_weight : float
+        The weight of co-occurrence similarity in the score, between 0 and 1.
+    chunk_size : int
+        The number of aliases compared with all other aliases at once. Larger chunks
+        are faster, but use more memory.
+
+    Returns
+    -------
+    List[MergeCandidate]
+        Candidates with the best score first.
+    """
+    np, sparse = import_scipy()
+    alias_model = model.aliases.field.model
+    alias_rows = list(alias_model.objects.values_list("text", "owner_id"))
+    if not alias_rows:
+        return []
+    owners = np.array([owner_pk for _, owner_pk in alias_rows], dtype=np.int64)
+    vectors = ngram_vectors([text for text, _ in alias_rows], ngram_size)
+
+    # Best alias similarity of each pair of owners
+    best = {}
+    for start in range(0, len(alias_rows), chunk_size):
+        similarities = (vectors[start : start + chunk_size] @ vectors.T).tocoo()
+        rows = similarities.row + start
+        keep = (similarities.data >= threshold) & (
+            owners[rows] < owners[similarities.col]
+        )
+        for first_pk, second_pk, similarity in zip(
+            owners[rows[keep]].tolist(),
+            owners[similarities.col[keep]].tolist(),
+            similarities.data[keep].tolist(),
+        ):
+            if similarity > best.get((first_pk, second_pk), 0):
+                best[(first_pk, second_pk)] = similarity
+    if not best:
+        return []
+
+    pairs = list(best)
+    similarities = np.array([best[pair] for pair in pairs])
+    if cooccurrence is None:
+        context = np.zeros(len(pairs))
+        scores = similarities
+    else:
+        context = context_similarities(cooccurrence, model, pairs)
+        scores = (1 - context_weight) * similarities + context_weight * context
+
+    names = dict(
+        model.objects.filter(pk__in={pk for pair in pairs for pk in pair}).values_list(
+            "pk", "name"
+        )
+    )
+    candidates = [
+        MergeCandidate(
+            model=model,
+            first_pk=first_pk,
+            second_pk=second_pk,
+            first_name=names[first_pk],
+            second_name=names[second_pk],
+            similarity=float(similarity),
+            context_similarity=float(context_similarity),
+            score=float(score),
+        )
+        for (first_pk, second_pk), similarity, context_similarity, score in zip(
+            pairs, similarities, context, scores
+        )
+    ]
+    candidates.sort(key=lambda candidate: candidate.score, reverse=True)
+    return candidates
+
+
+def ngram_vectors(texts, ngram_size=3):
+    """L2-normalized binary vectors of the character n-grams of some texts.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        One row per text.
+    """
+    np, sparse = import_scipy()
+    vocabulary = {}
+    indices = []
+    indptr = [0]
+    for text in texts:
+        padded = f"#{text}#"
+        ngrams = {
+            padded[i : i + ngram_size]
+            for i in range(max(len(padded) - ngram_size + 1, 1))
+        }
+        indices.extend(
+            vocabulary.setdefault(ngram, len(vocabulary)) for ngram in ngrams
+        )
+        indptr.append(len(indices))
+    indptr = np.array(indptr, dtype=np.int64)
+    lengths = np.diff(indptr)
+    data = np.repeat(1 / np.sqrt(np.maximum(lengths, 1)), lengths)
+    return sparse.csr_matrix(
+        (data, np.array(indices, dtype=np.int64), indptr),
+        shape=(len(texts), len(vocabulary)),
+    )
+
+
+def context_similarities(cooccurrence, model, pairs):
+    """Cosine similarity of the co-occurrences of pairs of classifiers.
+
+    Classifiers which are not in the matrix have a similarity of 0.
+    """
+    np, sparse = import_scipy()
+    label = model._meta.label_lower
+    # Add an empty row for classifiers which are not in the matrix
+    missing = len(cooccurrence.keys)
+    columns = np.array(
+        [
+            [cooccurrence.columns.get((label, pk), missing) for pk in pair]
+            for pair in pairs
+        ]
+    )
+    counts = cooccurrence.counts.astype(np.float64)
+    counts = counts - sparse.diags(counts.diagonal())
+    norms = np.sqrt(np.asarray(counts.multiply(counts).sum(axis=1)).ravel())
+    normalized = sparse.diags(1 / np.where(norms > 0, norms, 1)) @ counts
+    normalized = sparse.vstack([normalized, sparse.csr_matrix((1, missing))]).tocsr()
+    return np.asarray(
+        normalized[columns[:, 0]].multiply(normalized[columns[:, 1]]).sum(axis=1)
+    ).ravel()
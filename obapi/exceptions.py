@@ -1,2 +1,14 @@
 class APICallError(Exception):
     """API call failed."""
+
+
+class IngestFailed(Exception):
+    """Some batches of an ingest job failed, and were not saved."""
+
+
+class LeaseExpired(Exception):
+    """A worker's lease on some work expired before the work was saved."""
+
+
+class OperationInProgress(Exception):
+    """The operation is already running in another process."""
@@ -3,6 +3,7 @@ from dataclasses import dataclass
 from typing import Optional, Union
 
 import pandadoc
+from django.db.models import prefetch_related_objects
 from django.template.loader import render_to_string
 
 
@@ -40,7 +41,8 @@ def export_sequence(sequence, writer):
     # metadata_template = f"{sequence._meta.app_label}/export/metadata.md"
     # metadata = render_to_string(metadata_template, {"sequence": sequence})
 
-    items = sequence.items.select_subclasses()
+    items = sequence.items.load_concrete(with_bodies=True)
+    prefetch_related_objects(items, "authors", "ideas", "topics")
 
     sequence_html = render_sequence(items)
 
@@ -0,0 +1,123 @@
+"""A lightweight job queue, stored in the database.
+
+Long-running work (e.g. downloading new posts) is registered as a task, queued as a
+`Job` with `enqueue`, and run outside the web process by the `obapi_worker`
+management command. Tasks are called with the job as their first argument, so they
+can report progress with `Job.set_progress`, followed by the job's arguments. Their
+return value must be JSON-serializable.
+
+A worker holds a lease on each job it runs, which is renewed whenever the job reports
+progress. If the worker dies, the job is run again by another worker once the lease
+expires (`OBAPI_JOB_LEASE_SECONDS`, default 30 minutes).
+"""
+import time
+import traceback
+
+from django.apps import apps
+
+from obapi import utils
+from obapi.models import IngestJob, Job, OBContentItem
+
+TASKS = {}
+
+
+def task(name):
+    """Register a function as a task."""
+
+    def decorator(func):
+        TASKS[name] = func
+        return func
+
+    return decorator
+
+
+def enqueue(task_name, **arguments):
+    """Queue a task to run in a worker.
+
+    Raises
+    ------
+    ValueError
+        If no task is registered with the name `task_name`.
+    """
+    if task_name not in TASKS:
+        raise ValueError(f"Unknown task {task_name!r}.")
+    return Job.objects.create(task=task_name, arguments=arguments)
+
+
+def run_job(job):
+    """Run a claimed job, and record its result or error.
+
+    If another worker has claimed the job in the meantime (because this worker's
+    lease expired), the result is not recorded.
+    """
+    try:
+        result = TASKS[job.task](job, **job.arguments)
+    except Exception:
+        job.finish(error=traceback.format_exc())
+    else:
+        job.finish(result=result)
+    return job
+
+
+def work(worker=None, burst=False, poll_interval=5):
+    """Claim and run queued jobs.
+
+    Parameters
+    ----------
+    worker : str | None
+        The name of the worker. Defaults to the host name and process ID.
+    burst : bool
+        Whether to stop once the queue is empty, instead of polling for new jobs.
+    poll_interval : float
+        Seconds to wait between polls of an empty queue.
+
+    Returns
+    -------
+    int
+        The number of jobs run.
+    """
+    worker = worker or utils.worker_name()
+    job_count = 0
+    while True:
+        job = Job.objects.claim(worker)
+        if job is not None:
+            run_job(job)
+            job_count += 1
+        elif burst:
+            return job_count
+        else:
+            time.sleep(poll_interval)
+
+
+@task("obapi.pull")
+def pull(job):
+    """Download new overcomingbias posts."""
+    created_count = OBContentItem.objects.download_new_items(progress=job.set_progress)
+    return {"created_count": created_count}
+
+
+@task("obapi.sync")
+def sync(job):
+    """Update edited overcomingbias posts."""
+    updated_items = OBContentItem.objects.update_edited_items(progress=job.set_progress)
+    return {"updated_count": len(updated_items)}
+
+
+@task("obapi.resume_ingest_jobs")
+def resume_ingest_jobs(job, pks):
+    """Resume unfinished ingest jobs, from their primary keys."""
+    ingest_jobs = list(IngestJob.objects.filter(pk__in=pks).unfinished())
+    completed_count = 0
+    for ingest_job in ingest_jobs:
+        completed_count += ingest_job.run(progress=job.set_progress)
+    for ingest_job in ingest_jobs:
+        ingest_job.raise_for_status()
+    return {"completed_count": completed_count}
+
+
+@task("obapi.update_items")
+def update_items(job, model, pks):
+    """Update content items of a model, from their primary keys."""
+    queryset = apps.get_model(model).objects.filter(pk__in=pks)
+    updated_count = queryset.bulk_update_items(progress=job.set_progress)
+    return {"updated_count": updated_count}
@@ -0,0 +1,166 @@
+"""Mutual exclusion for long-running operations, such as pulls and syncs.
+
+Decorating a function with `exclusive_operation` stops it running in two processes
+at once. A caller which finds the operation already running with the same arguments
+waits for it to finish, then returns its result, instead of repeating the operation.
+A caller with different arguments gets an `OperationInProgress` error, since the
+result of the running operation is not the result it asked for.
+
+Locks are rows of the `OperationLock` table. A lock is held for a limited time
+(`OBAPI_OPERATION_LOCK_SECONDS`, default ten minutes), after which another caller may
+take it over, e.g. if the process holding the lock died. Operations which report
+progress renew the lease each time they do, so only the slowest step of an operation
+needs to finish within the lease. Callers waiting for the operation receive the same
+progress reports.
+"""
+import datetime
+import functools
+import time
+import traceback
+
+from django.conf import settings
+from django.utils import timezone
+
+from obapi import utils
+from obapi.exceptions import LeaseExpired, OperationInProgress
+from obapi.models.locks import OperationLock
+
+OPERATION_LOCK_DURATION = datetime.timedelta(
+    seconds=getattr(settings, "OBAPI_OPERATION_LOCK_SECONDS", 10 * 60)
+)
+
+
+def exclusive_operation(
+    name,
+    wait=True,
+    poll_interval=1,
+    duration=OPERATION_LOCK_DURATION,
+    dump_result=None,
+    load_result=None,
+    arguments=None,
+    heartbeat=None,
+):
+    """Decorator which stops a function running more than once at a time.
+
+    Parameters
+    ----------
+    name : str
+        The name of the operation.
+    wait : bool
+        If the operation is running elsewhere with the same arguments, whether to
+        wait for it and return its result. Otherwise, `OperationInProgress` is
+        raised.
+    poll_interval : float
+        Seconds between checks of whether the running operation has finished.
+    duration : datetime.timedelta
+        How long the lock is held before others may take it over.
+    dump_result : Callable | None
+        Converts the result of the function to JSON-serializable data. It is called
+        with the same arguments as the function, followed by the result.
+    load_result : Callable | None
+        Converts stored data back to a result, for callers who waited. It is called
+        with the same arguments as the function, followed by the data.
+    arguments : Callable | None
+        Returns a dictionary of the arguments which affect the result of the
+        function. It is called with the same arguments as the function. Callers whose
+        dictionaries differ do not share results. If None, all calls are treated as
+        having the same arguments.
+    heartbeat : str | None
+        The name of a keyword argument of the function which takes a
+        `progress(done, total)` callback. Each time the function reports progress,
+        the lease on the lock is renewed (or `LeaseExpired` is raised if it has been
+        taken over), and the callback passed by the caller is called. Callers who wait
+        for the operation have their callback called with its progress.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            holder = utils.worker_name()
+            fingerprint = (
+                ""
+                if arguments is None
+                else utils.fingerprint(arguments(*args, **kwargs))
+            )
+            while True:
+                acquired, lock = OperationLock.objects.acquire(
+                    name, holder, duration, arguments=fingerprint
+                )
+                if acquired:
+                    return _run(lock, func, args, kwargs)
+                if lock.arguments != fingerprint:
+                    raise OperationInProgress(
+                        f"{name} is already running with different arguments."
+                    )
+                if not wait:
+                    raise OperationInProgress(f"{name} is already running.")
+                # Join the running operation
+                progress = kwargs.get(heartbeat) if heartbeat is not None else None
+                lock = _wait(lock, poll_interval, progress)
+                if lock is not None:
+                    if load_result is None:
+                        return lock.result
+                    return load_result(*args, lock.result, **kwargs)
+                # The operation failed or was abandoned, so try to run it here
+
+        def _run(lock, func, args, kwargs):
+            if heartbeat is not None:
+                kwargs = {
+                    **kwargs,
+                    heartbeat: _renewing(lock, duration, kwargs.get(heartbeat)),
+                }
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                OperationLock.objects.release(lock, error=traceback.format_exc())
+                raise
+            if dump_result is None:
+                data = result
+            else:
+                data = dump_result(*args, result, **kwargs)
+            OperationLock.objects.release(lock, result=data)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def _renewing(lock, duration, progress):
+    """Wrap a progress callback, so that reporting progress renews a lock."""
+
+    def renewing_progress(done, total):
+        if not OperationLock.objects.renew(lock, duration, done, total):
+            raise LeaseExpired(f"The lease on {lock.name} was taken over.")
+        if progress is not None:
+            progress(done, total)
+
+    return renewing_progress
+
+
+def _wait(lock, poll_interval, progress=None):
+    """Wait for a run of an operation to finish.
+
+    `progress` is called whenever the progress of the run changes.
+
+    Returns
+    -------
+    OperationLock | None
+        The finished lock, or None if the run failed, or its lease expired, or a
+        later run has started.
+    """
+    generation = lock.generation
+    reported = (lock.progress_done, lock.progress_total)
+    while True:
+        time.sleep(poll_interval)
+        lock = OperationLock.objects.get(pk=lock.pk)
+        if lock.generation != generation:
+            return None
+        current = (lock.progress_done, lock.progress_total)
+        if progress is not None and current != reported:
+            progress(*current)
+            reported = current
+        if lock.finish_timestamp is not None:
+            return None if lock.error else lock
+        if lock.expires is None or lock.expires <= timezone.now():
+            return None
@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from obapi.exceptions import IngestFailed
+from obapi.models.content import DOWNLOAD_BATCH_SIZE
+
+
+class QueryCounter:
+    """Database execute wrapper which counts queries."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class ContentCommand(BaseCommand):
+    """Base class for commands which download content in batches.
+
+    Subclasses implement `run`, which returns a summary of what was done. The summary
+    is printed with the time taken and the number of database queries.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DOWNLOAD_BATCH_SIZE,
+            help="Number of items downloaded and saved in each transaction.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of batches to download at once.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would be downloaded, without saving anything.",
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            try:
+                summary = self.run(**options)
+            except IngestFailed as exc:
+                raise CommandError(str(exc)) from exc
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(summary))
+        if options["verbosity"] > 0:
+            self.stdout.write(
+                f"Finished in {elapsed:.1f}s, with {counter.count} database queries."
+            )
+
+    def report_progress(self, done, total):
+        if self.verbosity > 1:
+            self.stdout.write(f"Saved batch {done}/{total}.")
+
+    def run(self, **options):
+        raise NotImplementedError
@@ -0,0 +1,94 @@
+import contextlib
+import csv
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from obapi.models import AuthorAlias, IdeaAlias, TagAlias, TopicAlias
+
+ALIAS_MODELS = {
+    model.owner.field.related_model._meta.model_name: model
+    for model in (AuthorAlias, IdeaAlias, TopicAlias, TagAlias)
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Export the aliases of authors, ideas, topics or tags to a CSV or JSON file, "
+        'or import aliases from one. Each row has an "owner" (name of the author, '
+        'idea, topic or tag) and an "alias".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["export", "import"])
+        parser.add_argument("path", help='File to read or write ("-" for stdio).')
+        parser.add_argument(
+            "--model",
+            choices=sorted(ALIAS_MODELS),
+            default="tag",
+            help="Type of classifier whose aliases are imported or exported.",
+        )
+        parser.add_argument(
+            "--format",
+            choices=["csv", "json"],
+            help="File format. Defaults to the extension of the path.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would be imported, without saving anything.",
+        )
+
+    def handle(self, *args, **options):
+        alias_model = ALIAS_MODELS[options["model"]]
+        file_format = options["format"] or options["path"].rpartition(".")[2]
+        if file_format not in ("csv", "json"):
+            raise CommandError("Could not tell the file format. Use --format.")
+
+        if options["action"] == "export":
+            rows = alias_model.objects.export_rows()
+            with self.open(options["path"], "w") as file:
+                write_rows(file, rows, file_format)
+            self.stderr.write(f"Exported {len(rows)} alias(es).")
+            return
+
+        with self.open(options["path"], "r") as file:
+            rows = read_rows(file, file_format)
+        new_aliases, conflicts = alias_model.objects.import_rows(
+            rows, dry_run=options["dry_run"]
+        )
+        for (owner, text), reason in conflicts.items():
+            self.stderr.write(f"Skipped {owner!r}, {text!r}: {reason}")
+        verb = "Would import" if options["dry_run"] else "Imported"
+        self.stdout.write(
+            f"{verb} {len(new_aliases)} alias(es), with {len(conflicts)} conflict(s)."
+        )
+
+    def open(self, path, mode):
+        if path == "-":
+            # Do not close stdin or stdout
+            return contextlib.nullcontext(sys.stdin if mode == "r" else self.stdout)
+        return open(path, mode, newline="", encoding="utf-8")
+
+
+def write_rows(file, rows, file_format):
+    if file_format == "json":
+        file.write(
+            json.dumps([{"owner": owner, "alias": text} for owner, text in rows])
+        )
+    else:
+        writer = csv.writer(file)
+        writer.writerow(["owner", "alias"])
+        writer.writerows(rows)
+
+
+def read_rows(file, file_format):
+    if file_format == "json":
+        records = json.load(file)
+    else:
+        records = csv.DictReader(file)
+    try:
+        return [(record["owner"], record["alias"]) for record in records]
+    except KeyError as exc:
+        raise CommandError(f"Missing column {exc}.") from exc
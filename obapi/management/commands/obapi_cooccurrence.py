@@ -0,0 +1,36 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from obapi.cooccurrence import COOCCURRENCE_PATH, CooccurrenceMatrix
+
+
+class Command(BaseCommand):
+    help = (
+        "Build or refresh the co-occurrence matrix of ideas, topics and tags, used to "
+        "find related classifiers. Requires NumPy and SciPy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            default=COOCCURRENCE_PATH,
+            help="File the matrix is saved to.",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Build the matrix from scratch, instead of applying recent changes.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if options["rebuild"] or not os.path.exists(path):
+            matrix = CooccurrenceMatrix.build()
+            summary = f"Built matrix of {len(matrix.rows)} item(s)."
+        else:
+            matrix = CooccurrenceMatrix.load(path)
+            updated_count = matrix.refresh()
+            summary = f"Updated {updated_count} item(s)."
+        matrix.save(path)
+        self.stdout.write(f"{summary} Saved {len(matrix.keys)} classifier(s).")
@@ -0,0 +1,68 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from obapi.cooccurrence import COOCCURRENCE_PATH, CooccurrenceMatrix
+from obapi.duplicates import CLASSIFIER_MODELS, find_duplicates
+
+MODELS = {model._meta.model_name: model for model in CLASSIFIER_MODELS}
+
+
+class Command(BaseCommand):
+    help = (
+        "List pairs of authors, ideas, topics or tags which are probably duplicates, "
+        "best candidates first. Requires NumPy and SciPy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            choices=sorted(MODELS),
+            default="tag",
+            help="Type of classifier to compare.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.8,
+            help="Minimum similarity of the aliases of a pair (0 to 1).",
+        )
+        parser.add_argument(
+            "--limit", type=int, default=50, help="Maximum number of pairs to list."
+        )
+        parser.add_argument(
+            "--cooccurrence",
+            default=COOCCURRENCE_PATH,
+            help=(
+                "Co-occurrence matrix built by obapi_cooccurrence, used to score "
+                "pairs (ignored if the file does not exist)."
+            ),
+        )
+        parser.add_argument(
+            "--merge",
+            action="store_true",
+            help="Merge each listed pair. Review the list without this option first.",
+        )
+
+    def handle(self, *args, **options):
+        cooccurrence = None
+        if os.path.exists(options["cooccurrence"]):
+            cooccurrence = CooccurrenceMatrix.load(options["cooccurrence"])
+        candidates = find_duplicates(
+            MODELS[options["model"]],
+            threshold=options["threshold"],
+            cooccurrence=cooccurrence,
+        )[: options["limit"]]
+
+        merged_pks = set()
+        for candidate in candidates:
+            self.stdout.write(
+                f"{candidate.score:.3f}\t{candidate.first_name} ({candidate.first_pk})"
+                f"\t{candidate.second_name} ({candidate.second_pk})"
+            )
+            pair = {candidate.first_pk, candidate.second_pk}
+            if options["merge"] and not pair & merged_pks:
+                candidate.merge()
+                merged_pks |= pair
+        if options["merge"]:
+            self.stdout.write(f"Merged {len(merged_pks) // 2} pair(s).")
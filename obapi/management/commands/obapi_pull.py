@@ -0,0 +1,45 @@
+from obapi.management.base import ContentCommand
+from obapi.models import IngestJob, OBContentItem
+
+
+class Command(ContentCommand):
+    help = "Download new overcomingbias posts."
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help=(
+                "Resume unfinished pulls from their last saved batch. Several hosts "
+                "can resume the same pulls at once."
+            ),
+        )
+
+    def run(self, **options):
+        queryset = OBContentItem.objects.all()
+        if options["resume"]:
+            ingest_jobs = IngestJob.objects.unfinished().filter(
+                model_label=OBContentItem._meta.label_lower
+            )
+            if options["dry_run"]:
+                return f"Would resume {ingest_jobs.count()} pull(s)."
+            created_count = 0
+            for ingest_job in ingest_jobs:
+                ingest_job.run(
+                    progress=self.report_progress, workers=options["workers"]
+                )
+                created_count += ingest_job.created_count
+            for ingest_job in ingest_jobs:
+                ingest_job.raise_for_status()
+            return f"Resumed {len(ingest_jobs)} pull(s): {created_count} post(s) saved."
+
+        if options["dry_run"]:
+            item_ids = queryset.get_missing_item_ids()
+            return f"Would download {len(item_ids)} new post(s)."
+        created_count = queryset.download_new_items(
+            progress=self.report_progress,
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+        )
+        return f"Downloaded {created_count} new post(s)."
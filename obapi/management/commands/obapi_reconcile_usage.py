@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from obapi.models import Author, Idea, Tag, Topic
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the item counts and last used dates of authors, ideas, topics and "
+        "tags from their related content."
+    )
+
+    def handle(self, *args, **options):
+        for model in (Author, Idea, Topic, Tag):
+            refreshed_count = model.objects.refresh_usage()
+            self.stdout.write(
+                f"Reconciled {refreshed_count} {model._meta.verbose_name_plural}."
+            )
@@ -0,0 +1,50 @@
+from obapi.management.base import ContentCommand
+from obapi.models import (
+    Counter,
+    EssayContentItem,
+    OBContentItem,
+    SpotifyContentItem,
+    YoutubeContentItem,
+)
+
+SOURCES = {
+    "youtube": YoutubeContentItem,
+    "spotify": SpotifyContentItem,
+    "overcomingbias": OBContentItem,
+    "essays": EssayContentItem,
+}
+
+
+class Command(ContentCommand):
+    help = "Download all saved content from a source again, e.g. to update view counts."
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--source", required=True, choices=SOURCES, help="Source of content."
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Resume an interrupted refresh from its last saved batch.",
+        )
+
+    def run(self, **options):
+        model = SOURCES[options["source"]]
+        queryset = model.objects.all()
+        checkpoint = f"obapi_refresh.{model._meta.label_lower}"
+        if options["dry_run"]:
+            if options["resume"]:
+                queryset = queryset.filter(pk__gt=Counter.objects.get_value(checkpoint))
+            return f"Would refresh {queryset.count()} item(s)."
+
+        if not options["resume"]:
+            Counter.objects.set_value(checkpoint, 0)
+
+        updated_count = queryset.bulk_update_items(
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            checkpoint=checkpoint,
+            progress=self.report_progress,
+        )
+        return f"Refreshed {updated_count} item(s)."
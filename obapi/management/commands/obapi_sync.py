@@ -0,0 +1,32 @@
+from obapi.assemble import assemble_ob_edit_dates
+from obapi.management.base import ContentCommand
+from obapi.models import OBContentItem
+
+
+class Command(ContentCommand):
+    help = (
+        "Update overcomingbias posts which were edited since they were downloaded. "
+        "Each batch is saved as it is downloaded, so an interrupted sync continues "
+        "where it stopped when run again."
+    )
+
+    def run(self, **options):
+        queryset = OBContentItem.objects.all()
+        if options["dry_run"]:
+            edit_dates = assemble_ob_edit_dates()
+            edited_count = sum(
+                download_timestamp is not None
+                and item_id in edit_dates
+                and edit_dates[item_id] >= download_timestamp
+                for item_id, download_timestamp in queryset.values_list(
+                    "item_id", "download_timestamp"
+                )
+            )
+            return f"Would update {edited_count} edited post(s)."
+
+        updated_items = queryset.update_edited_items(
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            progress=self.report_progress,
+        )
+        return f"Updated {len(updated_items)} edited post(s)."
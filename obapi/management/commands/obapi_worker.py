@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from obapi import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued obapi jobs, such as admin pulls and syncs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--name",
+            help="Name of the worker. Defaults to the host name and process ID.",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Stop once the queue is empty, instead of waiting for new jobs.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5,
+            help="Seconds to wait between checks of an empty queue.",
+        )
+
+    def handle(self, *args, **options):
+        job_count = jobs.work(
+            worker=options["name"],
+            burst=options["burst"],
+            poll_interval=options["poll_interval"],
+        )
+        self.stdout.write(f"Ran {job_count} job(s).")
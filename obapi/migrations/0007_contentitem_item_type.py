@@ -0,0 +1,46 @@
+from django.db import migrations, models
+
+# Concrete content models, with parents before their children
+CONTENT_MODEL_NAMES = [
+    "contentitem",
+    "videocontentitem",
+    "youtubecontentitem",
+    "audiocontentitem",
+    "spotifycontentitem",
+    "textcontentitem",
+    "obcontentitem",
+    "essaycontentitem",
+]
+
+
+def set_item_types(apps, schema_editor):
+    ContentItem = apps.get_model("obapi", "ContentItem")
+    for model_name in CONTENT_MODEL_NAMES:
+        model = apps.get_model("obapi", model_name)
+        ContentItem.objects.filter(pk__in=model.objects.values("pk")).update(
+            item_type=f"obapi.{model_name}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("obapi", "0006_alter_sequence_options"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contentitem",
+            name="item_type",
+            field=models.CharField(
+                db_index=True,
+                default="",
+                editable=False,
+                help_text='Concrete content model. E.g. "obapi.obcontentitem".',
+                max_length=100,
+                verbose_name="content type",
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(set_item_types, migrations.RunPython.noop),
+    ]
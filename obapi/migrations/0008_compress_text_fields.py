@@ -0,0 +1,119 @@
+from django.db import migrations
+
+import obapi.modelfields
+
+# (model name, field name) of each field to compress
+COMPRESSED_FIELDS = [
+    ("contentitem", "description_html"),
+    ("textcontentitem", "text_html"),
+    ("textcontentitem", "text_plain"),
+]
+BATCH_SIZE = 500
+
+
+def copy_fields(apps, from_suffix, to_suffix):
+    for model_name, field_name in COMPRESSED_FIELDS:
+        model = apps.get_model("obapi", model_name)
+        from_field = f"{field_name}{from_suffix}"
+        to_field = f"{field_name}{to_suffix}"
+        rows = model.objects.values_list("pk", from_field).iterator(
+            chunk_size=BATCH_SIZE
+        )
+        batch = []
+        for pk, value in rows:
+            # Decompress values read from compressed fields
+            value = model._meta.get_field(from_field).to_python(value)
+            batch.append(model(pk=pk, **{to_field: value}))
+            if len(batch) == BATCH_SIZE:
+                model.objects.bulk_update(batch, [to_field])
+                batch = []
+        model.objects.bulk_update(batch, [to_field])
+
+
+def compress_fields(apps, schema_editor):
+    copy_fields(apps, from_suffix="", to_suffix="_compressed")
+
+
+def decompress_fields(apps, schema_editor):
+    copy_fields(apps, from_suffix="_compressed", to_suffix="")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("obapi", "0007_contentitem_item_type"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contentitem",
+            name="description_html_compressed",
+            field=obapi.modelfields.CompressedTextField(blank=True, default=""),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="textcontentitem",
+            name="text_html_compressed",
+            field=obapi.modelfields.CompressedTextField(blank=True, default=""),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="textcontentitem",
+            name="text_plain_compressed",
+            field=obapi.modelfields.CompressedTextField(blank=True, default=""),
+            preserve_default=False,
+        ),
+        migrations.RunPython(compress_fields, decompress_fields),
+        migrations.RemoveField(
+            model_name="contentitem",
+            name="description_html",
+        ),
+        migrations.RemoveField(
+            model_name="textcontentitem",
+            name="text_html",
+        ),
+        migrations.RemoveField(
+            model_name="textcontentitem",
+            name="text_plain",
+        ),
+        migrations.RenameField(
+            model_name="contentitem",
+            old_name="description_html_compressed",
+            new_name="description_html",
+        ),
+        migrations.RenameField(
+            model_name="textcontentitem",
+            old_name="text_html_compressed",
+            new_name="text_html",
+        ),
+        migrations.RenameField(
+            model_name="textcontentitem",
+            old_name="text_plain_compressed",
+            new_name="text_plain",
+        ),
+        migrations.AlterField(
+            model_name="contentitem",
+            name="description_html",
+            field=obapi.modelfields.CompressedTextField(
+                blank=True, help_text="HTML description of content.", max_length=5000
+            ),
+        ),
+        migrations.AlterField(
+            model_name="textcontentitem",
+            name="text_html",
+            field=obapi.modelfields.CompressedTextField(
+                blank=True,
+                help_text="Content text HTML.",
+                verbose_name="content text HTML",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="textcontentitem",
+            name="text_plain",
+            field=obapi.modelfields.CompressedTextField(
+                blank=True,
+                help_text="Content plaintext.",
+                verbose_name="content plaintext",
+            ),
+        ),
+    ]
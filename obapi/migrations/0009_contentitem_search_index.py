@@ -0,0 +1,54 @@
+from django.db import migrations
+
+from obapi import utils
+from obapi.search import get_search_backend
+
+BATCH_SIZE = 500
+
+
+def create_search_index(apps, schema_editor):
+    backend = get_search_backend(schema_editor.connection)
+    if backend is None:
+        return
+    with schema_editor.connection.cursor() as cursor:
+        backend.create_index(cursor)
+
+    # Index existing items
+    ContentItem = apps.get_model("obapi", "ContentItem")
+    TextContentItem = apps.get_model("obapi", "TextContentItem")
+    description_field = ContentItem._meta.get_field("description_html")
+    text_field = TextContentItem._meta.get_field("text_plain")
+    rows = ContentItem.objects.values_list("pk", "title", "description_html")
+    for rows_chunk in utils.chunk_iterator(list(rows), BATCH_SIZE):
+        texts = dict(
+            TextContentItem.objects.filter(
+                pk__in=[pk for pk, _, _ in rows_chunk]
+            ).values_list("pk", "text_plain")
+        )
+        documents = []
+        for pk, title, description_html in rows_chunk:
+            body = text_field.to_python(texts.get(pk)) or utils.html_to_plaintext(
+                description_field.to_python(description_html)
+            )
+            documents.append((pk, title, body))
+        with schema_editor.connection.cursor() as cursor:
+            backend.index_documents(cursor, documents)
+
+
+def drop_search_index(apps, schema_editor):
+    backend = get_search_backend(schema_editor.connection)
+    if backend is None:
+        return
+    with schema_editor.connection.cursor() as cursor:
+        backend.drop_index(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("obapi", "0008_compress_text_fields"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,81 @@
+from django.db import migrations, models
+
+from obapi import utils
+
+BATCH_SIZE = 500
+CHANGE_SEQUENCE_COUNTER = "obapi.contentitem.change_sequence"
+
+
+def number_existing_items(apps, schema_editor):
+    """Give existing items change sequence numbers, so consumers process them."""
+    db_alias = schema_editor.connection.alias
+    ContentItem = apps.get_model("obapi", "ContentItem")
+    Counter = apps.get_model("obapi", "Counter")
+
+    pks = list(ContentItem.objects.using(db_alias).order_by("pk").values_list("pk"))
+    sequence = 0
+    for pks_chunk in utils.chunk_iterator(pks, BATCH_SIZE):
+        items = []
+        for (pk,) in pks_chunk:
+            sequence += 1
+            items.append(ContentItem(pk=pk, change_sequence=sequence))
+        ContentItem.objects.using(db_alias).bulk_update(items, ["change_sequence"])
+    Counter.objects.using(db_alias).create(name=CHANGE_SEQUENCE_COUNTER, value=sequence)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("obapi", "0009_contentitem_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Counter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        help_text="Counter name.", max_length=100, unique=True
+                    ),
+                ),
+                (
+                    "value",
+                    models.BigIntegerField(default=0, help_text="Counter value."),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="contentitem",
+            name="change_sequence",
+            field=models.BigIntegerField(
+                db_index=True,
+                default=0,
+                editable=False,
+                help_text=(
+                    "Increases whenever the downloaded content of the item changes."
+                ),
+                verbose_name="change sequence number",
+            ),
+        ),
+        migrations.AddField(
+            model_name="contentitem",
+            name="content_fingerprint",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="Hash of the downloaded content of the item.",
+                max_length=64,
+            ),
+        ),
+        migrations.RunPython(number_existing_items, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("obapi", "0010_counter_contentitem_change_sequence"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeLogEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "sequence",
+                    models.BigIntegerField(
+                        editable=False,
+                        help_text="Position in the change log.",
+                        unique=True,
+                    ),
+                ),
+                (
+                    "timestamp",
+                    models.DateTimeField(
+                        auto_now_add=True, help_text="When the change was recorded."
+                    ),
+                ),
+                (
+                    "entity",
+                    models.CharField(
+                        help_text='Model of the changed object. E.g. "obapi.author".',
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "object_pk",
+                    models.CharField(
+                        help_text="Primary key of the object.",
+                        max_length=64,
+                        verbose_name="object primary key",
+                    ),
+                ),
+                (
+                    "operation",
+                    models.CharField(
+                        choices=[
+                            ("create", "Create"),
+                            ("update", "Update"),
+                            ("delete", "Delete"),
+                            ("merge", "Merge"),
+                            ("convert", "Convert"),
+                        ],
+                        help_text="Type of change.",
+                        max_length=10,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "change log entries",
+                "ordering": ["sequence"],
+            },
+        ),
+    ]
@@ -0,0 +1,155 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("obapi", "0011_changelogentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IngestJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "create_timestamp",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="creation date"
+                    ),
+                ),
+                (
+                    "update_timestamp",
+                    models.DateTimeField(auto_now=True, verbose_name="update date"),
+                ),
+                (
+                    "model_label",
+                    models.CharField(
+                        help_text=(
+                            'Content model of the items. E.g. "obapi.obcontentitem".'
+                        ),
+                        max_length=100,
+                        verbose_name="content type",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        help_text="Status of the job.",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "item_count",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Number of planned items."
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-create_timestamp"],
+            },
+        ),
+        migrations.CreateModel(
+            name="IngestBatch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "index",
+                    models.PositiveIntegerField(
+                        help_text="Position of the batch in the job."
+                    ),
+                ),
+                (
+                    "item_ids",
+                    models.JSONField(default=list, help_text="IDs of items to create."),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        help_text="Status of the batch.",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Number of times the batch has been run."
+                    ),
+                ),
+                (
+                    "created_count",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Number of items created."
+                    ),
+                ),
+                (
+                    "failed_item_ids",
+                    models.JSONField(
+                        default=list,
+                        help_text="IDs of items which could not be downloaded.",
+                    ),
+                ),
+                (
+                    "error",
+                    models.TextField(
+                        blank=True, help_text="Error from the last attempt."
+                    ),
+                ),
+                (
+                    "completed_timestamp",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="completion date"
+                    ),
+                ),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="batches",
+                        to="obapi.ingestjob",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "ingest batches",
+                "ordering": ["job", "index"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="ingestbatch",
+            constraint=models.UniqueConstraint(
+                fields=("job", "index"), name="obapi_ingestbatch_unique_index"
+            ),
+        ),
+    ]
@@ -0,0 +1,107 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("obapi", "0012_ingestjob_ingestbatch"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Job",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "task",
+                    models.CharField(
+                        help_text="Name of the task to run.", max_length=100
+                    ),
+                ),
+                (
+                    "arguments",
+                    models.JSONField(
+                        blank=True,
+                        default=dict,
+                        help_text="Keyword arguments of the task.",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "Queued"),
+                            ("running", "Running"),
+                            ("succeeded", "Succeeded"),
+                            ("failed", "Failed"),
+                        ],
+                        db_index=True,
+                        default="queued",
+                        help_text="Status of the job.",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "progress_done",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Number of steps completed."
+                    ),
+                ),
+                (
+                    "progress_total",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Number of steps in total (0 if unknown)."
+                    ),
+                ),
+                (
+                    "result",
+                    models.JSONField(
+                        blank=True, help_text="Value returned by the task.", null=True
+                    ),
+                ),
+                (
+                    "error",
+                    models.TextField(
+                        blank=True, help_text="Traceback, if the task failed."
+                    ),
+                ),
+                (
+                    "worker",
+                    models.CharField(
+                        blank=True,
+                        help_text="Name of the worker running the job.",
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "create_timestamp",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="creation date"
+                    ),
+                ),
+                (
+                    "start_timestamp",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="start date"
+                    ),
+                ),
+                (
+                    "finish_timestamp",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="finish date"
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-create_timestamp"],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("obapi", "0013_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ingestbatch",
+            name="leased_by",
+            field=models.CharField(
+                blank=True,
+                help_text="Name of the worker running the batch.",
+                max_length=100,
+            ),
+        ),
+        migrations.AddField(
+            model_name="ingestbatch",
+            name="lease_expires",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When other workers may claim the batch.",
+                null=True,
+                verbose_name="lease expiry date",
+            ),
+        ),
+    ]
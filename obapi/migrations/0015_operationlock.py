@@ -0,0 +1,73 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("obapi", "0014_ingestbatch_lease"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OperationLock",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        help_text="Operation name.", max_length=100, unique=True
+                    ),
+                ),
+                (
+                    "holder",
+                    models.CharField(
+                        blank=True,
+                        help_text="Name of the process running it.",
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "expires",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="When other processes may take over the lock.",
+                        null=True,
+                        verbose_name="lease expiry date",
+                    ),
+                ),
+                (
+                    "generation",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Number of times the lock has been acquired.",
+                    ),
+                ),
+                (
+                    "result",
+                    models.JSONField(
+                        blank=True,
+                        help_text="Result of the last completed run.",
+                        null=True,
+                    ),
+                ),
+                (
+                    "error",
+                    models.TextField(blank=True, help_text="Error from the last run."),
+                ),
+                (
+                    "finish_timestamp",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="finish date"
+                    ),
+                ),
+            ],
+        ),
+    ]
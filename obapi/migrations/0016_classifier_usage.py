@@ -0,0 +1,78 @@
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+CLASSIFIER_RELATIONS = {
+    "Author": "authors",
+    "Idea": "ideas",
+    "Topic": "topics",
+    "Tag": "tags",
+}
+
+
+def count_existing_usage(apps, schema_editor):
+    """Fill in the usage counters of existing classifiers."""
+    db_alias = schema_editor.connection.alias
+    ContentItem = apps.get_model("obapi", "ContentItem")
+    for model_name, relation_name in CLASSIFIER_RELATIONS.items():
+        model = apps.get_model("obapi", model_name)
+        field = ContentItem._meta.get_field(relation_name)
+        through = field.remote_field.through
+        target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+        rows = (
+            through.objects.using(db_alias)
+            .filter(**{target: OuterRef("pk")})
+            .order_by()
+            .values(target)
+        )
+        model.objects.using(db_alias).update(
+            item_count=Coalesce(
+                Subquery(rows.annotate(count=Count("pk")).values("count")), 0
+            ),
+            last_used=Subquery(
+                rows.annotate(
+                    last=Max(f"{field.m2m_field_name()}__publish_date")
+                ).values("last")
+            ),
+        )
+
+
+def usage_fields(model_name):
+    return [
+        migrations.AddField(
+            model_name=model_name,
+            name="item_count",
+            field=models.PositiveIntegerField(
+                db_index=True,
+                default=0,
+                editable=False,
+                help_text="Number of related content items.",
+            ),
+        ),
+        migrations.AddField(
+            model_name=model_name,
+            name="last_used",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                help_text="Publish date of the most recent related content item.",
+                null=True,
+                verbose_name="last used",
+            ),
+        ),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("obapi", "0015_operationlock"),
+    ]
+
+    operations = [
+        *usage_fields("author"),
+        *usage_fields("idea"),
+        *usage_fields("topic"),
+        *usage_fields("tag"),
+        migrations.RunPython(count_existing_usage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("obapi", "0016_classifier_usage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="operationlock",
+            name="arguments",
+            field=models.CharField(
+                blank=True,
+                help_text="Fingerprint of the arguments of the current or last run.",
+                max_length=64,
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("obapi", "0017_operationlock_arguments"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="lease_expires",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When other workers may claim the running job.",
+                null=True,
+                verbose_name="lease expiry date",
+            ),
+        ),
+    ]
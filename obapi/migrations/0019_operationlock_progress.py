@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("obapi", "0018_job_lease_expires"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="operationlock",
+            name="progress_done",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Number of steps completed by the current run."
+            ),
+        ),
+        migrations.AddField(
+            model_name="operationlock",
+            name="progress_total",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Number of steps in the current run (0 if unknown).",
+            ),
+        ),
+    ]
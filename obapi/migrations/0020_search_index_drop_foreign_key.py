@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from obapi.search import SEARCH_TABLE
+
+
+def drop_foreign_key(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"ALTER TABLE {SEARCH_TABLE} "
+            f"DROP CONSTRAINT IF EXISTS {SEARCH_TABLE}_item_id_fkey"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("obapi", "0019_operationlock_progress"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_foreign_key, migrations.RunPython.noop),
+    ]
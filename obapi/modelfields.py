@@ -1,7 +1,11 @@
+from functools import lru_cache
+
+from django.conf import settings
 from django.db import models
+from django.db.models.query_utils import DeferredAttribute
 
 import obapi.formfields
-from obapi import validators
+from obapi import utils, validators
 
 
 class SimpleSlugField(models.CharField):
@@ -28,3 +32,94 @@ class SimpleSlugField(models.CharField):
         return super().formfield(
             **{"form_class": obapi.formfields.SimpleSlugField, **kwargs}
         )
+
+
+@lru_cache(maxsize=None)
+def get_compression_dictionary():
+    """Load the preset dictionary for compressed text fields (if configured)."""
+    path = getattr(settings, "OBAPI_COMPRESSION_DICTIONARY", None)
+    if path is None:
+        return None
+    with open(path, "rb") as dictionary_file:
+        return dictionary_file.read()
+
+
+@lru_cache(maxsize=None)
+def get_compression_dictionaries():
+    """Load the preset dictionaries which stored text may be compressed with.
+
+    These are the current dictionary, and the dictionaries it replaced (listed in
+    the `OBAPI_RETIRED_COMPRESSION_DICTIONARIES` setting).
+    """
+    dictionaries = []
+    for path in getattr(settings, "OBAPI_RETIRED_COMPRESSION_DICTIONARIES", ()):
+        with open(path, "rb") as dictionary_file:
+            dictionaries.append(dictionary_file.read())
+    current_dictionary = get_compression_dictionary()
+    if current_dictionary is not None:
+        dictionaries.insert(0, current_dictionary)
+    return tuple(dictionaries)
+
+
+class CompressedTextDescriptor(DeferredAttribute):
+    """Decompress the value of a CompressedTextField when it is first accessed."""
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, (bytes, memoryview)):
+            value = self.field.to_python(value)
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        # Defining __set__ ensures __get__ is called even when the value is loaded
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedTextField(models.TextField):
+    """A text field which is compressed with zlib in a binary column.
+
+    Values are decompressed lazily, when the attribute is first accessed.
+    `values()` and `values_list()` return the compressed bytes, which can be
+    decompressed with `to_python()`. Lookups on the text (e.g. `icontains`) do not
+    work.
+
+    If the `OBAPI_COMPRESSION_DICTIONARY` setting is the path to a preset dictionary
+    (see `utils.train_compression_dictionary`), it is used to compress new values.
+    Each value records the ID of its dictionary, so after the dictionary is
+    replaced, values compressed with the old one can still be read if the old one is
+    listed in `OBAPI_RETIRED_COMPRESSION_DICTIONARIES`.
+    """
+
+    descriptor_class = CompressedTextDescriptor
+    description = "Compressed text"
+
+    def get_internal_type(self):
+        return "BinaryField"
+
+    def from_db_value(self, value, expression, connection):
+        if isinstance(value, memoryview):
+            return bytes(value)
+        return value
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, memoryview)):
+            return utils.decompress_text(value, get_compression_dictionaries())
+        return super().to_python(value)
+
+    def get_prep_value(self, value):
+        if value is None or isinstance(value, (bytes, memoryview)):
+            # Already compressed
+            return value
+        return utils.compress_text(
+            super().get_prep_value(value), get_compression_dictionary()
+        )
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if not prepared:
+            value = self.get_prep_value(value)
+        if value is not None:
+            return connection.Database.Binary(value)
+        return value
@@ -1,5 +1,7 @@
+from obapi.models.changes import ChangeLogEntry, Counter
 from obapi.models.classifiers import (
     CLASSIFIER_SLUG_MAX_LENGTH,
+    AliasedModel,
     Author,
     AuthorAlias,
     ExternalLink,
@@ -20,6 +22,9 @@ from obapi.models.content import (
     VideoContentItem,
     YoutubeContentItem,
 )
+from obapi.models.ingest import IngestBatch, IngestJob
+from obapi.models.jobs import Job
+from obapi.models.locks import OperationLock
 from obapi.models.sequence import (
     SEQUENCE_SLUG_MAX_LENGTH,
     BaseSequence,
@@ -30,6 +35,7 @@ from obapi.models.sequence import (
 
 __all__ = [
     "CLASSIFIER_SLUG_MAX_LENGTH",
+    "AliasedModel",
     "Author",
     "Idea",
     "Topic",
@@ -39,6 +45,8 @@ __all__ = [
     "IdeaAlias",
     "TopicAlias",
     "ExternalLink",
+    "Counter",
+    "ChangeLogEntry",
     "ContentItem",
     "EssayContentItem",
     "VideoContentItem",
@@ -47,6 +55,10 @@ __all__ = [
     "SpotifyContentItem",
     "TextContentItem",
     "OBContentItem",
+    "IngestJob",
+    "IngestBatch",
+    "Job",
+    "OperationLock",
     "SEQUENCE_SLUG_MAX_LENGTH",
     "BaseSequence",
     "BaseSequenceMember",
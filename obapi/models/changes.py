@@ -0,0 +1,147 @@
+from django.db import models, transaction
+from django.db.models import F
+
+
+class CounterQuerySet(models.QuerySet):
+    def increment(self, name, count=1):
+        """Increase a counter, and return its new value.
+
+        The counter row stays locked until the end of the transaction, so the values
+        taken by concurrent transactions are committed in increasing order.
+        """
+        with transaction.atomic(using=self.db):
+            self.get_or_create(name=name)
+            self.filter(name=name).update(value=F("value") + count)
+            return self.get(name=name).value
+
+    def get_value(self, name):
+        """Get the value of a counter (0 if it does not exist)."""
+        try:
+            return self.get(name=name).value
+        except self.model.DoesNotExist:
+            return 0
+
+    def set_value(self, name, value):
+        """Set the value of a counter."""
+        self.update_or_create(name=name, defaults={"value": value})
+
+
+class Counter(models.Model):
+    """A named counter.
+
+    Used to hand out change sequence numbers, and to record the last change sequence
+    processed by consumers of changes (e.g. derived-index builders).
+    """
+
+    objects = CounterQuerySet.as_manager()
+
+    name = models.CharField(max_length=100, unique=True, help_text="Counter name.")
+    value = models.BigIntegerField(default=0, help_text="Counter value.")
+
+    def __str__(self):
+        return f"{self.name} ({self.value})"
+
+
+# Name of the counter which hands out change log sequence numbers
+CHANGE_LOG_COUNTER = "obapi.changelogentry.sequence"
+
+
+class ChangeLogEntryQuerySet(models.QuerySet):
+    def record(self, operation, objects):
+        """Append entries for some objects to the change log.
+
+        Call this in the same transaction as the change itself, so that an entry is
+        committed exactly when its change is.
+
+        Parameters
+        ----------
+        operation : str
+            One of `ChangeLogEntry.Operation`.
+        objects : Iterable[models.Model]
+            The changed objects. The entity of a content item is its concrete type.
+
+        Returns
+        -------
+        List[ChangeLogEntry]
+        """
+        objects = [obj for obj in objects if obj.pk is not None]
+        if not objects:
+            return []
+        last_sequence = Counter.objects.using(self.db).increment(
+            CHANGE_LOG_COUNTER, len(objects)
+        )
+        first_sequence = last_sequence - len(objects) + 1
+        entries = [
+            self.model(
+                sequence=sequence,
+                entity=getattr(obj, "item_type", "") or obj._meta.label_lower,
+                object_pk=str(obj.pk),
+                operation=operation,
+            )
+            for sequence, obj in enumerate(objects, start=first_sequence)
+        ]
+        return self.bulk_create(entries)
+
+    def after(self, cursor=0, limit=None):
+        """Entries recorded after a cursor, oldest first.
+
+        Parameters
+        ----------
+        cursor : int
+            The `sequence` of the last entry already read. Use 0 to read from the
+            start of the log.
+        limit : int | None
+            The maximum number of entries to return.
+
+        Returns
+        -------
+        QuerySet[ChangeLogEntry]
+        """
+        queryset = self.filter(sequence__gt=cursor).order_by("sequence")
+        if limit is not None:
+            queryset = queryset[:limit]
+        return queryset
+
+    def latest_cursor(self):
+        """The cursor of the most recent entry (0 if the log is empty)."""
+        return Counter.objects.using(self.db).get_value(CHANGE_LOG_COUNTER)
+
+
+class ChangeLogEntry(models.Model):
+    """An append-only log of changes to content items and classifiers.
+
+    Consumers read the log with `ChangeLogEntry.objects.after`, keeping the
+    `sequence` of the last entry they have read as a cursor.
+    """
+
+    class Operation(models.TextChoices):
+        CREATE = "create", "Create"
+        UPDATE = "update", "Update"
+        DELETE = "delete", "Delete"
+        MERGE = "merge", "Merge"
+        CONVERT = "convert", "Convert"
+
+    objects = ChangeLogEntryQuerySet.as_manager()
+
+    sequence = models.BigIntegerField(
+        unique=True, editable=False, help_text="Position in the change log."
+    )
+    timestamp = models.DateTimeField(
+        auto_now_add=True, help_text="When the change was recorded."
+    )
+    entity = models.CharField(
+        max_length=100, help_text='Model of the changed object. E.g. "obapi.author".'
+    )
+    object_pk = models.CharField(
+        "object primary key", max_length=64, help_text="Primary key of the object."
+    )
+    operation = models.CharField(
+        max_length=10, choices=Operation.choices, help_text="Type of change."
+    )
+
+    class Meta:
+        verbose_name_plural = "change log entries"
+        ordering = ["sequence"]
+
+    def __str__(self):
+        return f"{self.sequence}: {self.operation} {self.entity} {self.object_pk}"
@@ -1,34 +1,98 @@
+from collections import defaultdict
+
 from django.core.exceptions import ValidationError
-from django.db import models, transaction
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import Case, Count, Max, Min, OuterRef, Subquery, Value, When
+from django.db.models.functions import Cast, Coalesce, Concat
 from django.urls import reverse
 from obapi import utils
+from obapi.aliases import alias_cache
 from obapi.modelfields import SimpleSlugField
+from obapi.models.changes import ChangeLogEntry
 
 CLASSIFIER_SLUG_MAX_LENGTH = 150
 
+# Prefix of the temporary names of objects which are being merged
+MERGING_PREFIX = " merging "
+
+
+def content_through(model):
+    """The through model between an aliased model and content items.
+
+    Returns
+    -------
+    through : Type[models.Model]
+    source : str
+        Name of the content item column.
+    target : str
+        Name of the aliased model column.
+    """
+    field = model.content.field
+    through = field.remote_field.through
+    source = through._meta.get_field(field.m2m_field_name()).attname
+    target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+    return through, source, target
+
 
 class AliasedModelQuerySet(models.QuerySet):
     def create_with_aliases(self, aliases=None, **kwargs):
         """Save an object with some aliases.
 
-        Assumes that the given aliases have been cleaned.
+        The aliases, including the protected alias of the object's slug, are inserted
+        with one query. Assumes that the given aliases have been cleaned.
         """
-        aliases = set(aliases)
-        with transaction.atomic():
-            new_object = self.create(**kwargs)
-            aliases.discard(new_object.slug)
-            for alias in aliases:
-                new_object.aliases.create(text=alias)
+        new_object = self.model(**kwargs)
+        new_object.clean()
+        aliases = set(aliases or ()) - {new_object.slug}
+        with transaction.atomic(using=self.db):
+            new_object.save(using=self.db, update_aliases=False)
+            alias_model = self.model.aliases.field.model
+            alias_model.objects.using(self.db).bulk_create(
+                [alias_model(owner=new_object, text=new_object.slug, protected=True)]
+                + [alias_model(owner=new_object, text=alias) for alias in aliases]
+            )
+        alias_cache.add_many(
+            self.model,
+            [(alias, new_object.pk) for alias in (new_object.slug, *aliases)],
+            using=self.db,
+        )
         return new_object
 
-    def merge_objects(self):
-        """Merge a QuerySet of objects."""
-        new_fields = {}
+    def find_name_conflicts(self, objects):
+        """Check the names of many objects against the alias table, with one query.
+
+        Parameters
+        ----------
+        objects : Iterable[AliasedModel]
+            Saved or unsaved objects.
 
-        # Make list of aliases
+        Returns
+        -------
+        List[Tuple[AliasedModel, str]]
+            The objects whose name is (or slugifies to) an alias of another object,
+            and the reason why.
+        """
+        objects = list(objects)
         alias_model = self.model.aliases.field.model
-        aliases_queryset = alias_model.objects.filter(owner__in=self)
-        aliases = set(aliases_queryset.values_list("text", flat=True))
+        conflicts = alias_model.objects.find_conflicts(
+            [(obj.name, obj.pk) for obj in objects]
+        )
+        return [
+            (obj, conflicts[(obj.name, obj.pk)])
+            for obj in objects
+            if (obj.name, obj.pk) in conflicts
+        ]
+
+    def merge_objects(self):
+        """Merge a QuerySet of objects.
+
+        The objects are replaced by a new object, which takes over their aliases and
+        related content. Alias and through-table rows are repointed to the new object
+        with a few ``UPDATE`` statements, so related content is not loaded.
+        """
+        new_fields = {}
+        old_objects = list(self)
+        old_pks = [obj.pk for obj in old_objects]
 
         # Use name of first object in QuerySet
         new_fields["name"] = self.first().name
@@ -39,27 +103,226 @@ class AliasedModelQuerySet(models.QuerySet):
         except AttributeError:
             pass
         else:
-            description_list = self.values_list("description", flat=True)
-            description = "/".join([desc for desc in description_list if desc != ""])
+            description = "/".join(
+                [obj.description for obj in old_objects if obj.description != ""]
+            )
             new_fields["description"] = description[0:max_length]
 
         with transaction.atomic():
-            # Collect related content
-            contentitem_field = self.model.content.field
-            items = list(
-                contentitem_field.model.objects.filter(
-                    **{f"{contentitem_field.name}__in": self}
-                ).distinct()
+            ChangeLogEntry.objects.record(ChangeLogEntry.Operation.MERGE, old_objects)
+            old_queryset = self.model.objects.filter(pk__in=old_pks)
+
+            # Free the unique name and slug of the old objects
+            temporary_name = Concat(
+                Value(MERGING_PREFIX), Cast("pk", models.CharField())
+            )
+            old_queryset.update(name=temporary_name, slug=temporary_name)
+            new_object = self.model(**new_fields)
+            # The protected alias still has its old owner, so is repointed below
+            new_object.save(update_aliases=False)
+
+            # Repoint aliases and related content to the new object
+            alias_model = self.model.aliases.field.model
+            alias_model.objects.filter(owner__in=old_pks).update(
+                owner=new_object,
+                protected=Case(
+                    When(text=new_object.slug, then=Value(True)),
+                    default=Value(False),
+                ),
+            )
+            new_object.aliases.get_or_create(
+                text=new_object.slug, defaults={"protected": True}
+            )
+            item_pks = self.model.objects.repoint_content(old_pks, new_object.pk)
+
+            old_queryset.delete()
+            self.model.objects.refresh_usage([new_object.pk])
+            new_object.refresh_from_db(fields=["item_count", "last_used"])
+            alias_cache.invalidate(self.model)
+            ChangeLogEntry.objects.record(ChangeLogEntry.Operation.CREATE, [new_object])
+            ChangeLogEntry.objects.record(
+                ChangeLogEntry.Operation.UPDATE,
+                self.model.content.field.model.objects.filter(pk__in=item_pks).only(
+                    "item_type"
+                ),
+            )
+
+        return new_object
+
+    def convert_objects(self, model):
+        """Convert a QuerySet of objects to another type.
+
+        New objects and their aliases are inserted in bulk, and related content is
+        moved with one bulk insert into the through table of `model`. Objects whose
+        name or aliases are already taken by objects of `model` are not converted.
+
+        Parameters
+        ----------
+        model : Type[AliasedModel]
+            The type to convert to.
+
+        Returns
+        -------
+        new_objects : List[AliasedModel]
+            The converted objects.
+        conflicts : Dict[AliasedModel, str]
+            The objects which could not be converted, and the reason why.
+        """
+        old_objects = list(self)
+        alias_model = self.model.aliases.field.model
+        new_alias_model = model.aliases.field.model
+        aliases = defaultdict(list)
+        for owner_pk, text in alias_model.objects.filter(
+            owner__in=[obj.pk for obj in old_objects]
+        ).values_list("owner_id", "text"):
+            aliases[owner_pk].append(text)
+
+        # Find objects which clash with existing objects of the new type
+        taken_names = set(
+            model.objects.filter(
+                name__in=[obj.name for obj in old_objects]
+            ).values_list("name", flat=True)
+        )
+        taken_aliases = set(
+            new_alias_model.objects.filter(
+                text__in=[text for texts in aliases.values() for text in texts]
+            ).values_list("text", flat=True)
+        )
+        conflicts = {}
+        converted_objects = []
+        for obj in old_objects:
+            if obj.name in taken_names:
+                conflicts[obj] = f"The name {obj.name!r} is already taken."
+            elif clashes := sorted(taken_aliases.intersection(aliases[obj.pk])):
+                conflicts[obj] = f"The aliases {clashes} are already taken."
+            else:
+                converted_objects.append(obj)
+        if not converted_objects:
+            return [], conflicts
+
+        new_objects = []
+        for obj in converted_objects:
+            new_object = model(name=obj.name)
+            if model.description:
+                new_object.description = obj.description or ""
+            new_object.clean()
+            new_objects.append(new_object)
+
+        with transaction.atomic(using=self.db):
+            if connections[self.db].features.can_return_rows_from_bulk_insert:
+                model.objects.bulk_create(new_objects)
+            else:
+                for new_object in new_objects:
+                    new_object.save(update_aliases=False)
+            new_alias_model.objects.bulk_create(
+                [
+                    new_alias_model(
+                        owner=new_object,
+                        text=text,
+                        protected=(text == new_object.slug),
+                    )
+                    for obj, new_object in zip(converted_objects, new_objects)
+                    for text in {new_object.slug, *aliases[obj.pk]}
+                ]
             )
 
-            # Delete old object, create new
-            self.delete()
-            new_object = self.create_with_aliases(aliases=aliases, **new_fields)
+            # Copy related content to the new objects
+            new_pks = {
+                obj.pk: new_object.pk
+                for obj, new_object in zip(converted_objects, new_objects)
+            }
+            old_through, old_source, old_target = content_through(self.model)
+            new_through, new_source, new_target = content_through(model)
+            rows = list(
+                old_through.objects.filter(
+                    **{f"{old_target}__in": new_pks}
+                ).values_list(old_source, old_target)
+            )
+            new_through.objects.bulk_create(
+                [
+                    new_through(**{new_source: item_pk, new_target: new_pks[owner_pk]})
+                    for item_pk, owner_pk in rows
+                ]
+            )
+
+            ChangeLogEntry.objects.record(
+                ChangeLogEntry.Operation.CONVERT, converted_objects
+            )
+            self.model.objects.filter(pk__in=new_pks).delete()
+            model.objects.refresh_usage(new_pks.values())
+            usage = {
+                pk: (item_count, last_used)
+                for pk, item_count, last_used in model.objects.filter(
+                    pk__in=new_pks.values()
+                ).values_list("pk", "item_count", "last_used")
+            }
+            for new_object in new_objects:
+                new_object.item_count, new_object.last_used = usage[new_object.pk]
+            alias_cache.invalidate(self.model)
+            alias_cache.invalidate(model)
+            ChangeLogEntry.objects.record(ChangeLogEntry.Operation.CREATE, new_objects)
+            ChangeLogEntry.objects.record(
+                ChangeLogEntry.Operation.UPDATE,
+                model.content.field.model.objects.filter(
+                    pk__in={item_pk for item_pk, _ in rows}
+                ).only("item_type"),
+            )
 
-            # Add related content
-            new_object.content.add(*items)
+        return new_objects, conflicts
 
-        return new_object
+    def refresh_usage(self, pks=None):
+        """Recompute the usage counters of objects from their related content.
+
+        Parameters
+        ----------
+        pks : Iterable[int] | None
+            Primary keys of the objects to refresh. Defaults to the whole QuerySet.
+
+        Returns
+        -------
+        int
+            The number of objects refreshed.
+        """
+        through, _, target = content_through(self.model)
+        item_name = self.model.content.field.m2m_field_name()
+        rows = (
+            through.objects.filter(**{target: OuterRef("pk")}).order_by().values(target)
+        )
+        queryset = self if pks is None else self.filter(pk__in=list(pks))
+        return queryset.update(
+            item_count=Coalesce(
+                Subquery(rows.annotate(count=Count("pk")).values("count")), 0
+            ),
+            last_used=Subquery(
+                rows.annotate(last=Max(f"{item_name}__publish_date")).values("last")
+            ),
+        )
+
+    def popular(self):
+        """Objects with the most related content first."""
+        return self.order_by("-item_count", "name")
+
+    def repoint_content(self, old_pks, new_pk):
+        """Move the related content of some objects to another object.
+
+        Through-table rows are updated in place. Where an item is related to more than
+        one of the objects, the extra rows are deleted first.
+
+        Returns
+        -------
+        QuerySet[int]
+            Primary keys of the items whose relations changed.
+        """
+        through, source, target = content_through(self.model)
+        rows = through.objects.filter(**{f"{target}__in": [*old_pks, new_pk]})
+
+        # Keep one row per item
+        kept_rows = (
+            rows.values(source).annotate(kept_pk=Min("pk")).values("kept_pk").order_by()
+        )
+        rows.exclude(pk__in=kept_rows).delete()
+        rows.filter(**{f"{target}__in": old_pks}).update(**{target: new_pk})
+        return through.objects.filter(**{target: new_pk}).values_list(source, flat=True)
 
 
 class AliasedModel(models.Model):
@@ -74,6 +337,19 @@ class AliasedModel(models.Model):
     description = models.CharField(
         max_length=100, help_text="Brief description.", blank=True
     )
+    item_count = models.PositiveIntegerField(
+        default=0,
+        db_index=True,
+        editable=False,
+        help_text="Number of related content items.",
+    )
+    last_used = models.DateTimeField(
+        "last used",
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Publish date of the most recent related content item.",
+    )
 
     class Meta:
         abstract = True
@@ -86,9 +362,25 @@ class AliasedModel(models.Model):
         self.slug = utils.to_slug(self.name, max_length=CLASSIFIER_SLUG_MAX_LENGTH)
         super().clean()
 
-    def save(self, *args, **kwargs):
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the saved slug, so aliases are only updated when it changes
+        instance._saved_slug = instance.__dict__.get("slug")
+        return instance
+
+    def save(self, *args, update_aliases=True, **kwargs):
         """Save an AliasedModel instance.
 
+        If the slug has changed, the alias of the new slug is created (if needed) and
+        protected, and other aliases are unprotected.
+
+        Parameters
+        ----------
+        update_aliases : bool
+            Whether to update aliases. If False, the caller is responsible for
+            creating the protected alias of the slug.
+
         Raises
         ------
         IntegrityError
@@ -96,15 +388,21 @@ class AliasedModel(models.Model):
         """
         # (1) Clean and set slug
         self.clean()
-        with transaction.atomic():
+        adding = self._state.adding
+        with transaction.atomic(using=kwargs.get("using")):
             # (2) Save model instance
             super().save(*args, **kwargs)
             # (3) Set and protect `slug` alias
-            self.aliases.all().update(protected=False)
-            self.aliases.update_or_create(
-                text=self.slug,
-                defaults={"protected": True},
-            )
+            if update_aliases and self.slug != getattr(self, "_saved_slug", None):
+                if adding:
+                    self.aliases.create(text=self.slug, protected=True)
+                else:
+                    self.aliases.filter(protected=True).update(protected=False)
+                    self.aliases.update_or_create(
+                        text=self.slug,
+                        defaults={"protected": True},
+                    )
+        self._saved_slug = self.slug
 
     def get_absolute_url(self):
         model_name = self._meta.verbose_name
@@ -118,45 +416,26 @@ class AliasedModel(models.Model):
         if exclude is not None and "text" in exclude:
             return
         # Raise error if there is a matching alias, and the match has a different pk
-        alias_model = self.aliases.model
-        try:
-            match = alias_model.objects.get(
-                text=utils.to_slug(self.name, max_length=CLASSIFIER_SLUG_MAX_LENGTH)
+        if type(self).objects.find_name_conflicts([self]):
+            self.refresh_from_db(fields=["name"])
+            raise ValidationError(
+                {"name": "The alias of this name is already taken."}, code="invalid"
             )
-        except alias_model.DoesNotExist:
-            return
-        else:
-            if match.owner != self:
-                self.refresh_from_db(fields=["name"])
-                raise ValidationError(
-                    {"name": "The alias of this name is already taken."}, code="invalid"
-                )
 
     def convert_object(self, model):
-        """Convert object to another type."""
-        with transaction.atomic():
-            # Initialise fields
-            new_fields = {
-                "name": self.name,
-                "aliases": self.aliases.values_list("text", flat=True),
-            }
-            if model.description:
-                if (old_description := self.description) is None:
-                    new_fields["description"] = ""
-                else:
-                    new_fields["description"] = old_description
-
-            # Create new object
-            new_object = model.objects.create_with_aliases(**new_fields)
+        """Convert object to another type.
 
-            # Update related content
-            items = self.content.all()
-            new_object.content.add(*items)
-
-            # Delete old object
-            self.delete()
-
-        return new_object
+        Raises
+        ------
+        IntegrityError
+            If the name or an alias of the object is taken by an object of `model`.
+        """
+        new_objects, conflicts = (
+            type(self).objects.filter(pk=self.pk).convert_objects(model)
+        )
+        if conflicts:
+            raise IntegrityError(conflicts[self])
+        return new_objects[0]
 
 
 class Author(AliasedModel):
@@ -175,6 +454,148 @@ class Tag(AliasedModel):
     description = None
 
 
+class AliasQuerySet(models.QuerySet):
+    def export_rows(self):
+        """The (owner name, alias text) of each unprotected alias.
+
+        Protected aliases are left out, since they are derived from owner names.
+        """
+        return list(
+            self.filter(protected=False)
+            .order_by("owner__name", "text")
+            .values_list("owner__name", "text")
+        )
+
+    def find_conflicts(self, rows, edited_pks=None):
+        """Check many candidate aliases for clashes, with one query.
+
+        A candidate clashes if its text is an alias of a different owner, or is given
+        for more than one owner.
+
+        Parameters
+        ----------
+        rows : Iterable[Tuple[str, int | None]]
+            The (alias text, owner primary key) of each candidate. Texts are
+            slugified before they are checked. The owner is None for owners which
+            have not been saved yet.
+        edited_pks : Collection[int] | None
+            If given, the candidates replace the aliases with these primary keys
+            (e.g. the rows of a form). A candidate then also clashes if its text is
+            any other alias of the same owner, such as its protected alias.
+
+        Returns
+        -------
+        Dict[Tuple[str, int | None], str]
+            The clashing candidates, and the reason why they clash.
+        """
+        owner_name = self.model.owner.field.related_model._meta.verbose_name
+        cleaned_rows = [
+            (row, utils.to_slug(row[0], max_length=CLASSIFIER_SLUG_MAX_LENGTH))
+            for row in rows
+        ]
+        existing_aliases = {
+            text: (owner_pk, pk)
+            for text, owner_pk, pk in self.model.objects.filter(
+                text__in={text for _, text in cleaned_rows}
+            ).values_list("text", "owner_id", "pk")
+        }
+        given_owners = {}
+        conflicts = {}
+        for row, text in cleaned_rows:
+            owner_pk = row[1]
+            existing_owner_pk, existing_pk = existing_aliases.get(
+                text, (owner_pk, None)
+            )
+            if existing_owner_pk != owner_pk:
+                conflicts[row] = f"{text!r} is an alias of another {owner_name}."
+            elif (
+                edited_pks is not None
+                and existing_pk is not None
+                and existing_pk not in edited_pks
+            ):
+                conflicts[row] = f"{text!r} is already an alias of this {owner_name}."
+            elif given_owners.setdefault(text, owner_pk) != owner_pk:
+                conflicts[row] = f"{text!r} is given for more than one {owner_name}."
+        return conflicts
+
+    def import_rows(self, rows, dry_run=False):
+        """Create aliases from (owner name, alias text) rows.
+
+        Owner names and alias texts are slugified, then checked against the existing
+        owners and aliases (see `find_conflicts`) in a few queries. Valid rows are
+        inserted with one ``bulk_create``. Rows for aliases which already exist are
+        skipped.
+
+        Parameters
+        ----------
+        rows : Iterable[Tuple[str, str]]
+            The rows to import. Owners may be given by name or slug.
+        dry_run : bool
+            Whether to check the rows without creating any aliases.
+
+        Returns
+        -------
+        new_aliases : List[Alias]
+            The created aliases.
+        conflicts : Dict[Tuple[str, str], str]
+            The rows which could not be imported, and the reason why.
+        """
+        owner_model = self.model.owner.field.related_model
+        owner_name = owner_model._meta.verbose_name
+        cleaned_rows = [
+            (
+                (owner, text),
+                utils.to_slug(owner, max_length=CLASSIFIER_SLUG_MAX_LENGTH),
+                utils.to_slug(text, max_length=CLASSIFIER_SLUG_MAX_LENGTH),
+            )
+            for owner, text in rows
+        ]
+        owners = dict(
+            owner_model.objects.filter(
+                slug__in={owner_slug for _, owner_slug, _ in cleaned_rows}
+            ).values_list("slug", "pk")
+        )
+        owned_rows = [
+            (row, text, owners[owner_slug])
+            for row, owner_slug, text in cleaned_rows
+            if text and owner_slug in owners
+        ]
+        alias_conflicts = self.find_conflicts(
+            [(text, owner_pk) for _, text, owner_pk in owned_rows]
+        )
+        existing_aliases = set(
+            self.model.objects.filter(
+                text__in=[text for _, text, _ in owned_rows]
+            ).values_list("text", flat=True)
+        )
+
+        conflicts = {}
+        new_aliases = {}
+        for row, owner_slug, text in cleaned_rows:
+            if not text:
+                conflicts[row] = "The alias is empty."
+            elif owner_slug not in owners:
+                conflicts[row] = f"There is no {owner_name} named {row[0]!r}."
+            elif (text, owners[owner_slug]) in alias_conflicts:
+                conflicts[row] = alias_conflicts[(text, owners[owner_slug])]
+            elif text not in existing_aliases:
+                new_aliases[text] = owners[owner_slug]
+
+        aliases = [
+            self.model(text=text, owner_id=owner_pk)
+            for text, owner_pk in new_aliases.items()
+        ]
+        if dry_run:
+            return aliases, conflicts
+        created = self.bulk_create(aliases)
+        alias_cache.add_many(
+            owner_model,
+            [(alias.text, alias.owner_id) for alias in created],
+            using=self.db,
+        )
+        return created, conflicts
+
+
 class Alias(models.Model):
     """Base class for models which represent aliases of other models.
 
@@ -192,6 +613,8 @@ class Alias(models.Model):
     )
     owner = None
 
+    objects = AliasQuerySet.as_manager()
+
     class Meta:
         abstract = True
         verbose_name_plural = "aliases"
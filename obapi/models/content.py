@@ -1,9 +1,15 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
 from django.conf import settings
-from django.db import models, transaction
-from django.db.models import F, Q
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, models, router, transaction
+from django.db.models import F
 from django.urls import reverse
 from model_utils.managers import InheritanceQuerySet
-from obapi import utils
+from obapi import search, utils
+from obapi.aliases import alias_cache
 from obapi.assemble import (
     assemble_essay_content_items,
     assemble_ob_content_items,
@@ -16,18 +22,27 @@ from obapi.converters import (
     OBPostLongURLConverter,
     OBPostShortURLConverter,
     SpotifyEpisodeURLConverter,
+    URLRouter,
     YoutubeVideoURLConverter,
 )
+from obapi.locks import exclusive_operation
+from obapi.modelfields import CompressedTextField
 from obapi.models import (
     CLASSIFIER_SLUG_MAX_LENGTH,
+    AliasedModel,
     Author,
     ExternalLink,
     Idea,
     Tag,
     Topic,
 )
+from obapi.models.changes import ChangeLogEntry, Counter
+from obapi.models.ingest import IngestJob
+
+DOWNLOAD_BATCH_SIZE = getattr(settings, "OBAPI_DOWNLOAD_BATCH_SIZE", 500)
 
-DOWNLOAD_BATCH_SIZE = getattr(settings, "OBAPI_DOWNLOAD_BATCH_SIZE", 10000)
+# Name of the counter which hands out change sequence numbers to content items
+CHANGE_SEQUENCE_COUNTER = "obapi.contentitem.change_sequence"
 
 
 class ContentItemQuerySet(InheritanceQuerySet):
@@ -35,103 +50,455 @@ class ContentItemQuerySet(InheritanceQuerySet):
 
     # Converter from URLs to item IDs
     url_converters = ()
+    # URL routers for each model, shared by all QuerySets
+    _url_routers = {}
+
+    # Large text fields, which are not loaded by default
+    body_fields = ()
+
+    # ManyToMany relations which are set from assembled item data
+    relation_names = ("authors", "ideas", "topics", "tags", "external_links")
+
+    # Assembled data which does not count towards the content fingerprint
+    fingerprint_exclude = ("download_timestamp",)
 
     def save_item(self, item=None, **kwargs):
         """Create a new item or update an existing item."""
-        adding = item is None
-        author_names = kwargs.pop("author_names", None)
-        classifier_names = kwargs.pop("classifier_names", None)
-        link_urls = kwargs.pop("link_urls", None)
+        return self.save_items([item], [kwargs])[0]
+
+    def save_items(self, items, items_data):
+        """Create new items or update existing items.
+
+        Parameters
+        ----------
+        items : List[ContentItem | None]
+            Items to update. New items are created where an item is None.
+        items_data : List[dict]
+            Assembled data for each item.
+
+        Returns
+        -------
+        List[ContentItem]
+        """
+        # Pick up alias changes made by other processes
+        alias_cache.refresh()
+        alias_cache.preload([Author, Idea, Topic, Tag])
+        try:
+            return self._save_items(items, items_data)
+        except Exception:
+            # The cache may hold aliases which were rolled back
+            alias_cache.clear()
+            raise
+
+    def _save_items(self, items, items_data):
+        saved_items = []
+        new_items = []
+        changed_items = []
+        related_names = []
         with transaction.atomic():
-            # Update or create object
-            if adding:
-                item = self.create(**kwargs)
-            else:
-                for attr, value in kwargs.items():
-                    setattr(item, attr, value)
-                item.save()
-            # Set ManyToMany related objects: authors, classifiers, links
-            authors = self.get_or_create_authors_by_names(author_names)
-            ideas, topics, tags = self.get_or_create_classifiers_by_names(
-                classifier_names
+            # Update or create objects
+            for item, item_data in zip(items, items_data):
+                item_data = dict(item_data)
+                content_fingerprint = utils.fingerprint(
+                    item_data, exclude=self.fingerprint_exclude
+                )
+                related_names.append(
+                    (
+                        item_data.pop("author_names", None),
+                        item_data.pop("classifier_names", None),
+                        item_data.pop("link_urls", None),
+                    )
+                )
+                if item is None:
+                    item = self.model(**item_data)
+                    new_items.append(item)
+                else:
+                    for attr, value in item_data.items():
+                        setattr(item, attr, value)
+                if item.content_fingerprint != content_fingerprint:
+                    item.content_fingerprint = content_fingerprint
+                    changed_items.append(item)
+                saved_items.append(item)
+
+            # Give changed items new change sequence numbers
+            if changed_items:
+                last_sequence = Counter.objects.using(self.db).increment(
+                    CHANGE_SEQUENCE_COUNTER, len(changed_items)
+                )
+                first_sequence = last_sequence - len(changed_items) + 1
+                for sequence, item in enumerate(changed_items, start=first_sequence):
+                    item.change_sequence = sequence
+
+            updated_items = [item for item in changed_items if not item._state.adding]
+            for item in saved_items:
+                if not item._state.adding:
+                    item.save()
+            self.bulk_create_inherited(new_items)
+            ChangeLogEntry.objects.record(ChangeLogEntry.Operation.CREATE, new_items)
+            ChangeLogEntry.objects.record(
+                ChangeLogEntry.Operation.UPDATE, updated_items
+            )
+
+            # Collect ManyToMany related objects: authors, classifiers, links
+            relations = {attr: {} for attr in self.relation_names}
+            relinked_item_pks = set()
+            link_pks = self.get_or_create_external_link_pks(
+                link_url
+                for _, _, link_urls in related_names
+                for link_url in link_urls or ()
+            )
+            url_max_length = ExternalLink._meta.get_field("url").max_length
+            # Classifiers created in this transaction, which are not cached yet
+            pending_aliases = {}
+            for item, (author_names, classifier_names, link_urls) in zip(
+                saved_items, related_names
+            ):
+                authors = self.get_or_create_author_pks_by_names(
+                    author_names, pending=pending_aliases
+                )
+                ideas, topics, tags = self.get_or_create_classifier_pks_by_names(
+                    classifier_names, pending=pending_aliases
+                ) or (None, None, None)
+                relationship_attributes = {
+                    "authors": authors,
+                    "ideas": ideas,
+                    "topics": topics,
+                    "tags": tags,
+                    "external_links": (
+                        None
+                        if link_urls is None
+                        else [
+                            link_pks[link_url[:url_max_length]]
+                            for link_url in link_urls
+                        ]
+                    ),
+                }
+                for attr, value in relationship_attributes.items():
+                    if value is not None:
+                        relations[attr][item.pk] = value
+                if link_urls is not None:
+                    relinked_item_pks.add(item.pk)
+            # Clear old values, set new values
+            self.bulk_set_relations(relations)
+            # Only clear internal links if new external links are added
+            ContentItem.objects.filter(pk__in=relinked_item_pks).internalize_links(
+                clear=True
+            )
+            ContentItem.objects.filter(
+                pk__in=[
+                    item.pk for item in saved_items if item.pk not in relinked_item_pks
+                ]
+            ).internalize_links(clear=False)
+            search.index_items(changed_items, using=self.db)
+        return saved_items
+
+    def bulk_create_inherited(self, objs, batch_size=None):
+        """Insert objects of a (possibly multi-table inherited) model in bulk.
+
+        Django's ``bulk_create`` refuses models with concrete parents. Instead, the
+        rows of the root model are inserted with ``bulk_create``, which sets the
+        primary keys of the objects on databases which can return rows from bulk
+        inserts (e.g. PostgreSQL and SQLite 3.35+). The rows of each child table are
+        then inserted in batches, from the top of the hierarchy down.
+        On other databases, objects are saved one at a time.
+
+        Like ``bulk_create``, this does not call ``save()`` or send the ``pre_save``
+        and ``post_save`` signals.
+
+        Returns
+        -------
+        List[ContentItem]
+            The inserted objects, with their primary keys set.
+        """
+        objs = list(objs)
+        if not objs:
+            return objs
+        connection = connections[self.db]
+        if not connection.features.can_return_rows_from_bulk_insert:
+            for obj in objs:
+                obj.save(force_insert=True, using=self.db)
+            return objs
+
+        for obj in objs:
+            if not obj.item_type:
+                obj.item_type = obj._meta.label_lower
+
+        # Models in the inheritance chain, starting from the root
+        chain = [*reversed(self.model._meta.get_parent_list()), self.model]
+        with transaction.atomic(using=self.db, savepoint=False):
+            chain[0]._base_manager.using(self.db).bulk_create(
+                objs, batch_size=batch_size
             )
-            external_links = self.get_or_create_external_links_by_urls(link_urls)
-            relationship_attributes = {
-                "authors": authors,
-                "ideas": ideas,
-                "topics": topics,
-                "tags": tags,
-                "external_links": external_links,
+            for parent, child in zip(chain, chain[1:]):
+                # Point child rows to their parent rows
+                parent_link = child._meta.parents[parent]
+                for obj in objs:
+                    setattr(obj, parent_link.attname, obj._get_pk_val(parent._meta))
+                fields = child._meta.local_concrete_fields
+                child_batch_size = batch_size or max(
+                    connection.ops.bulk_batch_size(fields, objs), 1
+                )
+                for objs_chunk in utils.chunk_iterator(objs, child_batch_size):
+                    child._base_manager._insert(
+                        objs_chunk, fields=fields, using=self.db
+                    )
+        for obj in objs:
+            obj._state.adding = False
+            obj._state.db = self.db
+        return objs
+
+    def delete(self):
+        """Delete the items in the QuerySet.
+
+        The change log, the usage counters of the items' classifiers and the search
+        index are updated for all items at once, in the same transaction.
+        """
+        with transaction.atomic(using=self.db):
+            deletion = self.prepare_delete()
+            result = super().delete()
+            self.finish_delete(deletion)
+        return result
+
+    def prepare_delete(self):
+        """Collect what must be updated when the items in the QuerySet are deleted.
+
+        Returns
+        -------
+        Tuple[List[ContentItem], Dict[Type[AliasedModel], List[int]]]
+            The items, with only their types loaded, and the primary keys of the
+            classifiers of each type which are related to the items.
+        """
+        item_pks = self.values("pk")
+        items = list(
+            ContentItem.objects.using(self.db).filter(pk__in=item_pks).only("item_type")
+        )
+        classifier_pks = {
+            model: list(
+                model.objects.using(self.db)
+                .filter(content__in=item_pks)
+                .values_list("pk", flat=True)
+                .distinct()
+            )
+            for model in (Author, Idea, Topic, Tag)
+        }
+        return items, classifier_pks
+
+    def finish_delete(self, deletion):
+        """Update the change log, usage counters and search index after a delete.
+
+        `deletion` is the value returned by `prepare_delete`, before the delete.
+        """
+        items, classifier_pks = deletion
+        ChangeLogEntry.objects.using(self.db).record(
+            ChangeLogEntry.Operation.DELETE, items
+        )
+        for model, pks in classifier_pks.items():
+            if pks:
+                model.objects.using(self.db).refresh_usage(pks)
+        search.remove_items([item.pk for item in items], using=self.db)
+
+    def bulk_set_relations(self, relations):
+        """Set the ManyToMany relations of many items at once.
+
+        Equivalent to calling ``getattr(item, attr).set(pks)`` for every item, but
+        uses a fixed number of queries per relation: one to read the existing
+        through-table rows, one bulk insert and one bulk delete. The usage counters
+        of related classifiers (e.g. tags) are then refreshed with one update.
+        The ``m2m_changed`` signal is not sent.
+
+        Parameters
+        ----------
+        relations : Dict[str, Dict[int, List[int]]]
+            Maps relation names (e.g. "tags") to dictionaries which map item primary
+            keys to the primary keys of their related objects.
+        """
+        for attr, related_pks in relations.items():
+            if not related_pks:
+                continue
+            field = self.model._meta.get_field(attr)
+            through = field.remote_field.through
+            source = through._meta.get_field(field.m2m_field_name()).attname
+            target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+
+            desired_rows = {
+                (item_pk, target_pk)
+                for item_pk, target_pks in related_pks.items()
+                for target_pk in target_pks
+            }
+            existing_rows = {
+                (item_pk, target_pk): row_pk
+                for row_pk, item_pk, target_pk in through.objects.filter(
+                    **{f"{source}__in": list(related_pks)}
+                ).values_list("pk", source, target)
             }
-            for attr, value in relationship_attributes.items():
-                if value is not None:
-                    # Clear old values, set new values
-                    getattr(item, attr).set(value)
-            # Only internalize links if some are added
-            item.internalize_links(clear=external_links is not None)
-        return item
+
+            through.objects.bulk_create(
+                [
+                    through(**{source: item_pk, target: target_pk})
+                    for item_pk, target_pk in desired_rows - existing_rows.keys()
+                ],
+                ignore_conflicts=True,
+            )
+            stale_row_pks = [
+                row_pk
+                for row, row_pk in existing_rows.items()
+                if row not in desired_rows
+            ]
+            if stale_row_pks:
+                through.objects.filter(pk__in=stale_row_pks).delete()
+
+            if issubclass(field.related_model, AliasedModel):
+                field.related_model.objects.refresh_usage(
+                    {target_pk for _, target_pk in desired_rows | existing_rows.keys()}
+                )
 
     def get_or_create_authors_by_names(self, author_names):
         """Get or create a list of authors from some names."""
-        if author_names is None:
+        author_pks = self.get_or_create_author_pks_by_names(author_names)
+        if author_pks is None:
             return None
-        with transaction.atomic():
-            # Match by alias
-            authors = [
-                Author.objects.get_or_create(
-                    alias__text=utils.to_slug(
-                        author_name, max_length=CLASSIFIER_SLUG_MAX_LENGTH
-                    ),
-                    defaults={"name": author_name},
-                )
-                for author_name in author_names
-            ]
-            return [author[0] for author in authors]
+        authors = Author.objects.in_bulk(author_pks)
+        return [authors[pk] for pk in author_pks]
 
     def get_or_create_classifiers_by_names(self, classifier_names):
         """Get or create a list of ideas, topics and tags from some names."""
-        if classifier_names is None:
+        classifier_pks = self.get_or_create_classifier_pks_by_names(classifier_names)
+        if classifier_pks is None:
             return None, None, None
-        ideas = []
-        topics = []
-        tags = []
+        classifiers = []
+        for model, pks in zip((Idea, Topic, Tag), classifier_pks):
+            objects = model.objects.in_bulk(pks)
+            classifiers.append([objects[pk] for pk in pks])
+        return tuple(classifiers)
+
+    def get_or_create_author_pks_by_names(self, author_names, pending=None):
+        """Get or create authors from some names, and return their primary keys.
+
+        Names are matched to authors by alias, using the alias cache. The cache only
+        holds new aliases once their transaction commits, so within a transaction,
+        pass the same `pending` dictionary to each call: it maps (model, alias text)
+        to the primary keys of classifiers looked up so far.
+        """
+        if author_names is None:
+            return None
+        if pending is None:
+            pending = {}
+        author_pks = []
+        with transaction.atomic():
+            for author_name in author_names:
+                slug = utils.to_slug(author_name, max_length=CLASSIFIER_SLUG_MAX_LENGTH)
+                author_pk = alias_cache.get(Author, slug)
+                if author_pk is None:
+                    author_pk = pending.get((Author, slug))
+                if author_pk is None:
+                    author_pk = Author.objects.get_or_create(
+                        alias__text=slug, defaults={"name": author_name}
+                    )[0].pk
+                    alias_cache.add(Author, slug, author_pk, using=self.db)
+                    pending[(Author, slug)] = author_pk
+                author_pks.append(author_pk)
+        return author_pks
+
+    def get_or_create_classifier_pks_by_names(self, classifier_names, pending=None):
+        """Get or create ideas, topics and tags from some names, and return their
+        primary keys.
+
+        Names are matched by alias, using the alias cache (and `pending`, see
+        `get_or_create_author_pks_by_names`). A name is matched to an idea if
+        possible, then a topic, then a tag. If there is no match, a new tag is
+        created.
+
+        Returns
+        -------
+        Tuple[List[int], List[int], List[int]] | None
+            Primary keys of the ideas, topics and tags.
+        """
+        if classifier_names is None:
+            return None
+        if pending is None:
+            pending = {}
+        pks = {Idea: [], Topic: [], Tag: []}
         with transaction.atomic():
             for classifier_name in classifier_names:
-                # Match by alias
-                query = Q(
-                    alias__text=utils.to_slug(
-                        classifier_name, max_length=CLASSIFIER_SLUG_MAX_LENGTH
-                    )
-                )
-                try:
-                    ideas.append(Idea.objects.get(query))
-                    continue
-                except Idea.DoesNotExist:
-                    pass
-                # If that fails, try to get topic with alias = classifier_name
-                try:
-                    topics.append(Topic.objects.get(query))
-                    continue
-                except Topic.DoesNotExist:
-                    pass
-                # If that fails, try to get a tag with alias = classifier_name
-                # If no such tag exists, create a new one
-                tags.append(
-                    Tag.objects.filter(query).get_or_create(
-                        defaults={"name": classifier_name},
-                    )[0]
+                slug = utils.to_slug(
+                    classifier_name, max_length=CLASSIFIER_SLUG_MAX_LENGTH
                 )
-        return ideas, topics, tags
+                for model in (Idea, Topic, Tag):
+                    classifier_pk = alias_cache.get(model, slug)
+                    if classifier_pk is None:
+                        classifier_pk = pending.get((model, slug))
+                    if classifier_pk is not None:
+                        break
+                else:
+                    # Not cached: look up (or create) the classifier in the database
+                    model, classifier_pk = self._get_or_create_classifier_pk(
+                        classifier_name, slug
+                    )
+                    alias_cache.add(model, slug, classifier_pk, using=self.db)
+                    pending[(model, slug)] = classifier_pk
+                pks[model].append(classifier_pk)
+        return pks[Idea], pks[Topic], pks[Tag]
+
+    def _get_or_create_classifier_pk(self, classifier_name, slug):
+        for model in (Idea, Topic):
+            classifier_pk = (
+                model.objects.filter(alias__text=slug)
+                .values_list("pk", flat=True)
+                .first()
+            )
+            if classifier_pk is not None:
+                return model, classifier_pk
+        tag = Tag.objects.get_or_create(
+            alias__text=slug, defaults={"name": classifier_name}
+        )[0]
+        return Tag, tag.pk
 
     def get_or_create_external_links_by_urls(self, link_urls):
+        """Get or create a list of external links from their URLs."""
         if link_urls is None:
             return None
+        link_pks = self.get_or_create_external_link_pks(link_urls)
         url_max_length = ExternalLink._meta.get_field("url").max_length
-        with transaction.atomic():
-            return [
-                ExternalLink.objects.get_or_create(url=link_url[:url_max_length])[0]
-                for link_url in link_urls
-            ]
+        links = ExternalLink.objects.in_bulk(link_pks.values())
+        return [links[link_pks[link_url[:url_max_length]]] for link_url in link_urls]
+
+    def get_or_create_external_link_pks(self, link_urls):
+        """Get or create external links from some URLs, in bulk.
+
+        Existing links are found with one query per chunk of URLs, and missing links
+        are created with `bulk_create`. URLs are truncated to the maximum length of
+        `ExternalLink.url`.
+
+        Returns
+        -------
+        Dict[str, int]
+            Maps each (truncated) URL to the primary key of its link.
+        """
+        url_max_length = ExternalLink._meta.get_field("url").max_length
+        urls = list(dict.fromkeys(link_url[:url_max_length] for link_url in link_urls))
+        links = ExternalLink.objects.using(self.db)
+        link_pks = {}
+        for urls_chunk in utils.chunk_iterator(urls, 500):
+            for url, pk in (
+                links.filter(url__in=urls_chunk)
+                .order_by("-pk")
+                .values_list("url", "pk")
+            ):
+                # Use the oldest link if there are duplicates
+                link_pks[url] = pk
+        new_links = links.bulk_create(
+            [ExternalLink(url=url) for url in urls if url not in link_pks]
+        )
+        if new_links and new_links[0].pk is None:
+            # The database cannot return primary keys from bulk inserts
+            new_urls = [link.url for link in new_links]
+            for urls_chunk in utils.chunk_iterator(new_urls, 500):
+                link_pks.update(
+                    links.filter(url__in=urls_chunk).values_list("url", "pk")
+                )
+        else:
+            link_pks.update((link.url, link.pk) for link in new_links)
+        return link_pks
 
     def assemble_items(self, item_ids=None):
         """Assemble items in QuerySet or from their item IDs."""
@@ -160,28 +527,37 @@ class ContentItemQuerySet(InheritanceQuerySet):
         # Assemble data
         assembled_items = self.assemble_items(item_ids)
 
-        # Save items
-        created_items = []
-        with transaction.atomic():
-            for item_data in assembled_items:
-                if item_data is not None:
-                    created_items.append(self.save_item(item=None, **item_data))
-                else:
-                    created_items.append(None)
-        return created_items
+        # Save items, skipping those which could not be assembled
+        items_data = [
+            item_data for item_data in assembled_items if item_data is not None
+        ]
+        saved_items = iter(self.save_items([None] * len(items_data), items_data))
+        return [
+            next(saved_items) if item_data is not None else None
+            for item_data in assembled_items
+        ]
 
-    def bulk_create_items(self, item_ids, batch_size=DOWNLOAD_BATCH_SIZE):
+    def bulk_create_items(
+        self, item_ids, batch_size=DOWNLOAD_BATCH_SIZE, progress=None, workers=1
+    ):
         """Create items from their IDs, in batches.
 
+        Runs an `IngestJob`, which saves each batch in its own transaction. If some
+        batches fail, the job can be resumed with `IngestJob.run`.
+
         Returns
         -------
         The number of created items.
+
+        Raises
+        ------
+        IngestFailed
+            If some batches failed. Items in the other batches are still saved.
         """
-        created_count = 0
-        for item_ids_chunk in utils.chunk_iterator(item_ids, batch_size):
-            created_items = self.create_items(item_ids_chunk)
-            created_count += sum(item is not None for item in created_items)
-        return created_count
+        job = IngestJob.objects.using(self.db).plan(self.model, item_ids, batch_size)
+        job.run(progress=progress, workers=workers)
+        job.raise_for_status()
+        return job.created_count
 
     def update_items(self, exclude=None):
         """Update items in QuerySet, excluding certain fields.
@@ -201,17 +577,109 @@ class ContentItemQuerySet(InheritanceQuerySet):
             for attr in exclude:
                 new_item.pop(attr, None)
 
-        # Save items
-        updated_items = []
-        with transaction.atomic():
-            for item, item_data in zip(self, assembled_items):
-                if item_data is not None:
-                    updated_item = self.save_item(item=item, **item_data)
-                    updated_items.append((updated_item, True))
-                else:
-                    # Item assemble failed - return original item
-                    updated_items.append((item, False))
-        return updated_items
+        # Save items, skipping those which could not be assembled
+        assembled_pairs = [
+            (item, item_data)
+            for item, item_data in zip(self, assembled_items)
+            if item_data is not None
+        ]
+        saved_items = iter(
+            self.save_items(
+                [item for item, _ in assembled_pairs],
+                [item_data for _, item_data in assembled_pairs],
+            )
+        )
+        # Return original item if item assemble failed
+        return [
+            (next(saved_items), True) if item_data is not None else (item, False)
+            for item, item_data in zip(self, assembled_items)
+        ]
+
+    def bulk_update_items(
+        self,
+        batch_size=DOWNLOAD_BATCH_SIZE,
+        workers=1,
+        exclude=None,
+        checkpoint=None,
+        progress=None,
+    ):
+        """Update items in QuerySet in batches, in order of primary key.
+
+        Each batch is saved in its own transaction.
+
+        Parameters
+        ----------
+        batch_size : int
+            The number of items downloaded and saved at once.
+        workers : int
+            The number of batches to download at once, in separate threads. Batches
+            are always saved one at a time, in order.
+        exclude : List[str] | None
+            Fields which are not updated.
+        checkpoint : str | None
+            Name of a `Counter` which records the primary key of the last item saved.
+            If given, items up to the checkpoint are skipped, so an interrupted update
+            can be resumed. The checkpoint is reset once all items are updated.
+        progress : Callable[[int, int], None] | None
+            Called with the number of batches saved so far, and the number of batches
+            in total, after each batch.
+
+        Returns
+        -------
+        int
+            The number of items updated.
+        """
+        if exclude is None:
+            exclude = []
+        counters = Counter.objects.using(self.db)
+        queryset = self.order_by("pk")
+        if checkpoint is not None:
+            queryset = queryset.filter(pk__gt=counters.get_value(checkpoint))
+        batches = list(
+            utils.chunk_iterator(
+                list(queryset.values_list("pk", "item_id")), batch_size
+            )
+        )
+
+        updated_count = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for window_start in range(0, len(batches), workers):
+                window = batches[window_start : window_start + workers]
+                downloads = [
+                    executor.submit(
+                        type(self).assemble_by_ids, [item_id for _, item_id in batch]
+                    )
+                    for batch in window
+                ]
+                for batch_count, (batch, download) in enumerate(
+                    zip(window, downloads), start=window_start + 1
+                ):
+                    # Pair items with their data, skipping those which could not be
+                    # assembled
+                    items = self.in_bulk([pk for pk, _ in batch])
+                    assembled_pairs = [
+                        (items[pk], item_data)
+                        for (pk, _), item_data in zip(batch, download.result())
+                        if item_data is not None and pk in items
+                    ]
+                    for _, item_data in assembled_pairs:
+                        for attr in exclude:
+                            item_data.pop(attr, None)
+
+                    with transaction.atomic(using=self.db):
+                        self.save_items(
+                            [item for item, _ in assembled_pairs],
+                            [item_data for _, item_data in assembled_pairs],
+                        )
+                        if checkpoint is not None:
+                            counters.set_value(checkpoint, batch[-1][0])
+                    updated_count += len(assembled_pairs)
+                    if progress is not None:
+                        progress(batch_count, len(batches))
+
+        if checkpoint is not None:
+            counters.set_value(checkpoint, 0)
+        return updated_count
 
     def find_by_url(self, url):
         """Find a ContentItem by its URL.
@@ -223,21 +691,118 @@ class ContentItemQuerySet(InheritanceQuerySet):
         ContentItem.DoesNotExist
             If the URL matches a recognised pattern but no ContentItem is found.
         """
-        # Try to use get_by_url for current class (if implemented)
+        model, field, item_id = self.parse_url(url)
+        return model.objects.get(**{field: item_id})
+
+    def parse_url(self, url):
+        """Convert a URL to a `(model, field, item_id)` tuple.
+
+        Uses the URL converters of the current class and its subclasses.
+
+        Raises
+        ------
+        ValueError
+            If the URL does not match any recognised pattern.
+        """
         try:
-            return self.get_by_url(url)
+            (model, field), item_id = self.get_url_router().resolve(url)
         except ValueError:
-            # Don't catch Model.DoesNotExist
+            raise ValueError(
+                f"URL did not match any known format for type {type(self)}"
+            ) from None
+        return model, field, item_id
+
+    def get_url_router(self):
+        """Get the URL router for the current class and its subclasses.
+
+        The router is built on first use, and then cached.
+        """
+        try:
+            return self._url_routers[self.model]
+        except KeyError:
             pass
 
-        # Otherwise try find_by_url methods of subclasses
-        for model in self.model.__subclasses__():
-            try:
-                return model.objects.find_by_url(url)
-            except ValueError:
-                pass
-            # Don't catch model.DoesNotExist
-        raise ValueError  # URL did not match any ContentItem URL format
+        def model_and_subclasses(model):
+            yield model
+            for subclass in model.__subclasses__():
+                yield from model_and_subclasses(subclass)
+
+        router = URLRouter(
+            ((model, field), converter)
+            for model in model_and_subclasses(self.model)
+            for converter, field in model.objects._queryset_class.url_converters
+        )
+        self._url_routers[self.model] = router
+        return router
+
+    def internalize_links(self, clear=False):
+        """Try to make the external links of items in the QuerySet internal.
+
+        All external link URLs are parsed in one pass, and the content items they
+        refer to are found with one query per content type. Matching links are then
+        moved from `external_links` to `internal_links` in bulk.
+
+        Parameters
+        ----------
+        clear : bool
+            Whether to clear existing internal links.
+
+        Returns
+        -------
+        int
+            The number of links which were made internal.
+        """
+        item_pks = self.values("pk")
+        external_through = ContentItem.external_links.through
+        internal_through = ContentItem.internal_links.through
+        with transaction.atomic():
+            if clear:
+                internal_through.objects.filter(
+                    from_contentitem_id__in=item_pks
+                ).delete()
+            link_rows = external_through.objects.filter(
+                contentitem_id__in=item_pks
+            ).values_list("pk", "contentitem_id", "externallink__url")
+
+            # Convert URLs to (model, field, item_id) keys
+            url_keys = {}
+            lookups = defaultdict(set)
+            for _, _, url in link_rows:
+                if url in url_keys:
+                    continue
+                try:
+                    model, field, item_id = ContentItem.objects.parse_url(url)
+                except ValueError:
+                    url_keys[url] = None
+                else:
+                    url_keys[url] = (model, field, item_id)
+                    lookups[(model, field)].add(item_id)
+
+            # Find matching items, with one query per content type
+            matches = {}
+            for (model, field), item_ids in lookups.items():
+                for pk, item_id in model.objects.filter(
+                    **{f"{field}__in": item_ids}
+                ).values_list("pk", field):
+                    matches[(model, field, str(item_id))] = pk
+
+            # Move matching links
+            moved_row_pks = []
+            internal_links = []
+            for row_pk, item_pk, url in link_rows:
+                if (match_pk := matches.get(url_keys[url])) is not None:
+                    moved_row_pks.append(row_pk)
+                    internal_links.append(
+                        internal_through(
+                            from_contentitem_id=item_pk, to_contentitem_id=match_pk
+                        )
+                    )
+            if moved_row_pks:
+                external_through.objects.filter(pk__in=moved_row_pks).delete()
+                internal_through.objects.bulk_create(
+                    internal_links, ignore_conflicts=True
+                )
+        return len(moved_row_pks)
 
     def get_by_url(self, url):
         """Get a ContentItem by its URL.
@@ -259,11 +824,123 @@ class ContentItemQuerySet(InheritanceQuerySet):
                 return self.get(**{field: item_id})
         raise ValueError(f"URL did not match any known format for type {type(self)}")
 
+    def with_bodies(self):
+        """Load the large text fields, which are deferred by default."""
+        return self.defer(None)
+
+    def load_concrete(self, with_bodies=False):
+        """Load items as instances of their concrete models, preserving order.
+
+        Unlike `select_subclasses`, which joins every subclass table, this uses one
+        query to read the item types and then one query per type.
+
+        Parameters
+        ----------
+        with_bodies : bool
+            Whether to load the large text fields of the items.
+
+        Returns
+        -------
+        List[ContentItem]
+        """
+        item_types = list(self.values_list("pk", "item_type"))
+        pks_by_type = defaultdict(list)
+        for pk, item_type in item_types:
+            pks_by_type[item_type].append(pk)
+        items = {}
+        for item_type, pks in pks_by_type.items():
+            queryset = apps.get_model(item_type).objects.all()
+            if with_bodies:
+                queryset = queryset.with_bodies()
+            items.update(queryset.in_bulk(pks))
+        return [items[pk] for pk, _ in item_types]
+
+    def search(self, query, limit=20):
+        """Full-text search the items in the QuerySet.
+
+        Returns
+        -------
+        List[ContentItem]
+            The best matching items, best first. Each item has a `search_rank`
+            (higher is better) and a `search_snippet` (an HTML fragment of the
+            matching text).
+
+        Raises
+        ------
+        NotSupportedError
+            If the database does not support full-text search.
+        """
+        results = search.search(
+            query,
+            limit,
+            restrict=self.values("pk").query.sql_with_params(),
+            using=self.db,
+        )
+        items = self.in_bulk([pk for pk, _, _ in results])
+        for pk, rank, snippet in results:
+            items[pk].search_rank = rank
+            items[pk].search_snippet = snippet
+        return [items[pk] for pk, _, _ in results]
+
+    def changed_since(self, sequence):
+        """Items changed by `save_items` after a change sequence number.
+
+        Items are ordered by change sequence number, so the last item in a batch
+        gives the position to continue from.
+        """
+        return self.filter(change_sequence__gt=sequence).order_by("change_sequence")
+
+    def process_changes(self, consumer, process, batch_size=1000):
+        """Pass items changed since a consumer's last run to a function.
+
+        The position of each consumer (e.g. a derived-index builder) is stored in a
+        `Counter`, which is advanced in the same transaction as each batch is
+        processed. So a consumer which fails part-way resumes from its last
+        complete batch.
+
+        Parameters
+        ----------
+        consumer : str
+            A unique name for the consumer.
+        process : Callable[[List[ContentItem]], None]
+            Function which processes a batch of changed items.
+        batch_size : int
+            The maximum number of items passed to `process` at once.
+
+        Returns
+        -------
+        int
+            The number of items processed.
+        """
+        counters = Counter.objects.using(self.db)
+        checkpoint = counters.get_value(consumer)
+        processed = 0
+        while batch := list(self.changed_since(checkpoint)[:batch_size]):
+            with transaction.atomic(using=self.db):
+                process(batch)
+                checkpoint = batch[-1].change_sequence
+                counters.set_value(consumer, checkpoint)
+            processed += len(batch)
+        return processed
+
     def recent(self):
         """Return all content items sorted by publish date."""
         return self.order_by("-publish_date")
 
 
+class ContentItemManager(models.Manager):
+    """Manager which defers loading the large text fields of content items.
+
+    Use `with_bodies` to load them.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if queryset.body_fields:
+            queryset = queryset.defer(*queryset.body_fields)
+        return queryset
+
+
 class ContentItem(models.Model):
     objects = ContentItemQuerySet.as_manager()
 
@@ -280,8 +957,30 @@ class ContentItem(models.Model):
         help_text="When the item was last downloaded.",
     )
 
+    item_type = models.CharField(
+        "content type",
+        max_length=100,
+        editable=False,
+        db_index=True,
+        help_text='Concrete content model. E.g. "obapi.obcontentitem".',
+    )
+
+    change_sequence = models.BigIntegerField(
+        "change sequence number",
+        default=0,
+        editable=False,
+        db_index=True,
+        help_text="Increases whenever the downloaded content of the item changes.",
+    )
+    content_fingerprint = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False,
+        help_text="Hash of the downloaded content of the item.",
+    )
+
     title = models.CharField(max_length=200, help_text="Title of content.")
-    description_html = models.TextField(
+    description_html = CompressedTextField(
         max_length=5000, blank=True, help_text="HTML description of content."
     )
     publish_date = models.DateTimeField(help_text="Date of publication.")
@@ -331,13 +1030,44 @@ class ContentItem(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if not self.item_type:
+            self.item_type = self._meta.label_lower
+        super().save(*args, **kwargs)
+
+    def delete(self, using=None, keep_parents=False):
+        using = using or router.db_for_write(type(self), instance=self)
+        queryset = type(self).objects.using(using).filter(pk=self.pk)
+        with transaction.atomic(using=using):
+            deletion = queryset.prepare_delete()
+            result = super().delete(using=using, keep_parents=keep_parents)
+            queryset.finish_delete(deletion)
+        return result
+
     @property
     def content_url(self):
         # Return URL of subclass
-        return ContentItem.objects.get_subclass(pk=self.pk).content_url
+        return self.get_concrete_item().content_url
 
     def get_absolute_url(self):
-        return ContentItem.objects.get_subclass(pk=self.pk).get_absolute_url()
+        return self.get_concrete_item().get_absolute_url()
+
+    def get_concrete_item(self):
+        """Get the item as an instance of its concrete model.
+
+        Raises
+        ------
+        NotImplementedError
+            If the item is already an instance of its concrete model.
+        """
+        model = apps.get_model(self.item_type)
+        if type(self) is model:
+            raise NotImplementedError(f"{model} does not implement this method.")
+        return model.objects.get(pk=self.pk)
+
+    def get_search_text(self):
+        """Get the plaintext which is indexed for full-text search."""
+        return utils.html_to_plaintext(self.description_html)
 
     def internalize_links(self, clear=False):
         """Try to make external links internal.
@@ -350,17 +1080,7 @@ class ContentItem(models.Model):
         clear : bool
             Whether to clear existing internal links.
         """
-        if clear:
-            self.internal_links.clear()
-        for pk, url in self.external_links.values_list("pk", "url"):
-            try:
-                match = ContentItem.objects.find_by_url(url)
-            except (ValueError, ContentItem.DoesNotExist):
-                continue
-            else:
-                with transaction.atomic():
-                    self.external_links.remove(pk)
-                    self.internal_links.add(match)
+        ContentItem.objects.filter(pk=self.pk).internalize_links(clear=clear)
 
 
 class VideoContentItem(ContentItem):
@@ -466,31 +1186,90 @@ class SpotifyContentItem(AudioContentItem):
         verbose_name = "spotify episode"
 
 
+class TextContentItemQuerySet(ContentItemQuerySet):
+    body_fields = ("text_html", "text_plain")
+
+
 class TextContentItem(ContentItem):
+    objects = ContentItemManager.from_queryset(TextContentItemQuerySet)()
     word_count = models.PositiveIntegerField(
         blank=True, null=True, help_text="Word count."
     )
-    text_html = models.TextField(
+    text_html = CompressedTextField(
         "content text HTML", blank=True, help_text="Content text HTML."
     )
-    text_plain = models.TextField(
+    text_plain = CompressedTextField(
         "content plaintext", blank=True, help_text="Content plaintext."
     )
 
+    def get_search_text(self):
+        return self.text_plain or super().get_search_text()
+
 
-class OBContentItemQuerySet(ContentItemQuerySet):
+def query_arguments(queryset, **arguments):
+    """Arguments of an exclusive operation on a QuerySet, including its query."""
+    try:
+        query = str(queryset.query)
+    except EmptyResultSet:
+        query = ""
+    return {"model": queryset.model._meta.label_lower, "query": query, **arguments}
+
+
+class OBContentItemQuerySet(TextContentItemQuerySet):
     assemble_by_ids = assemble_ob_content_items
     url_converters = (
         (OBPostLongURLConverter(), "item_id"),
         (OBPostShortURLConverter(), "ob_post_number"),
     )
 
-    def download_new_items(self, min_edit_date=None):
+    @exclusive_operation(
+        "obapi.obcontentitem.download_new_items",
+        arguments=lambda self, min_edit_date=None, *args, **kwargs: query_arguments(
+            self, min_edit_date=min_edit_date
+        ),
+        heartbeat="progress",
+    )
+    def download_new_items(
+        self,
+        min_edit_date=None,
+        progress=None,
+        batch_size=DOWNLOAD_BATCH_SIZE,
+        workers=1,
+    ):
         """Add posts whose names are not found in the database.
 
-        Do not return items which were not successfully created.
+        Unfinished pulls (e.g. interrupted ones) are resumed first, so none of their
+        posts are left out. Returns the number of items created, or raises
+        `IngestFailed` if some batches failed. `progress` (which must be passed by
+        keyword), `batch_size` and `workers` are passed on to `bulk_create_items`.
         """
         self.update_last_edit_dates()
+        created_item_count = 0
+        unfinished_jobs = list(
+            IngestJob.objects.using(self.db)
+            .unfinished()
+            .filter(model_label=self.model._meta.label_lower)
+        )
+        for job in unfinished_jobs:
+            created_before = job.created_count
+            job.run(progress=progress, workers=workers)
+            created_item_count += job.created_count - created_before
+        created_item_count += self.bulk_create_items(
+            self.get_missing_item_ids(min_edit_date),
+            batch_size=batch_size,
+            progress=progress,
+            workers=workers,
+        )
+        for job in unfinished_jobs:
+            job.raise_for_status()
+        return created_item_count
+
+    def get_missing_item_ids(self, min_edit_date=None):
+        """Names of posts on the site which are not in the database.
+
+        Only includes posts edited after `min_edit_date`. By default, this is the
+        most recent edit date of posts which have not been edited since creation.
+        """
         if min_edit_date is None:
             try:
                 # Take most recent edit date, among posts which haven't been edited
@@ -516,21 +1295,45 @@ class OBContentItemQuerySet(ContentItemQuerySet):
             for name, date in sorted_edit_dates.items()
             if min_edit_date is None or date > min_edit_date
         ]
-        db_names = self.values_list("item_id", flat=True)
-        sorted_missing_names = [
-            name for name in sorted_site_names if name not in db_names
-        ]
+        db_names = set(self.values_list("item_id", flat=True))
+        return [name for name in sorted_site_names if name not in db_names]
+
+    def edited(self):
+        """Posts which were edited after they were last downloaded."""
+        return self.filter(edit_date__gte=F("download_timestamp"))
+
+    @exclusive_operation(
+        "obapi.obcontentitem.update_edited_items",
+        dump_result=lambda self, items, **kwargs: [item.pk for item in items],
+        load_result=lambda self, pks, **kwargs: list(
+            self.model.objects.filter(pk__in=pks)
+        ),
+        arguments=lambda self, **kwargs: query_arguments(self),
+        heartbeat="progress",
+    )
+    def update_edited_items(
+        self, *, batch_size=DOWNLOAD_BATCH_SIZE, workers=1, progress=None
+    ):
+        """Update posts with unsaved edits.
 
-        created_item_count = self.bulk_create_items(sorted_missing_names)
-        return created_item_count
+        `batch_size`, `workers` and `progress` are passed on to `bulk_update_items`.
 
-    def update_edited_items(self):
-        """Update posts with unsaved edits."""
+        Returns
+        -------
+        List[OBContentItem]
+            The edited posts.
+        """
         self.update_last_edit_dates()
-        items_for_update = self.filter(edit_date__gte=F("download_timestamp"))
-        updated_items = items_for_update.update_items()
-        return [result[0] for result in updated_items]
+        edited_pks = list(self.edited().values_list("pk", flat=True))
+        self.filter(pk__in=edited_pks).bulk_update_items(
+            batch_size=batch_size, workers=workers, progress=progress
+        )
+        return list(self.model.objects.filter(pk__in=edited_pks))
 
+    @exclusive_operation(
+        "obapi.obcontentitem.update_last_edit_dates",
+        arguments=lambda self: query_arguments(self),
+    )
     def update_last_edit_dates(self):
         """Synchronise edit dates with the overcomingbias site.
 
@@ -538,7 +1341,7 @@ class OBContentItemQuerySet(ContentItemQuerySet):
         """
         edit_dates = assemble_ob_edit_dates()
 
-        all_items = self.all()
+        all_items = self.only("item_id", "edit_date")
         for item in all_items:
             item.edit_date = edit_dates[item.item_id]
         update_count = self.bulk_update(all_items, ["edit_date"], batch_size=1000)
@@ -547,7 +1350,7 @@ class OBContentItemQuerySet(ContentItemQuerySet):
 
 
 class OBContentItem(TextContentItem):
-    objects = OBContentItemQuerySet.as_manager()
+    objects = ContentItemManager.from_queryset(OBContentItemQuerySet)()
     item_id = models.CharField(
         "string ID",
         max_length=300,
@@ -586,13 +1389,13 @@ class OBContentItem(TextContentItem):
         verbose_name = "overcomingbias post"
 
 
-class EssayContentItemQuerySet(ContentItemQuerySet):
+class EssayContentItemQuerySet(TextContentItemQuerySet):
     assemble_by_ids = assemble_essay_content_items
     url_converters = ((EssayURLConverter(), "item_id"),)
 
 
 class EssayContentItem(TextContentItem):
-    objects = EssayContentItemQuerySet.as_manager()
+    objects = ContentItemManager.from_queryset(EssayContentItemQuerySet)()
     item_id = models.CharField(
         "string ID",
         max_length=300,
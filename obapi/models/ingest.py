@@ -0,0 +1,403 @@
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from obapi import utils
+from obapi.exceptions import APICallError, IngestFailed, LeaseExpired
+from obapi.models.changes import Counter
+from obapi.models.leases import claim_first
+
+INGEST_LEASE_DURATION = datetime.timedelta(
+    seconds=getattr(settings, "OBAPI_INGEST_LEASE_SECONDS", 600)
+)
+
+# Errors which fail a batch without stopping its job, since running the batch again
+# may succeed
+RETRYABLE_ERRORS = (APICallError, ConnectionError, LeaseExpired, httpx.HTTPError)
+
+# Name of the counter whose row is locked while jobs are planned
+PLAN_LOCK_COUNTER = "obapi.ingestjob.plan"
+
+
+class IngestJobQuerySet(models.QuerySet):
+    def plan(self, model, item_ids, batch_size):
+        """Create a job which downloads and saves new items of a content model.
+
+        Items which are already planned in an active batch of another job (one which
+        is leased to a worker, or has not been run yet) are left out, so concurrent
+        pulls do not download the same items. Items in batches which failed, or
+        whose worker died, are planned again.
+
+        Parameters
+        ----------
+        model : Type[ContentItem]
+            The concrete content model of the items.
+        item_ids : List[str]
+            IDs of the items to create.
+        batch_size : int
+            The number of items downloaded and saved in each transaction.
+
+        Returns
+        -------
+        IngestJob
+        """
+        with transaction.atomic(using=self.db):
+            # Plan one job at a time, so concurrent plans do not overlap
+            Counter.objects.using(self.db).increment(PLAN_LOCK_COUNTER)
+            planned_ids = {
+                item_id
+                for batch_item_ids in IngestBatch.objects.using(self.db)
+                .filter(job__model_label=model._meta.label_lower)
+                .active()
+                .values_list("item_ids", flat=True)
+                for item_id in batch_item_ids
+            }
+            item_ids = [item_id for item_id in item_ids if item_id not in planned_ids]
+            job = self.create(
+                model_label=model._meta.label_lower, item_count=len(item_ids)
+            )
+            IngestBatch.objects.using(self.db).bulk_create(
+                [
+                    IngestBatch(job=job, index=index, item_ids=item_ids_chunk)
+                    for index, item_ids_chunk in enumerate(
+                        utils.chunk_iterator(item_ids, batch_size)
+                    )
+                ]
+            )
+        return job
+
+    def unfinished(self):
+        """Jobs which have batches left to run."""
+        return self.exclude(status=IngestJob.Status.COMPLETED)
+
+
+class IngestJob(models.Model):
+    """A durable record of a bulk download of new content items.
+
+    The planned item IDs are split into batches. Each batch is downloaded, then saved
+    in a transaction which also marks the batch as completed. So if a job fails or
+    is interrupted, `run` can be called again to resume it from the last completed
+    batch.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        COMPLETED = "completed", "Completed"
+        FAILED = "failed", "Failed"
+
+    objects = IngestJobQuerySet.as_manager()
+
+    create_timestamp = models.DateTimeField("creation date", auto_now_add=True)
+    update_timestamp = models.DateTimeField("update date", auto_now=True)
+    model_label = models.CharField(
+        "content type",
+        max_length=100,
+        help_text='Content model of the items. E.g. "obapi.obcontentitem".',
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+        help_text="Status of the job.",
+    )
+    item_count = models.PositiveIntegerField(
+        default=0, help_text="Number of planned items."
+    )
+
+    class Meta:
+        ordering = ["-create_timestamp"]
+
+    def __str__(self):
+        return f"Ingest {self.model_label} ({self.pk})"
+
+    @property
+    def created_count(self):
+        """The number of items created so far."""
+        return self.batches.aggregate(total=Sum("created_count"))["total"] or 0
+
+    @property
+    def failed_item_ids(self):
+        """IDs of items which could not be downloaded, in completed batches."""
+        return [
+            item_id
+            for failed_ids in self.batches.values_list("failed_item_ids", flat=True)
+            for item_id in failed_ids
+        ]
+
+    def run(self, progress=None, workers=1, worker=None):
+        """Run the batches of the job which have not been completed.
+
+        Batches are leased to one worker at a time, so the same job can be run by
+        several processes (or hosts) at once. A batch whose lease expires, e.g.
+        because its worker died, can be claimed by another worker.
+
+        A batch which raises a download error (one of `RETRYABLE_ERRORS`) is marked
+        as failed, and the job moves on to the next batch. Failed batches are retried
+        the next time the job is run. Other errors are raised, after marking the batch
+        and the job as failed.
+
+        Parameters
+        ----------
+        progress : Callable[[int, int], None] | None
+            Called with the number of batches run so far, and the number of batches
+            which were left to run, after each batch.
+        workers : int
+            The number of batches to download at once, in separate threads. Batches
+            are always saved one at a time.
+        worker : str | None
+            The name of the worker which holds the leases. Defaults to the host name
+            and process ID.
+
+        Returns
+        -------
+        bool
+            Whether all batches have been completed.
+        """
+        model = apps.get_model(self.model_label)
+        worker = worker or utils.worker_name()
+        self.status = self.Status.RUNNING
+        self.save(update_fields=["status", "update_timestamp"])
+
+        batches = self.batches.all()
+        total = batches.exclude(status=IngestBatch.Status.COMPLETED).count()
+        attempted = []
+        run_count = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                window = []
+                while len(window) < workers:
+                    batch = batches.claim(worker, exclude=attempted)
+                    if batch is None:
+                        break
+                    window.append(batch)
+                    attempted.append(batch.pk)
+                if not window:
+                    break
+
+                item_ids = [batch.get_pending_item_ids(model) for batch in window]
+                downloads = [
+                    executor.submit(model.objects.assemble_items, batch_item_ids)
+                    for batch_item_ids in item_ids
+                ]
+                for batch, batch_item_ids, download in zip(window, item_ids, downloads):
+                    try:
+                        batch.save_items(model, batch_item_ids, download.result())
+                    except RETRYABLE_ERRORS as exc:
+                        batch.record_failure(exc)
+                    except Exception as exc:
+                        batch.record_failure(exc)
+                        self.status = self.Status.FAILED
+                        self.save(update_fields=["status", "update_timestamp"])
+                        raise
+                    run_count += 1
+                    if progress is not None:
+                        progress(run_count, total)
+
+        remaining = batches.exclude(status=IngestBatch.Status.COMPLETED)
+        if not remaining.exists():
+            self.status = self.Status.COMPLETED
+        elif remaining.leased().exists():
+            # Other workers are still running batches
+            self.status = self.Status.RUNNING
+        else:
+            self.status = self.Status.FAILED
+        self.save(update_fields=["status", "update_timestamp"])
+        return self.status == self.Status.COMPLETED
+
+    def raise_for_status(self):
+        """Raise `IngestFailed` if the last run of the job left failed batches."""
+        if self.status != self.Status.FAILED:
+            return
+        unsaved = self.batches.exclude(status=IngestBatch.Status.COMPLETED)
+        error = unsaved.exclude(error="").values_list("error", flat=True).first()
+        raise IngestFailed(
+            f"{unsaved.count()} batch(es) of {self} were not saved "
+            f"({self.created_count} item(s) were saved). Last error: {error}"
+        )
+
+
+class IngestBatchQuerySet(models.QuerySet):
+    def leased(self):
+        """Batches which a worker holds an unexpired lease on."""
+        return self.filter(lease_expires__gt=timezone.now())
+
+    def active(self):
+        """Batches which are leased to a worker, or have not been run yet."""
+        return self.filter(
+            Q(lease_expires__gt=timezone.now())
+            | Q(status=IngestBatch.Status.PENDING, attempts=0)
+        )
+
+    def claimable(self):
+        """Batches which are not completed, and not leased by any worker."""
+        return self.exclude(status=IngestBatch.Status.COMPLETED).filter(
+            Q(lease_expires__isnull=True) | Q(lease_expires__lte=timezone.now())
+        )
+
+    def claim(self, worker, lease_duration=INGEST_LEASE_DURATION, exclude=()):
+        """Lease the first claimable batch to a worker.
+
+        Concurrent workers claim different batches (see `claim_first`).
+
+        Parameters
+        ----------
+        worker : str
+            The name of the worker.
+        lease_duration : datetime.timedelta
+            How long the worker has to complete the batch, before other workers can
+            claim it.
+        exclude : Iterable[int]
+            Primary keys of batches not to claim.
+
+        Returns
+        -------
+        IngestBatch | None
+            The claimed batch, or None if no batches are claimable.
+        """
+        claimable = self.claimable().exclude(pk__in=exclude).order_by("job", "index")
+        return claim_first(
+            claimable,
+            leased_by=worker,
+            lease_expires=timezone.now() + lease_duration,
+            attempts=F("attempts") + 1,
+        )
+
+
+class IngestBatch(models.Model):
+    """A batch of item IDs in an `IngestJob`."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        COMPLETED = "completed", "Completed"
+        FAILED = "failed", "Failed"
+
+    job = models.ForeignKey(IngestJob, on_delete=models.CASCADE, related_name="batches")
+    index = models.PositiveIntegerField(help_text="Position of the batch in the job.")
+    item_ids = models.JSONField(default=list, help_text="IDs of items to create.")
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+        help_text="Status of the batch.",
+    )
+    attempts = models.PositiveIntegerField(
+        default=0, help_text="Number of times the batch has been run."
+    )
+    created_count = models.PositiveIntegerField(
+        default=0, help_text="Number of items created."
+    )
+    failed_item_ids = models.JSONField(
+        default=list, help_text="IDs of items which could not be downloaded."
+    )
+    error = models.TextField(blank=True, help_text="Error from the last attempt.")
+    completed_timestamp = models.DateTimeField("completion date", null=True, blank=True)
+    leased_by = models.CharField(
+        max_length=100, blank=True, help_text="Name of the worker running the batch."
+    )
+    lease_expires = models.DateTimeField(
+        "lease expiry date",
+        null=True,
+        blank=True,
+        help_text="When other workers may claim the batch.",
+    )
+
+    objects = IngestBatchQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["job", "index"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["job", "index"], name="obapi_ingestbatch_unique_index"
+            ),
+        ]
+        verbose_name_plural = "ingest batches"
+
+    def __str__(self):
+        return f"{self.job} batch {self.index}"
+
+    def get_pending_item_ids(self, model):
+        """IDs of items in the batch which have not been created yet.
+
+        Skips items created by an earlier attempt, or by other means.
+        """
+        existing_ids = set(
+            model.objects.using(self._state.db)
+            .filter(item_id__in=self.item_ids)
+            .values_list("item_id", flat=True)
+        )
+        return [item_id for item_id in self.item_ids if item_id not in existing_ids]
+
+    def save_items(self, model, item_ids, assembled_items):
+        """Save downloaded items, and mark the batch as completed.
+
+        Both happen in one transaction, so a batch is completed exactly when its
+        items are saved.
+
+        Raises
+        ------
+        LeaseExpired
+            If the worker no longer holds the lease on the batch. The items are not
+            saved.
+        """
+        items_data = [item for item in assembled_items if item is not None]
+        with transaction.atomic(using=self._state.db):
+            self.status = self.Status.COMPLETED
+            self.created_count = len(items_data)
+            self.failed_item_ids = [
+                item_id
+                for item_id, item in zip(item_ids, assembled_items)
+                if item is None
+            ]
+            self.error = ""
+            self.completed_timestamp = timezone.now()
+            self.release(
+                "status",
+                "created_count",
+                "failed_item_ids",
+                "error",
+                "completed_timestamp",
+            )
+            model.objects.using(self._state.db).save_items(
+                [None] * len(items_data), items_data
+            )
+
+    def record_failure(self, exc):
+        """Mark the batch as failed, with the error which caused the failure."""
+        self.status = self.Status.FAILED
+        self.error = repr(exc)
+        try:
+            self.release("status", "error")
+        except LeaseExpired:
+            # Another worker has claimed the batch
+            pass
+
+    def release(self, *fields):
+        """Give up the lease on the batch, and save some fields.
+
+        Raises
+        ------
+        LeaseExpired
+            If the worker no longer holds the lease on the batch.
+        """
+        released = (
+            type(self)
+            .objects.using(self._state.db)
+            .filter(pk=self.pk, leased_by=self.leased_by)
+            .leased()
+            .update(
+                leased_by="",
+                lease_expires=None,
+                **{field: getattr(self, field) for field in fields},
+            )
+        )
+        if not released:
+            raise LeaseExpired(f"Lease on {self} expired.")
+        self.leased_by = ""
+        self.lease_expires = None
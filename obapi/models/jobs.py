@@ -0,0 +1,143 @@
+import datetime
+
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+from obapi.models.leases import claim_first
+
+JOB_LEASE_DURATION = datetime.timedelta(
+    seconds=getattr(settings, "OBAPI_JOB_LEASE_SECONDS", 1800)
+)
+
+
+class JobQuerySet(models.QuerySet):
+    def claimable(self):
+        """Jobs which are queued, or running on a worker whose lease has expired."""
+        return self.filter(
+            Q(status=Job.Status.QUEUED)
+            | Q(status=Job.Status.RUNNING, lease_expires__lte=timezone.now())
+        )
+
+    def claim(self, worker, lease_duration=JOB_LEASE_DURATION):
+        """Claim the oldest claimable job for a worker.
+
+        Only one worker can claim each job, even if several workers poll the queue
+        at once (see `claim_first`). The worker holds a lease on the job, which it
+        renews whenever it reports progress. If the lease expires (e.g. because the
+        worker died), another worker can claim the job.
+
+        Returns
+        -------
+        Job | None
+            The claimed job, or None if no jobs are claimable.
+        """
+        now = timezone.now()
+        return claim_first(
+            self.claimable().order_by("create_timestamp"),
+            status=Job.Status.RUNNING,
+            worker=worker,
+            start_timestamp=now,
+            lease_expires=now + lease_duration,
+        )
+
+
+class Job(models.Model):
+    """A task queued to run in a background worker.
+
+    Tasks are registered in `obapi.jobs`, and run by the `obapi_worker` management
+    command.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+
+    objects = JobQuerySet.as_manager()
+
+    task = models.CharField(max_length=100, help_text="Name of the task to run.")
+    arguments = models.JSONField(
+        default=dict, blank=True, help_text="Keyword arguments of the task."
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.QUEUED,
+        db_index=True,
+        help_text="Status of the job.",
+    )
+    progress_done = models.PositiveIntegerField(
+        default=0, help_text="Number of steps completed."
+    )
+    progress_total = models.PositiveIntegerField(
+        default=0, help_text="Number of steps in total (0 if unknown)."
+    )
+    result = models.JSONField(
+        null=True, blank=True, help_text="Value returned by the task."
+    )
+    error = models.TextField(blank=True, help_text="Traceback, if the task failed.")
+    worker = models.CharField(
+        max_length=100, blank=True, help_text="Name of the worker running the job."
+    )
+    lease_expires = models.DateTimeField(
+        "lease expiry date",
+        null=True,
+        blank=True,
+        help_text="When other workers may claim the running job.",
+    )
+    create_timestamp = models.DateTimeField("creation date", auto_now_add=True)
+    start_timestamp = models.DateTimeField("start date", null=True, blank=True)
+    finish_timestamp = models.DateTimeField("finish date", null=True, blank=True)
+
+    class Meta:
+        ordering = ["-create_timestamp"]
+
+    def __str__(self):
+        return f"{self.task} ({self.pk})"
+
+    @property
+    def progress(self):
+        """Fraction of the job completed (or None if unknown)."""
+        if not self.progress_total:
+            return None
+        return self.progress_done / self.progress_total
+
+    def set_progress(self, done, total, lease_duration=JOB_LEASE_DURATION):
+        """Record the progress of a running job, and renew the worker's lease."""
+        self.progress_done = done
+        self.progress_total = total
+        self.lease_expires = timezone.now() + lease_duration
+        type(self).objects.filter(pk=self.pk, worker=self.worker).update(
+            progress_done=done,
+            progress_total=total,
+            lease_expires=self.lease_expires,
+        )
+
+    def finish(self, result=None, error=""):
+        """Record the result or error of a job, and release the worker's lease.
+
+        Returns
+        -------
+        bool
+            Whether the worker still held the job (i.e. it had not been claimed by
+            another worker).
+        """
+        self.status = self.Status.FAILED if error else self.Status.SUCCEEDED
+        self.result = result
+        self.error = error
+        self.finish_timestamp = timezone.now()
+        self.lease_expires = None
+        return bool(
+            type(self)
+            .objects.filter(pk=self.pk, worker=self.worker, status=self.Status.RUNNING)
+            .update(
+                status=self.status,
+                result=result,
+                error=error,
+                finish_timestamp=self.finish_timestamp,
+                lease_expires=None,
+            )
+        )
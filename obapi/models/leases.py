@@ -0,0 +1,40 @@
+from django.db import connections, transaction
+
+
+def claim_first(claimable, **lease):
+    """Lease the first row of an ordered QuerySet to a worker.
+
+    On databases which support it (e.g. PostgreSQL), the row is locked with
+    ``SELECT ... FOR UPDATE SKIP LOCKED``, so concurrent workers claim different rows
+    without waiting. Elsewhere (e.g. SQLite), each row is claimed with a conditional
+    update, which only succeeds if the row still matches `claimable`.
+
+    Parameters
+    ----------
+    claimable : QuerySet
+        The rows which may be claimed, in the order to claim them.
+    **lease
+        Field values which record the lease (e.g. the worker and expiry date).
+
+    Returns
+    -------
+    models.Model | None
+        The claimed row, or None if no rows are claimable.
+    """
+    objects = claimable.model._default_manager.using(claimable.db)
+    if connections[claimable.db].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=claimable.db):
+            pk = (
+                claimable.select_for_update(skip_locked=True)
+                .values_list("pk", flat=True)
+                .first()
+            )
+            if pk is None:
+                return None
+            objects.filter(pk=pk).update(**lease)
+            return objects.get(pk=pk)
+
+    for pk in claimable.values_list("pk", flat=True)[:10]:
+        if claimable.filter(pk=pk).update(**lease):
+            return objects.get(pk=pk)
+    return None
@@ -0,0 +1,123 @@
+from django.db import models
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+class OperationLockQuerySet(models.QuerySet):
+    def acquire(self, name, holder, duration, arguments=""):
+        """Try to take the lock on an operation.
+
+        The lock is taken with a conditional update, which only succeeds if the lock
+        is free or its lease has expired. `arguments` is a fingerprint of the
+        arguments of the run, which is stored on the lock.
+
+        Returns
+        -------
+        Tuple[bool, OperationLock]
+            Whether the lock was acquired, and the current state of the lock.
+        """
+        self.get_or_create(name=name)
+        now = timezone.now()
+        acquired = (
+            self.filter(name=name)
+            .filter(Q(expires__isnull=True) | Q(expires__lte=now))
+            .update(
+                holder=holder,
+                arguments=arguments,
+                expires=now + duration,
+                generation=F("generation") + 1,
+                result=None,
+                error="",
+                finish_timestamp=None,
+                progress_done=0,
+                progress_total=0,
+            )
+        )
+        return bool(acquired), self.get(name=name)
+
+    def renew(self, lock, duration, done=0, total=0):
+        """Extend the lease on a held lock, recording the progress of the operation.
+
+        Returns
+        -------
+        bool
+            Whether the lock was still held (i.e. its lease had not been taken over).
+        """
+        return bool(
+            self.filter(
+                name=lock.name, holder=lock.holder, generation=lock.generation
+            ).update(
+                expires=timezone.now() + duration,
+                progress_done=done,
+                progress_total=total,
+            )
+        )
+
+    def release(self, lock, result=None, error=""):
+        """Release a lock, recording the result of the operation.
+
+        Returns
+        -------
+        bool
+            Whether the lock was still held (i.e. its lease had not been taken over).
+        """
+        return bool(
+            self.filter(
+                name=lock.name, holder=lock.holder, generation=lock.generation
+            ).update(
+                holder="",
+                expires=None,
+                result=result,
+                error=error,
+                finish_timestamp=timezone.now(),
+            )
+        )
+
+
+class OperationLock(models.Model):
+    """A lock which stops a long-running operation from running twice at once.
+
+    Each time the lock is acquired, its `generation` increases. When the operation
+    finishes, its result is stored on the lock, so callers who waited for it (with
+    the same arguments) can use the result instead of repeating the operation. See
+    `obapi.locks`.
+    """
+
+    objects = OperationLockQuerySet.as_manager()
+
+    name = models.CharField(max_length=100, unique=True, help_text="Operation name.")
+    holder = models.CharField(
+        max_length=100, blank=True, help_text="Name of the process running it."
+    )
+    arguments = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text="Fingerprint of the arguments of the current or last run.",
+    )
+    expires = models.DateTimeField(
+        "lease expiry date",
+        null=True,
+        blank=True,
+        help_text="When other processes may take over the lock.",
+    )
+    progress_done = models.PositiveIntegerField(
+        default=0, help_text="Number of steps completed by the current run."
+    )
+    progress_total = models.PositiveIntegerField(
+        default=0, help_text="Number of steps in the current run (0 if unknown)."
+    )
+    generation = models.PositiveIntegerField(
+        default=0, help_text="Number of times the lock has been acquired."
+    )
+    result = models.JSONField(
+        null=True, blank=True, help_text="Result of the last completed run."
+    )
+    error = models.TextField(blank=True, help_text="Error from the last run.")
+    finish_timestamp = models.DateTimeField("finish date", null=True, blank=True)
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def is_held(self):
+        return self.expires is not None and self.expires > timezone.now()
@@ -0,0 +1,200 @@
+"""Full-text search over content items.
+
+The search index is kept in its own table, `obapi_contentitem_search`, which holds one
+document (title and plaintext body) per content item. On SQLite it is an FTS5 virtual
+table, and on PostgreSQL it is a table with a `tsvector` column and a GIN index.
+Other databases are not supported.
+"""
+from django.db import NotSupportedError, connections
+
+from obapi import utils
+
+SEARCH_TABLE = "obapi_contentitem_search"
+
+
+class SearchBackend:
+    """Base class for database-specific search index operations."""
+
+    def create_index(self, cursor):
+        raise NotImplementedError
+
+    def drop_index(self, cursor):
+        cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+    def index_documents(self, cursor, documents):
+        """Add or replace documents, given as (`pk`, `title`, `body`) tuples."""
+        raise NotImplementedError
+
+    def remove_documents(self, cursor, pks):
+        raise NotImplementedError
+
+    def search(self, cursor, query, limit, restrict=None):
+        """Search the index.
+
+        Parameters
+        ----------
+        query : str
+            The search terms.
+        limit : int
+            The maximum number of results.
+        restrict : Tuple[str, Tuple] | None
+            SQL (and its parameters) for a subquery which selects the primary keys
+            of the items to search.
+
+        Returns
+        -------
+        List[Tuple[int, float, str]]
+            (`pk`, `rank`, `snippet`) tuples, best match first. Higher ranks are
+            better.
+        """
+        raise NotImplementedError
+
+
+class SQLiteSearchBackend(SearchBackend):
+    def create_index(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+            "USING fts5(title, body, tokenize='porter unicode61')"
+        )
+
+    def index_documents(self, cursor, documents):
+        documents = list(documents)
+        self.remove_documents(cursor, [pk for pk, _, _ in documents])
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, title, body) VALUES (%s, %s, %s)",
+            documents,
+        )
+
+    def remove_documents(self, cursor, pks):
+        for pks_chunk in utils.chunk_iterator(list(pks), 500):
+            placeholders = ", ".join(["%s"] * len(pks_chunk))
+            cursor.execute(
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})",
+                pks_chunk,
+            )
+
+    def search(self, cursor, query, limit, restrict=None):
+        # Quote each term, so FTS5 query syntax is not interpreted
+        match = " ".join(
+            '"{}"'.format(term.replace('"', '""')) for term in query.split()
+        )
+        if not match:
+            return []
+        restrict_sql, restrict_params = restrict or ("", ())
+        if restrict_sql:
+            restrict_sql = f"AND rowid IN ({restrict_sql})"
+        cursor.execute(
+            f"SELECT rowid, bm25({SEARCH_TABLE}, 10.0, 1.0) AS rank, "
+            f"snippet({SEARCH_TABLE}, 1, '<b>', '</b>', '…', 24) "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s {restrict_sql} "
+            "ORDER BY rank LIMIT %s",
+            (match, *restrict_params, limit),
+        )
+        # bm25 scores are lower for better matches
+        return [(pk, -rank, snippet) for pk, rank, snippet in cursor.fetchall()]
+
+
+class PostgreSQLSearchBackend(SearchBackend):
+    config = "english"
+
+    def create_index(self, cursor):
+        # No foreign key: Django does not know about this table, so it could not
+        # truncate the content table (e.g. in `flush`). Deleted items are removed from
+        # the index with `remove_items`.
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+            "item_id bigint PRIMARY KEY, "
+            "body text NOT NULL, "
+            "document tsvector NOT NULL)"
+        )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_idx "
+            f"ON {SEARCH_TABLE} USING GIN (document)"
+        )
+
+    def index_documents(self, cursor, documents):
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (item_id, body, document) "
+            f"VALUES (%s, %s, setweight(to_tsvector('{self.config}', %s), 'A') || "
+            f"setweight(to_tsvector('{self.config}', %s), 'B')) "
+            "ON CONFLICT (item_id) DO UPDATE "
+            "SET body = EXCLUDED.body, document = EXCLUDED.document",
+            [(pk, body, title, body) for pk, title, body in documents],
+        )
+
+    def remove_documents(self, cursor, pks):
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE item_id = ANY(%s)", (list(pks),)
+        )
+
+    def search(self, cursor, query, limit, restrict=None):
+        restrict_sql, restrict_params = restrict or ("", ())
+        if restrict_sql:
+            restrict_sql = f"AND item_id IN ({restrict_sql})"
+        cursor.execute(
+            "SELECT item_id, ts_rank(document, query) AS rank, "
+            f"ts_headline('{self.config}', body, query, "
+            "'MaxFragments=1, MaxWords=24, MinWords=8, "
+            "StartSel=<b>, StopSel=</b>') "
+            f"FROM {SEARCH_TABLE}, websearch_to_tsquery('{self.config}', %s) query "
+            f"WHERE document @@ query {restrict_sql} "
+            "ORDER BY rank DESC LIMIT %s",
+            (query, *restrict_params, limit),
+        )
+        return cursor.fetchall()
+
+
+SEARCH_BACKENDS = {
+    "sqlite": SQLiteSearchBackend,
+    "postgresql": PostgreSQLSearchBackend,
+}
+
+
+def get_search_backend(connection):
+    """Get the search backend for a database connection (or None if unsupported)."""
+    try:
+        return SEARCH_BACKENDS[connection.vendor]()
+    except KeyError:
+        return None
+
+
+def index_items(items, using="default"):
+    """Add or update the search index entries of some content items."""
+    connection = connections[using]
+    backend = get_search_backend(connection)
+    if backend is None:
+        return
+    documents = [(item.pk, item.title, item.get_search_text()) for item in items]
+    if documents:
+        with connection.cursor() as cursor:
+            backend.index_documents(cursor, documents)
+
+
+def remove_items(pks, using="default"):
+    """Remove some content items from the search index."""
+    connection = connections[using]
+    backend = get_search_backend(connection)
+    if backend is None:
+        return
+    pks = list(pks)
+    if pks:
+        with connection.cursor() as cursor:
+            backend.remove_documents(cursor, pks)
+
+
+def search(query, limit, restrict=None, using="default"):
+    """Search the index. See `SearchBackend.search`.
+
+    Raises
+    ------
+    NotSupportedError
+        If the database does not support full-text search.
+    """
+    connection = connections[using]
+    backend = get_search_backend(connection)
+    if backend is None:
+        raise NotSupportedError(
+            f"Full-text search is not supported on {connection.vendor}."
+        )
+    with connection.cursor() as cursor:
+        return backend.search(cursor, query, limit, restrict=restrict)
@@ -0,0 +1,73 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from obapi import autocomplete
+from obapi.aliases import alias_cache, aliases_changed
+from obapi.models import (
+    Author,
+    AuthorAlias,
+    ContentItem,
+    Idea,
+    IdeaAlias,
+    Tag,
+    TagAlias,
+    Topic,
+    TopicAlias,
+)
+
+
+@receiver(post_save, sender=AuthorAlias)
+@receiver(post_save, sender=IdeaAlias)
+@receiver(post_save, sender=TopicAlias)
+@receiver(post_save, sender=TagAlias)
+def update_alias_cache_on_save(
+    sender, instance, created, update_fields, using, **kwargs
+):
+    owner_model = sender.owner.field.related_model
+    if created:
+        alias_cache.add(owner_model, instance.text, instance.owner_id, using=using)
+    elif update_fields is None or {"text", "owner"} & set(update_fields):
+        # The alias may have had a different text or owner
+        alias_cache.invalidate(owner_model)
+
+
+@receiver(post_delete, sender=AuthorAlias)
+@receiver(post_delete, sender=IdeaAlias)
+@receiver(post_delete, sender=TopicAlias)
+@receiver(post_delete, sender=TagAlias)
+def update_alias_cache_on_delete(sender, instance, **kwargs):
+    alias_cache.invalidate(sender.owner.field.related_model)
+
+
+@receiver(m2m_changed, sender=ContentItem.authors.through)
+@receiver(m2m_changed, sender=ContentItem.ideas.through)
+@receiver(m2m_changed, sender=ContentItem.topics.through)
+@receiver(m2m_changed, sender=ContentItem.tags.through)
+def update_classifier_usage(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if reverse:
+        # `instance` is the classifier
+        if action in ("post_add", "post_remove", "post_clear"):
+            type(instance).objects.refresh_usage([instance.pk])
+    elif action == "pre_clear":
+        instance._cleared_classifier_pks = list(
+            model.objects.filter(content=instance).values_list("pk", flat=True)
+        )
+    elif action == "post_clear":
+        model.objects.refresh_usage(instance.__dict__.pop("_cleared_classifier_pks"))
+    elif action in ("post_add", "post_remove"):
+        model.objects.refresh_usage(pk_set)
+
+
+@receiver(aliases_changed)
+def invalidate_autocomplete_on_alias_change(sender, **kwargs):
+    transaction.on_commit(autocomplete.invalidate)
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Idea)
+@receiver(post_save, sender=Topic)
+@receiver(post_save, sender=Tag)
+def invalidate_autocomplete_on_classifier_save(sender, using, **kwargs):
+    # The name shown for the classifier may have changed
+    transaction.on_commit(autocomplete.invalidate, using=using)
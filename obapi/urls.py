@@ -1,3 +1,8 @@
+from django.urls import path
+
+from obapi import views
+
 urlpatterns = [
     # GraphQL and REST APIs?
+    path("autocomplete/", views.autocomplete, name="autocomplete"),
 ]
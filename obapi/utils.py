@@ -1,7 +1,14 @@
+import collections
 import datetime
+import hashlib
+import json
+import os
 import re
+import socket
+import zlib
 
 import bleach
+import bs4
 import slugify
 
 ISO_8601_DURATION_PATTERN = re.compile(
@@ -31,6 +38,16 @@ def plaintext_to_html(text):
     return linkified_text
 
 
+def html_to_plaintext(html):
+    """Extract the text from some HTML."""
+    return bs4.BeautifulSoup(html, "html.parser").get_text(" ", strip=True)
+
+
+def worker_name():
+    """A name which identifies this process, e.g. as the holder of a lease."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
 def to_slug(text, max_length):
     return slugify.slugify(text, max_length=max_length)
 
@@ -51,3 +68,117 @@ def count_words(text, ignore=None):
         [word for word in str.split(text_without_special_chars) if word not in ignore]
     )
     return words
+
+
+def fingerprint(data, exclude=()):
+    """A hash of a dictionary of data, which ignores the keys in `exclude`.
+
+    Values which are not JSON-serializable (e.g. dates) are hashed by their string
+    representation.
+    """
+    data = {key: value for key, value in data.items() if key not in exclude}
+    serialized = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+# Header bytes which identify the format of compressed text
+ZLIB_HEADER = b"\x01"
+ZLIB_DICTIONARY_HEADER = b"\x02"
+
+# Flag in the header of a zlib stream, set when the stream records a dictionary ID
+ZLIB_FDICT = 0x20
+
+
+def compress_text(text, dictionary=None, level=6):
+    """Compress a string with zlib, optionally using a preset dictionary.
+
+    With a dictionary, the zlib stream records the ID of the dictionary (see
+    `compression_dictionary_id`), so it can be found again when decompressing.
+    """
+    if dictionary:
+        header = ZLIB_DICTIONARY_HEADER
+        compressor = zlib.compressobj(level=level, zdict=dictionary)
+    else:
+        header = ZLIB_HEADER
+        compressor = zlib.compressobj(level=level)
+    return header + compressor.compress(text.encode()) + compressor.flush()
+
+
+def compression_dictionary_id(dictionary):
+    """The ID of a preset dictionary: its Adler-32 checksum, as used by zlib."""
+    return zlib.adler32(dictionary)
+
+
+def decompress_text(data, dictionaries=()):
+    """Decompress a string compressed with `compress_text`.
+
+    Parameters
+    ----------
+    data : bytes
+        The compressed string.
+    dictionaries : Iterable[bytes]
+        Preset dictionaries which the data may have been compressed with. The right
+        one is picked by its ID.
+
+    Raises
+    ------
+    ValueError
+        If the data is not in a recognised format, or was compressed with a
+        dictionary which is not given.
+    """
+    data = bytes(data)
+    header, payload = data[:1], data[1:]
+    if header == ZLIB_HEADER:
+        decompressor = zlib.decompressobj()
+    elif header == ZLIB_DICTIONARY_HEADER:
+        if len(payload) < 6 or not payload[1] & ZLIB_FDICT:
+            raise ValueError("Compressed data does not record its dictionary.")
+        dictionary_id = int.from_bytes(payload[2:6], "big")
+        dictionary = next(
+            (
+                dictionary
+                for dictionary in dictionaries
+                if compression_dictionary_id(dictionary) == dictionary_id
+            ),
+            None,
+        )
+        if dictionary is None:
+            raise ValueError(
+                f"Data was compressed with an unknown dictionary "
+                f"(ID {dictionary_id:08x})."
+            )
+        decompressor = zlib.decompressobj(zdict=dictionary)
+    else:
+        raise ValueError("Unrecognised compression format.")
+    try:
+        return (decompressor.decompress(payload) + decompressor.flush()).decode()
+    except zlib.error as err:
+        raise ValueError("Failed to decompress data.") from err
+
+
+def train_compression_dictionary(samples, size=32768):
+    """Build a preset compression dictionary from some sample texts.
+
+    The dictionary is made of the words and word pairs which save the most space in
+    the samples, with the most valuable strings last (where zlib finds them most
+    cheaply).
+    """
+    counts = collections.Counter()
+    for sample in samples:
+        tokens = re.findall(r"\S+\s*", sample)
+        counts.update(tokens)
+        counts.update(first + second for first, second in zip(tokens, tokens[1:]))
+    # Rank strings by the space they would save
+    ranked = sorted(
+        (string for string, count in counts.items() if count > 1),
+        key=lambda string: len(string) * counts[string],
+        reverse=True,
+    )
+    chosen = []
+    remaining = size
+    for string in ranked:
+        length = len(string.encode())
+        if length <= remaining:
+            chosen.append(string)
+            remaining -= length
+    return "".join(reversed(chosen)).encode()
@@ -0,0 +1,32 @@
+from django.http import JsonResponse
+
+from obapi import autocomplete as autocomplete_index
+
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+
+def autocomplete(request):
+    """Find classifiers and content items whose names or aliases start with a query.
+
+    Query parameters are `q` (the text typed so far), `limit` (the maximum number of
+    results) and `type` (may be repeated, to only return results of some types, e.g.
+    "tag" or "obcontentitem").
+    """
+    query = request.GET.get("q", "")
+    try:
+        limit = min(int(request.GET.get("limit", 10)), AUTOCOMPLETE_MAX_LIMIT)
+    except ValueError:
+        return JsonResponse({"error": "limit must be an integer."}, status=400)
+    if limit < 1:
+        return JsonResponse({"error": "limit must be positive."}, status=400)
+    entities = set(request.GET.getlist("type")) or None
+    matches = autocomplete_index.get_index().search(
+        query, limit=limit, entities=entities
+    )
+    return JsonResponse(
+        {
+            "results": [
+                {"type": entity, "id": pk, "name": name} for entity, pk, name in matches
+            ]
+        }
+    )
@@ -1,7 +1,9 @@
+import datetime
 import random
 
 import obscraper
 import pytest
+from obapi.aliases import alias_cache
 from obapi.models import OBContentItem
 from obapi.models.content import (
     EssayContentItem,
@@ -18,6 +20,67 @@ def create_random_items(sample_ids, n, model):
     return [item for item in created_items if item is not None]
 
 
+@pytest.fixture(scope="session")
+def make_item_data():
+    """Factory function which builds assembled item data for `save_items`."""
+
+    def _make_item_data(title, **kwargs):
+        return {
+            "title": title,
+            "publish_date": datetime.datetime(2010, 1, 1, tzinfo=datetime.timezone.utc),
+            **kwargs,
+        }
+
+    return _make_item_data
+
+
+@pytest.fixture(scope="session")
+def assemble_essays():
+    """Stand-in for `assemble_by_ids` which assembles essays without downloading.
+
+    IDs starting with "missing" are treated as essays which do not exist.
+    """
+
+    def _assemble_essays(item_ids):
+        return [
+            None
+            if item_id.startswith("missing")
+            else {
+                "item_id": item_id,
+                "title": f"Assembled {item_id}",
+                "publish_date": datetime.datetime(
+                    2000, 1, 1, tzinfo=datetime.timezone.utc
+                ),
+            }
+            for item_id in item_ids
+        ]
+
+    return _assemble_essays
+
+
+@pytest.fixture(scope="session")
+def make_essaycontentitem():
+    """Factory function which saves an Essay tagged with the given classifiers."""
+
+    def _make_essaycontentitem(item_id, classifier_names, year=2010):
+        return EssayContentItem.objects.save_item(
+            item_id=item_id,
+            title=item_id,
+            publish_date=datetime.datetime(year, 1, 1, tzinfo=datetime.timezone.utc),
+            classifier_names=classifier_names,
+        )
+
+    return _make_essaycontentitem
+
+
+@pytest.fixture(autouse=True)
+def clear_alias_cache():
+    """Clear cached aliases, which may refer to rows rolled back by other tests."""
+    alias_cache.clear()
+    yield
+    alias_cache.clear()
+
+
 @pytest.fixture(scope="session")
 def obcontent_edit_dates():
     return obscraper.get_edit_dates()
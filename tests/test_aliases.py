@@ -0,0 +1,217 @@
+import pytest
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from obapi.aliases import VERSION_KEY, AliasCache, alias_cache
+from obapi.models import Author, EssayContentItem, Idea, Tag, Topic
+
+
+@pytest.mark.django_db
+class TestAliasCache:
+    def test_loads_each_alias_table_once(self):
+        # Arrange
+        author = Author.objects.create(name="Robin Hanson")
+        author.aliases.create(text="hanson")
+
+        # Act
+        with CaptureQueriesContext(connection) as queries:
+            first = alias_cache.get(Author, "robin-hanson")
+            second = alias_cache.get(Author, "hanson")
+            missing = alias_cache.get(Author, "missing")
+
+        # Assert
+        assert first == second == author.pk
+        assert missing is None
+        assert len(queries) == 1
+
+    def test_new_aliases_are_added(self, django_capture_on_commit_callbacks):
+        # Arrange
+        author = Author.objects.create(name="Robin Hanson")
+        alias_cache.get(Author, "robin-hanson")
+
+        # Act
+        with django_capture_on_commit_callbacks(execute=True):
+            author.aliases.create(text="hanson")
+
+        # Assert
+        with CaptureQueriesContext(connection) as queries:
+            assert alias_cache.get(Author, "hanson") == author.pk
+        assert len(queries) == 0
+
+    def test_rolled_back_aliases_are_not_added(self):
+        # Arrange
+        author = Author.objects.create(name="Robin Hanson")
+        alias_cache.get(Author, "robin-hanson")
+
+        # Act
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                author.aliases.create(text="hanson")
+                raise RuntimeError("Roll back")
+
+        # Assert
+        assert alias_cache.get(Author, "hanson") is None
+
+    def test_deleted_aliases_are_removed(self):
+        # Arrange
+        tag = Tag.objects.create(name="Signaling")
+        tag.aliases.create(text="signalling")
+        assert alias_cache.get(Tag, "signalling") == tag.pk
+
+        # Act
+        tag.aliases.get(text="signalling").delete()
+
+        # Assert
+        assert alias_cache.get(Tag, "signalling") is None
+
+    def test_merge_objects_invalidates_cache(self):
+        # Arrange
+        Tag.objects.create(name="Signaling")
+        Tag.objects.create(name="Signalling")
+        assert alias_cache.get(Tag, "signalling") is not None
+
+        # Act
+        new_tag = Tag.objects.all().merge_objects()
+
+        # Assert
+        assert alias_cache.get(Tag, "signaling") == new_tag.pk
+        assert alias_cache.get(Tag, "signalling") == new_tag.pk
+
+    def test_convert_object_invalidates_cache(self):
+        # Arrange
+        tag = Tag.objects.create(name="Signaling")
+        assert alias_cache.get(Tag, "signaling") == tag.pk
+
+        # Act
+        topic = tag.convert_object(Topic)
+
+        # Assert
+        assert alias_cache.get(Tag, "signaling") is None
+        assert alias_cache.get(Topic, "signaling") == topic.pk
+
+    def test_maps_loaded_in_rolled_back_transactions_are_dropped(self):
+        # Arrange
+        cache = AliasCache(cache_alias=None)
+
+        # Act
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                Tag.objects.create(name="Signaling")
+                assert cache.get(Tag, "signaling") is not None
+                raise RuntimeError("Roll back")
+
+        # Assert
+        assert cache.get(Tag, "signaling") is None
+
+    def test_database_version_invalidates_other_processes(self):
+        # Arrange
+        this_process = AliasCache(cache_alias=None)
+        other_process = AliasCache(cache_alias=None)
+        tag = Tag.objects.create(name="Signaling")
+        other_process.refresh()
+        assert other_process.get(Tag, "signaling") == tag.pk
+
+        # Act
+        topic = tag.convert_object(Topic)
+        this_process.invalidate(Tag)
+        other_process.refresh()
+
+        # Assert
+        assert other_process.get(Tag, "signaling") is None
+        assert other_process.get(Topic, "signaling") == topic.pk
+
+    def test_shared_cache_invalidates_other_processes(self, settings):
+        # Arrange
+        settings.CACHES = {
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        }
+        caches["default"].delete(VERSION_KEY)
+        this_process = AliasCache(cache_alias="default")
+        other_process = AliasCache(cache_alias="default")
+        tag = Tag.objects.create(name="Signaling")
+        assert other_process.get(Tag, "signaling") == tag.pk
+
+        # Act
+        this_process.invalidate(Tag)
+        tag.aliases.all().delete()
+        other_process.refresh()
+
+        # Assert
+        assert other_process.get(Tag, "signaling") is None
+
+
+@pytest.mark.django_db
+class TestSaveItemsWithAliasCache:
+    def test_new_names_are_looked_up_once_per_save(self, make_item_data):
+        # Arrange
+        items_data = [
+            make_item_data(
+                f"item{i}", item_id=f"item{i}", classifier_names=["Signaling"]
+            )
+            for i in range(5)
+        ]
+
+        # Act
+        with CaptureQueriesContext(connection) as queries:
+            items = EssayContentItem.objects.save_items([None] * 5, items_data)
+
+        # Assert
+        tag_lookups = [
+            query
+            for query in queries.captured_queries
+            if query["sql"].startswith('SELECT "obapi_tag"."id"')
+        ]
+        assert len(tag_lookups) == 1
+        assert {item.tags.get().name for item in items} == {"Signaling"}
+
+    def test_resolves_names_by_alias(self, make_item_data):
+        # Arrange
+        author = Author.objects.create(name="Robin Hanson")
+        author.aliases.create(text="hanson")
+        idea = Idea.objects.create(name="Signaling")
+        topic = Topic.objects.create(name="Health")
+
+        # Act
+        item = EssayContentItem.objects.save_item(
+            **make_item_data(
+                "first",
+                item_id="first",
+                author_names=["Hanson"],
+                classifier_names=["Signaling", "Health", "Medicine"],
+            )
+        )
+
+        # Assert
+        assert list(item.authors.all()) == [author]
+        assert list(item.ideas.all()) == [idea]
+        assert list(item.topics.all()) == [topic]
+        assert list(item.tags.values_list("name", flat=True)) == ["Medicine"]
+
+    def test_repeated_names_are_not_looked_up_again(
+        self, make_item_data, django_capture_on_commit_callbacks
+    ):
+        # Arrange
+        names = [f"Tag {i}" for i in range(10)]
+        with django_capture_on_commit_callbacks(execute=True):
+            EssayContentItem.objects.save_item(
+                **make_item_data("first", item_id="first", classifier_names=names)
+            )
+
+        # Act
+        with CaptureQueriesContext(connection) as first_queries:
+            EssayContentItem.objects.save_item(
+                **make_item_data("second", item_id="second", classifier_names=names)
+            )
+        with CaptureQueriesContext(connection) as second_queries:
+            EssayContentItem.objects.save_item(
+                **make_item_data("third", item_id="third", classifier_names=names)
+            )
+
+        # Assert
+        select_alias = [
+            query
+            for query in second_queries.captured_queries
+            if 'alias"' in query["sql"] and query["sql"].startswith("SELECT")
+        ]
+        assert select_alias == []
+        assert len(second_queries) == len(first_queries)
@@ -0,0 +1,162 @@
+import datetime
+
+import pytest
+from django.core.cache import caches
+from django.urls import reverse
+from obapi import autocomplete
+from obapi.autocomplete import AutocompleteIndex, word_suffixes
+from obapi.models import Author, EssayContentItem, Idea, Tag, TagAlias
+
+
+@pytest.fixture(autouse=True)
+def clear_autocomplete_index():
+    """Clear the shared index, which may refer to rows rolled back by other tests."""
+    autocomplete.invalidate()
+    yield
+    autocomplete.invalidate()
+
+
+def test_word_suffixes():
+    assert word_suffixes("overcoming-bias") == ["overcoming-bias", "bias"]
+
+
+class TestAutocompleteIndex:
+    def test_search_matches_start_of_words(self):
+        # Arrange
+        index = AutocompleteIndex(
+            [
+                ("prediction-markets", "idea", 1, "Prediction Markets"),
+                ("signaling", "idea", 2, "Signaling"),
+                ("market-failure", "topic", 3, "Market Failure"),
+            ]
+        )
+
+        # Act
+        results = index.search("Mark")
+
+        # Assert
+        assert results == [
+            ("topic", 3, "Market Failure"),
+            ("idea", 1, "Prediction Markets"),
+        ]
+
+    def test_search_returns_each_object_once(self):
+        # Arrange
+        index = AutocompleteIndex(
+            [
+                ("signaling", "tag", 1, "Signaling"),
+                ("signalling", "tag", 1, "Signaling"),
+                ("signal", "idea", 2, "Signal"),
+            ]
+        )
+
+        # Act
+        all_results = index.search("signal")
+        tag_results = index.search("signal", entities={"tag"})
+        limited_results = index.search("signal", limit=1)
+
+        # Assert
+        assert all_results == [("idea", 2, "Signal"), ("tag", 1, "Signaling")]
+        assert tag_results == [("tag", 1, "Signaling")]
+        assert limited_results == [("idea", 2, "Signal")]
+
+    def test_empty_query_finds_nothing(self):
+        index = AutocompleteIndex([("signaling", "tag", 1, "Signaling")])
+        assert index.search(" ") == []
+
+
+@pytest.mark.django_db
+class TestBuildAutocompleteIndex:
+    def test_build_indexes_aliases_and_titles(self):
+        # Arrange
+        author = Author.objects.create(name="Robin Hanson")
+        author.aliases.create(text="rdh")
+        item = EssayContentItem.objects.create(
+            item_id="my-essay",
+            title="The Elephant in the Brain",
+            publish_date=datetime.datetime(2018, 1, 1, tzinfo=datetime.timezone.utc),
+        )
+
+        # Act
+        index = AutocompleteIndex.build()
+
+        # Assert
+        assert index.search("rdh") == [("author", author.pk, "Robin Hanson")]
+        assert index.search("hanson") == [("author", author.pk, "Robin Hanson")]
+        assert index.search("elephant") == [
+            ("essaycontentitem", item.pk, "The Elephant in the Brain")
+        ]
+
+    def test_shared_index_is_rebuilt_when_aliases_change(
+        self, django_capture_on_commit_callbacks
+    ):
+        # Arrange
+        tag = Tag.objects.create(name="Signaling")
+        assert autocomplete.get_index().search("signalling") == []
+
+        # Act
+        with django_capture_on_commit_callbacks(execute=True):
+            tag.aliases.create(text="signalling")
+
+        # Assert
+        assert autocomplete.get_index().search("signalling") == [
+            ("tag", tag.pk, "Signaling")
+        ]
+
+    def test_shared_index_is_rebuilt_when_aliases_are_imported(
+        self, django_capture_on_commit_callbacks
+    ):
+        # Arrange
+        tag = Tag.objects.create(name="Signaling")
+        assert autocomplete.get_index().search("signalling") == []
+
+        # Act
+        with django_capture_on_commit_callbacks(execute=True):
+            TagAlias.objects.import_rows([("Signaling", "signalling")])
+
+        # Assert
+        assert autocomplete.get_index().search("signalling") == [
+            ("tag", tag.pk, "Signaling")
+        ]
+
+    def test_shared_index_is_rebuilt_when_other_processes_invalidate_it(
+        self, monkeypatch, settings
+    ):
+        # Arrange
+        settings.CACHES = {
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        }
+        monkeypatch.setattr(autocomplete, "ALIAS_CACHE", "default")
+        caches["default"].delete(autocomplete.VERSION_KEY)
+        autocomplete.get_index()
+        tag = Tag.objects.create(name="Signaling")
+
+        # Act
+        # Another process bumps the version, without clearing this process's index
+        caches["default"].set(autocomplete.VERSION_KEY, 1)
+
+        # Assert
+        assert autocomplete.get_index().search("signaling") == [
+            ("tag", tag.pk, "Signaling")
+        ]
+
+
+@pytest.mark.django_db
+class TestAutocompleteView:
+    def test_returns_matches_as_json(self, client):
+        # Arrange
+        idea = Idea.objects.create(name="Prediction Markets")
+        Tag.objects.create(name="Predictions")
+
+        # Act
+        response = client.get(reverse("autocomplete"), {"q": "predict", "type": "idea"})
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json() == {
+            "results": [{"type": "idea", "id": idea.pk, "name": "Prediction Markets"}]
+        }
+
+    def test_rejects_invalid_limit(self, client):
+        response = client.get(reverse("autocomplete"), {"q": "a", "limit": "many"})
+        assert response.status_code == 400
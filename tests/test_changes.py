@@ -0,0 +1,154 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from obapi.models import (
+    Author,
+    ChangeLogEntry,
+    ContentItem,
+    Counter,
+    EssayContentItem,
+    Tag,
+    Topic,
+)
+
+
+def read_log(cursor=0):
+    return list(
+        ChangeLogEntry.objects.after(cursor).values_list(
+            "operation", "entity", "object_pk"
+        )
+    )
+
+
+@pytest.mark.django_db
+class TestCounter:
+    def test_increment_returns_new_value(self):
+        assert Counter.objects.increment("test") == 1
+        assert Counter.objects.increment("test", 5) == 6
+        assert Counter.objects.get_value("test") == 6
+        assert Counter.objects.get_value("missing") == 0
+
+
+@pytest.mark.django_db
+class TestChangeLog:
+    def test_records_created_and_changed_items(self, make_item_data):
+        # Arrange
+        first, second = EssayContentItem.objects.save_items(
+            [None, None],
+            [
+                make_item_data("First", item_id="first"),
+                make_item_data("Second", item_id="second"),
+            ],
+        )
+        cursor = ChangeLogEntry.objects.latest_cursor()
+
+        # Act
+        EssayContentItem.objects.save_items(
+            [first, second],
+            [
+                make_item_data("First", item_id="first"),
+                make_item_data("New Second", item_id="second"),
+            ],
+        )
+
+        # Assert
+        assert read_log() == [
+            ("create", "obapi.essaycontentitem", str(first.pk)),
+            ("create", "obapi.essaycontentitem", str(second.pk)),
+            ("update", "obapi.essaycontentitem", str(second.pk)),
+        ]
+        assert read_log(cursor) == [
+            ("update", "obapi.essaycontentitem", str(second.pk))
+        ]
+
+    def test_records_deleted_items(self, make_item_data):
+        # Arrange
+        item = EssayContentItem.objects.save_item(**make_item_data("Post", item_id="p"))
+        pk = item.pk
+        cursor = ChangeLogEntry.objects.latest_cursor()
+
+        # Act
+        item.delete()
+
+        # Assert
+        assert read_log(cursor) == [("delete", "obapi.essaycontentitem", str(pk))]
+
+    def test_deletes_querysets_with_a_few_queries(self, make_item_data):
+        # Arrange
+        def save_items(prefix, count):
+            return EssayContentItem.objects.save_items(
+                [None] * count,
+                [
+                    make_item_data(
+                        f"{prefix} {i}",
+                        item_id=f"{prefix}{i}",
+                        author_names=["Robin Hanson"],
+                        classifier_names=[f"{prefix} tag {i}", "Shared"],
+                    )
+                    for i in range(count)
+                ],
+            )
+
+        items = save_items("few", 2) + save_items("many", 10)
+        cursor = ChangeLogEntry.objects.latest_cursor()
+
+        # Act
+        with CaptureQueriesContext(connection) as few_queries:
+            EssayContentItem.objects.filter(item_id__startswith="few").delete()
+        with CaptureQueriesContext(connection) as many_queries:
+            EssayContentItem.objects.filter(item_id__startswith="many").delete()
+
+        # Assert
+        # Django fetches inherited parents one row at a time, so only count
+        # the change log, usage counter and search index work
+        def handler_queries(queries):
+            tables = ["changelogentry", "counter", "search", "author", "tag"]
+            return [
+                query["sql"]
+                for query in queries.captured_queries
+                if any(f"obapi_{table}" in query["sql"] for table in tables)
+            ]
+
+        assert len(handler_queries(many_queries)) == len(handler_queries(few_queries))
+        assert sorted(read_log(cursor)) == sorted(
+            ("delete", "obapi.essaycontentitem", str(item.pk)) for item in items
+        )
+        assert Tag.objects.get(name="Shared").item_count == 0
+        assert Author.objects.get(name="Robin Hanson").item_count == 0
+
+    def test_records_merged_objects(self, make_item_data):
+        # Arrange
+        law = Topic.objects.create_with_aliases(name="Law", aliases=["legal"])
+        norms = Topic.objects.create_with_aliases(name="Norms", aliases=[])
+        item = ContentItem.objects.save_item(**make_item_data("Item"))
+        law.content.add(item)
+        cursor = ChangeLogEntry.objects.latest_cursor()
+
+        # Act
+        merged_object = Topic.objects.all().merge_objects()
+
+        # Assert
+        log = read_log(cursor)
+        assert sorted(log[:2]) == [
+            ("merge", "obapi.topic", str(law.pk)),
+            ("merge", "obapi.topic", str(norms.pk)),
+        ]
+        assert log[2:] == [
+            ("create", "obapi.topic", str(merged_object.pk)),
+            ("update", "obapi.contentitem", str(item.pk)),
+        ]
+
+    def test_reads_with_limit(self, make_item_data):
+        # Arrange
+        ContentItem.objects.save_items(
+            [None] * 3, [make_item_data(f"Item {i}") for i in range(3)]
+        )
+
+        # Act
+        first_page = list(ChangeLogEntry.objects.after(0, limit=2))
+        second_page = list(ChangeLogEntry.objects.after(first_page[-1].sequence))
+
+        # Assert
+        assert len(first_page) == 2
+        assert len(second_page) == 1
+        assert second_page[0].sequence == ChangeLogEntry.objects.latest_cursor()
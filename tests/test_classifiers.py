@@ -1,11 +1,19 @@
 import datetime
+import io
 
 import pytest
+from django.core.management import call_command
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
 from obapi import utils
-from obapi.models import Author, ContentItem, Idea, Tag, Topic
-from obapi.models.classifiers import CLASSIFIER_SLUG_MAX_LENGTH, IdeaAlias, TopicAlias
+from obapi.models import Author, ContentItem, EssayContentItem, Idea, Tag, Topic
+from obapi.models.classifiers import (
+    CLASSIFIER_SLUG_MAX_LENGTH,
+    IdeaAlias,
+    TagAlias,
+    TopicAlias,
+)
 
 
 @pytest.mark.django_db
@@ -136,6 +144,62 @@ class TestCreateWithAliases:
         with pytest.raises(IntegrityError):
             Topic.objects.create_with_aliases(name=topic_name, aliases=aliases)
 
+    def test_inserts_aliases_in_one_query(self):
+        # Act
+        with CaptureQueriesContext(connection) as queries:
+            topic = Topic.objects.create_with_aliases(
+                name="Law", aliases=["legal", "laws", "norms"]
+            )
+
+        # Assert
+        statements = [
+            query["sql"]
+            for query in queries.captured_queries
+            if "SAVEPOINT" not in query["sql"]
+        ]
+        assert len(statements) == 2
+        assert set(topic.aliases.values_list("text", "protected")) == {
+            ("law", True),
+            ("legal", False),
+            ("laws", False),
+            ("norms", False),
+        }
+
+
+@pytest.mark.django_db
+class TestSaveAliasedModel:
+    def test_skips_aliases_when_slug_is_unchanged(self, django_assert_num_queries):
+        # Arrange
+        Topic.objects.create_with_aliases(name="Law", aliases=["legal"])
+        topic = Topic.objects.get(name="Law")
+
+        # Act
+        topic.description = "A new description"
+        with django_assert_num_queries(3):
+            # Savepoint, object update, release
+            topic.save()
+
+        # Assert
+        assert set(topic.aliases.values_list("text", "protected")) == {
+            ("law", True),
+            ("legal", False),
+        }
+
+    def test_protects_alias_of_new_slug(self):
+        # Arrange
+        Topic.objects.create_with_aliases(name="Law", aliases=["legal"])
+        topic = Topic.objects.get(name="Law")
+
+        # Act
+        topic.name = "Legal"
+        topic.save()
+
+        # Assert
+        assert set(topic.aliases.values_list("text", "protected")) == {
+            ("law", False),
+            ("legal", True),
+        }
+
 
 @pytest.mark.django_db
 class TestValidateUniqueAlias:
@@ -266,6 +330,24 @@ class TestMergeObjects:
         actual_aliases = set(merged_object.aliases.values_list("text", flat=True))
         assert actual_aliases == expected_aliases
 
+    def test_keeps_one_relation_per_item(self):
+        # Arrange
+        law = Tag.objects.create(name="Law")
+        laws = Tag.objects.create(name="Laws")
+        now = datetime.datetime.now()
+        shared = ContentItem.objects.create(title="Shared Item", publish_date=now)
+        other = ContentItem.objects.create(title="Other Item", publish_date=now)
+        law.content.add(shared, other)
+        laws.content.add(shared)
+
+        # Act
+        merged_object = Tag.objects.all().merge_objects()
+
+        # Assert
+        assert list(shared.tags.all()) == [merged_object]
+        assert merged_object.content.count() == 2
+        assert merged_object.aliases.get(protected=True).text == merged_object.slug
+
 
 @pytest.mark.django_db
 class TestConvertObject:
@@ -352,3 +434,234 @@ class TestConvertObject:
         expected_aliases = {"law", "legal", "laws"}
         actual_aliases = set(converted_object.aliases.values_list("text", flat=True))
         assert actual_aliases == expected_aliases
+
+
+@pytest.mark.django_db
+class TestConvertObjects:
+    def test_converts_objects_and_reports_conflicts(self):
+        # Arrange
+        Idea.objects.create_with_aliases(name="Law", aliases=["legal"])
+        law = Tag.objects.create_with_aliases(name="Laws", aliases=["legal"])
+        norms = Tag.objects.create_with_aliases(name="Norms", aliases=["norm"])
+        status = Tag.objects.create(name="Status")
+        now = datetime.datetime.now()
+        item = ContentItem.objects.create(title="Item", publish_date=now)
+        norms.content.add(item)
+        status.content.add(item)
+
+        # Act
+        new_objects, conflicts = Tag.objects.order_by("name").convert_objects(Idea)
+
+        # Assert
+        assert [obj.name for obj in new_objects] == ["Norms", "Status"]
+        assert list(conflicts) == [law]
+        assert list(Tag.objects.all()) == [law]
+        assert set(item.ideas.values_list("name", flat=True)) == {"Norms", "Status"}
+        assert not item.tags.exists()
+        norms_idea = Idea.objects.get(name="Norms")
+        assert set(norms_idea.aliases.values_list("text", "protected")) == {
+            ("norms", True),
+            ("norm", False),
+        }
+
+
+@pytest.mark.django_db
+class TestUsageCounters:
+    def test_save_items_updates_counters(self, make_essaycontentitem):
+        # Arrange
+        make_essaycontentitem("first", ["Law", "Norms"], year=2010)
+        second = make_essaycontentitem("second", ["Law"], year=2012)
+
+        # Act
+        EssayContentItem.objects.save_items(
+            [second],
+            [{"title": "second", "classifier_names": ["Norms"]}],
+        )
+
+        # Assert
+        law = Tag.objects.get(name="Law")
+        norms = Tag.objects.get(name="Norms")
+        assert law.item_count == 1
+        assert law.last_used.year == 2010
+        assert norms.item_count == 2
+        assert norms.last_used.year == 2012
+        assert list(Tag.objects.popular()) == [norms, law]
+
+    def test_merge_objects_counts_shared_items_once(self, make_essaycontentitem):
+        # Arrange
+        make_essaycontentitem("first", ["Law", "Laws"])
+        make_essaycontentitem("second", ["Law"])
+
+        # Act
+        merged_object = Tag.objects.all().merge_objects()
+
+        # Assert
+        assert merged_object.item_count == 2
+        assert merged_object.last_used is not None
+
+    def test_convert_objects_moves_counters(self, make_essaycontentitem):
+        # Arrange
+        make_essaycontentitem("first", ["Law"])
+
+        # Act
+        topic = Tag.objects.get(name="Law").convert_object(Topic)
+
+        # Assert
+        assert topic.item_count == 1
+        assert topic.last_used is not None
+
+    def test_relation_changes_and_deletes_update_counters(self, make_essaycontentitem):
+        # Arrange
+        item = make_essaycontentitem("first", ["Law"])
+        norms = Tag.objects.create(name="Norms")
+
+        # Act & Assert
+        item.tags.add(norms)
+        norms.refresh_from_db()
+        assert norms.item_count == 1
+
+        item.tags.clear()
+        norms.refresh_from_db()
+        assert norms.item_count == 0
+
+        norms.content.add(item)
+        item.delete()
+        norms.refresh_from_db()
+        assert norms.item_count == 0
+
+    def test_reconcile_command_fixes_drift(self, make_essaycontentitem):
+        # Arrange
+        make_essaycontentitem("first", ["Law"])
+        Tag.objects.update(item_count=10)
+
+        # Act
+        call_command("obapi_reconcile_usage", stdout=io.StringIO())
+
+        # Assert
+        assert Tag.objects.get(name="Law").item_count == 1
+
+
+@pytest.mark.django_db
+class TestImportAliases:
+    def test_imports_valid_rows_and_reports_conflicts(self):
+        # Arrange
+        Tag.objects.create_with_aliases(name="Law", aliases=["legal"])
+        Tag.objects.create(name="Norms")
+
+        # Act
+        new_aliases, conflicts = TagAlias.objects.import_rows(
+            [
+                ("Law", "Laws"),
+                ("law", "Lawyers"),
+                ("Law", "legal"),
+                ("Norms", "Legal"),
+                ("Norms", "Customs"),
+                ("Law", "customs"),
+                ("Missing", "missing-alias"),
+            ]
+        )
+
+        # Assert
+        assert {alias.text for alias in new_aliases} == {"laws", "lawyers", "customs"}
+        assert set(conflicts) == {
+            ("Norms", "Legal"),
+            ("Law", "customs"),
+            ("Missing", "missing-alias"),
+        }
+        assert set(
+            Tag.objects.get(name="Law").aliases.values_list("text", flat=True)
+        ) == {
+            "law",
+            "legal",
+            "laws",
+            "lawyers",
+        }
+
+    def test_dry_run_saves_nothing(self):
+        # Arrange
+        Tag.objects.create(name="Law")
+
+        # Act
+        new_aliases, _ = TagAlias.objects.import_rows([("Law", "Laws")], dry_run=True)
+
+        # Assert
+        assert [alias.text for alias in new_aliases] == ["laws"]
+        assert not TagAlias.objects.filter(text="laws").exists()
+
+    @pytest.mark.parametrize("file_format", ["csv", "json"])
+    def test_command_round_trip(self, tmp_path, file_format):
+        # Arrange
+        Topic.objects.create_with_aliases(name="Law", aliases=["legal", "laws"])
+        path = tmp_path / f"aliases.{file_format}"
+        call_command(
+            "obapi_aliases", "export", path, "--model", "topic", stderr=io.StringIO()
+        )
+        TopicAlias.objects.filter(protected=False).delete()
+
+        # Act
+        stdout = io.StringIO()
+        call_command("obapi_aliases", "import", path, "--model", "topic", stdout=stdout)
+
+        # Assert
+        assert "Imported 2 alias(es), with 0 conflict(s)." in stdout.getvalue()
+        law = Topic.objects.get(name="Law")
+        assert set(law.aliases.values_list("text", flat=True)) == {
+            "law",
+            "legal",
+            "laws",
+        }
+
+
+@pytest.mark.django_db
+class TestFindConflicts:
+    def test_checks_many_aliases_in_one_query(self, django_assert_num_queries):
+        # Arrange
+        law = Tag.objects.create_with_aliases(name="Law", aliases=["legal"])
+        norms = Tag.objects.create(name="Norms")
+
+        # Act
+        with django_assert_num_queries(1):
+            conflicts = TagAlias.objects.find_conflicts(
+                [
+                    ("Legal", law.pk),
+                    ("Legal", norms.pk),
+                    ("Customs", norms.pk),
+                    ("customs", law.pk),
+                    ("Status", None),
+                    ("law", None),
+                ]
+            )
+
+        # Assert
+        assert set(conflicts) == {
+            ("Legal", norms.pk),
+            ("customs", law.pk),
+            ("law", None),
+        }
+
+    def test_aliases_outside_edited_rows_clash(self):
+        # Arrange
+        law = Tag.objects.create_with_aliases(name="Law", aliases=["legal"])
+        legal_alias = law.aliases.get(text="legal")
+
+        # Act
+        conflicts = TagAlias.objects.find_conflicts(
+            [("legal", law.pk), ("law", law.pk), ("laws", law.pk)],
+            edited_pks={legal_alias.pk},
+        )
+
+        # Assert
+        assert set(conflicts) == {("law", law.pk)}
+        assert "already an alias" in conflicts[("law", law.pk)]
+
+    def test_finds_name_conflicts(self, django_assert_num_queries):
+        # Arrange
+        law = Topic.objects.create_with_aliases(name="Law", aliases=["legal"])
+        candidates = [Topic(name="Legal"), Topic(name="Norms"), law]
+
+        # Act
+        with django_assert_num_queries(1):
+            conflicts = Topic.objects.find_name_conflicts(candidates)
+
+        # Assert
+        assert [obj for obj, _ in conflicts] == [candidates[0]]
@@ -0,0 +1,115 @@
+import datetime
+import io
+
+import pytest
+from django.core.management import call_command
+from obapi import locks, utils
+from obapi.models import Counter, EssayContentItem, OBContentItem, OperationLock
+from obapi.models.content import EssayContentItemQuerySet, query_arguments
+
+
+@pytest.fixture
+def essays(monkeypatch, assemble_essays):
+    monkeypatch.setattr(EssayContentItemQuerySet, "assemble_by_ids", assemble_essays)
+    return [
+        EssayContentItem.objects.save_item(
+            item_id=f"essay{i}",
+            title=f"Essay {i}",
+            publish_date=datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc),
+        )
+        for i in range(5)
+    ]
+
+
+def refresh(*args):
+    stdout = io.StringIO()
+    call_command("obapi_refresh", "--source", "essays", *args, stdout=stdout)
+    return stdout.getvalue()
+
+
+@pytest.mark.django_db
+class TestRefreshCommand:
+    def test_refreshes_items_in_batches(self, essays):
+        # Act
+        output = refresh("--batch-size", "2", "--workers", "2")
+
+        # Assert
+        assert "Refreshed 5 item(s)." in output
+        assert "database queries" in output
+        assert set(EssayContentItem.objects.values_list("title", flat=True)) == {
+            f"Assembled essay{i}" for i in range(5)
+        }
+        assert Counter.objects.get_value("obapi_refresh.obapi.essaycontentitem") == 0
+
+    def test_dry_run_saves_nothing(self, essays):
+        # Act
+        output = refresh("--dry-run")
+
+        # Assert
+        assert "Would refresh 5 item(s)." in output
+        assert not EssayContentItem.objects.filter(title__startswith="Assembled")
+
+    def test_resumes_from_checkpoint(self, essays):
+        # Arrange
+        Counter.objects.set_value("obapi_refresh.obapi.essaycontentitem", essays[2].pk)
+
+        # Act
+        output = refresh("--resume")
+
+        # Assert
+        assert "Refreshed 2 item(s)." in output
+        refreshed = EssayContentItem.objects.filter(title__startswith="Assembled")
+        assert set(refreshed.values_list("pk", flat=True)) == {
+            essays[3].pk,
+            essays[4].pk,
+        }
+
+
+@pytest.mark.django_db
+class TestSyncCommand:
+    def test_joins_running_sync(self, monkeypatch):
+        # Arrange
+        item = OBContentItem.objects.save_item(
+            item_id="2006/11/introduction",
+            ob_post_number=1,
+            title="Introduction",
+            publish_date=datetime.datetime(2006, 11, 1, tzinfo=datetime.timezone.utc),
+        )
+        _, lock = OperationLock.objects.acquire(
+            "obapi.obcontentitem.update_edited_items",
+            "other host:1",
+            datetime.timedelta(hours=1),
+            arguments=utils.fingerprint(query_arguments(OBContentItem.objects.all())),
+        )
+        # Finish the other sync while waiting
+        monkeypatch.setattr(
+            locks.time,
+            "sleep",
+            lambda seconds: OperationLock.objects.release(lock, result=[item.pk]),
+        )
+        stdout = io.StringIO()
+
+        # Act
+        call_command("obapi_sync", stdout=stdout)
+
+        # Assert
+        assert "Updated 1 edited post(s)." in stdout.getvalue()
+
+
+@pytest.mark.django_db
+class TestBulkUpdateItems:
+    def test_excludes_fields_and_reports_progress(self, essays):
+        # Arrange
+        progress = []
+
+        # Act
+        updated_count = EssayContentItem.objects.bulk_update_items(
+            batch_size=2,
+            exclude=["title"],
+            progress=lambda *args: progress.append(args),
+        )
+
+        # Assert
+        assert updated_count == 5
+        assert not EssayContentItem.objects.filter(title__startswith="Assembled")
+        assert progress == [(1, 3), (2, 3), (3, 3)]
@@ -2,11 +2,467 @@ import datetime
 import random
 
 import pytest
-from obapi.models import OBContentItem
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from obapi.models import (
+    Author,
+    ContentItem,
+    Counter,
+    EssayContentItem,
+    ExternalLink,
+    OBContentItem,
+    SpotifyContentItem,
+    Tag,
+    TextContentItem,
+    YoutubeContentItem,
+)
 
 
+@pytest.mark.django_db
 class TestFindByURL:
-    pass
+    @pytest.mark.parametrize(
+        "url,model,field,item_id",
+        [
+            (
+                "https://www.overcomingbias.com/2010/01/post.html",
+                OBContentItem,
+                "item_id",
+                "2010/01/post",
+            ),
+            (
+                "https://www.overcomingbias.com/?p=12345",
+                OBContentItem,
+                "ob_post_number",
+                "12345",
+            ),
+            (
+                "https://www.youtube.com/watch?v=V84_F1QWdeU",
+                YoutubeContentItem,
+                "item_id",
+                "V84_F1QWdeU",
+            ),
+            (
+                "https://open.spotify.com/episode/6MAszRR6tdDnMsjgVdw4Jh?si=1",
+                SpotifyContentItem,
+                "item_id",
+                "6MAszRR6tdDnMsjgVdw4Jh",
+            ),
+            (
+                "http://hanson.gmu.edu/Varytax.html",
+                EssayContentItem,
+                "item_id",
+                "Varytax",
+            ),
+        ],
+    )
+    def test_parses_known_urls(self, url, model, field, item_id):
+        assert ContentItem.objects.parse_url(url) == (model, field, item_id)
+
+    def test_subclass_only_parses_own_urls(self):
+        assert OBContentItem.objects.parse_url(
+            "https://www.overcomingbias.com/?p=12345"
+        ) == (OBContentItem, "ob_post_number", "12345")
+        with pytest.raises(ValueError):
+            OBContentItem.objects.parse_url("http://hanson.gmu.edu/Varytax.html")
+
+    @pytest.mark.parametrize(
+        "url", ["https://www.example.com/", "https://www.overcomingbias.com/"]
+    )
+    def test_raises_error_for_unknown_urls(self, url):
+        with pytest.raises(ValueError):
+            ContentItem.objects.parse_url(url)
+
+    def test_finds_items_by_url(self, make_item_data):
+        # Arrange
+        (post,) = OBContentItem.objects.save_items(
+            [None],
+            [make_item_data("Post", item_id="2010/01/post", ob_post_number=12345)],
+        )
+
+        # Act & assert
+        assert ContentItem.objects.find_by_url("overcomingbias.com/?p=12345") == post
+        with pytest.raises(ContentItem.DoesNotExist):
+            ContentItem.objects.find_by_url("overcomingbias.com/?p=54321")
+
+
+@pytest.mark.django_db
+class TestSaveItems:
+    def test_sets_relations_of_new_items(self, make_item_data):
+        # Act
+        first, second = ContentItem.objects.save_items(
+            [None, None],
+            [
+                make_item_data(
+                    "First",
+                    author_names=["Robin Hanson"],
+                    classifier_names=["Law", "Norms"],
+                ),
+                make_item_data("Second", author_names=["Robin Hanson", "Bryan"]),
+            ],
+        )
+
+        # Assert
+        assert set(first.authors.values_list("name", flat=True)) == {"Robin Hanson"}
+        assert set(first.tags.values_list("name", flat=True)) == {"Law", "Norms"}
+        assert set(second.authors.values_list("name", flat=True)) == {
+            "Robin Hanson",
+            "Bryan",
+        }
+        assert not second.tags.exists()
+        assert Author.objects.count() == 2
+
+    def test_replaces_relations_of_existing_items(self, make_item_data):
+        # Arrange
+        first, second = ContentItem.objects.save_items(
+            [None, None],
+            [
+                make_item_data("First", classifier_names=["Law", "Norms"]),
+                make_item_data("Second", classifier_names=["Law"]),
+            ],
+        )
+
+        # Act
+        ContentItem.objects.save_items(
+            [first, second],
+            [
+                make_item_data("First", classifier_names=["Norms", "Status"]),
+                make_item_data("Second", author_names=["Robin Hanson"]),
+            ],
+        )
+
+        # Assert
+        assert set(first.tags.values_list("name", flat=True)) == {"Norms", "Status"}
+        # Relations which are not given are left unchanged
+        assert set(second.tags.values_list("name", flat=True)) == {"Law"}
+        assert Tag.objects.count() == 3
+
+    def test_gets_or_creates_links_in_bulk(self, make_item_data):
+        # Arrange
+        existing = ExternalLink.objects.create(url="https://example.com/0")
+        items_data = [
+            make_item_data(
+                f"Item {i}",
+                link_urls=[f"https://example.com/{j}" for j in range(i, i + 5)],
+            )
+            for i in range(20)
+        ]
+
+        # Act
+        with CaptureQueriesContext(connection) as queries:
+            items = ContentItem.objects.save_items([None] * 20, items_data)
+
+        # Assert
+        link_queries = [
+            query for query in queries if '"obapi_externallink"' in query["sql"]
+        ]
+        # One lookup and one insert of links, and one query to internalize links
+        assert len(link_queries) == 3
+        assert ExternalLink.objects.count() == 24
+        assert list(items[0].external_links.order_by("pk")) == [
+            existing,
+            *ExternalLink.objects.filter(
+                url__in=[f"https://example.com/{j}" for j in range(1, 5)]
+            ).order_by("pk"),
+        ]
+
+
+@pytest.mark.django_db
+class TestChangeTracking:
+    def test_new_items_get_increasing_change_sequences(self, make_item_data):
+        # Act
+        first, second = ContentItem.objects.save_items(
+            [None, None], [make_item_data("First"), make_item_data("Second")]
+        )
+        (third,) = ContentItem.objects.save_items([None], [make_item_data("Third")])
+
+        # Assert
+        assert 0 < first.change_sequence < second.change_sequence
+        assert second.change_sequence < third.change_sequence
+        assert list(ContentItem.objects.changed_since(first.change_sequence)) == [
+            second,
+            third,
+        ]
+
+    def test_change_sequence_only_increases_when_content_changes(self, make_item_data):
+        # Arrange
+        download_timestamp = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+        item = ContentItem.objects.save_item(
+            **make_item_data("Title", download_timestamp=download_timestamp)
+        )
+        sequence = item.change_sequence
+
+        # Act
+        ContentItem.objects.save_item(
+            item,
+            **make_item_data(
+                "Title",
+                download_timestamp=download_timestamp + datetime.timedelta(days=1),
+            ),
+        )
+        item.refresh_from_db()
+        unchanged_sequence = item.change_sequence
+        ContentItem.objects.save_item(item, **make_item_data("New Title"))
+        item.refresh_from_db()
+
+        # Assert
+        assert unchanged_sequence == sequence
+        assert item.change_sequence > sequence
+        assert item.title == "New Title"
+
+    def test_process_changes_resumes_from_checkpoint(self, make_item_data):
+        # Arrange
+        items = ContentItem.objects.save_items(
+            [None] * 3, [make_item_data(f"Item {i}") for i in range(3)]
+        )
+        batches = []
+
+        # Act
+        first_processed = ContentItem.objects.process_changes(
+            "test", batches.append, batch_size=2
+        )
+        ContentItem.objects.save_item(items[0], **make_item_data("Changed"))
+        second_processed = ContentItem.objects.process_changes("test", batches.append)
+
+        # Assert
+        assert first_processed == 3
+        assert second_processed == 1
+        assert [len(batch) for batch in batches] == [2, 1, 1]
+        assert batches[-1] == [items[0]]
+        assert Counter.objects.get_value("test") == items[0].change_sequence
+
+
+@pytest.mark.django_db
+class TestInternalizeLinks:
+    def test_moves_matching_links(self, make_item_data):
+        # Arrange
+        post, essay = OBContentItem.objects.save_items(
+            [None],
+            [make_item_data("Post", item_id="2010/01/post", ob_post_number=12345)],
+        ) + EssayContentItem.objects.save_items(
+            [None], [make_item_data("Essay", item_id="Varytax")]
+        )
+        (linking_item,) = ContentItem.objects.save_items(
+            [None],
+            [
+                make_item_data(
+                    "Links",
+                    link_urls=[
+                        "https://www.overcomingbias.com/2010/01/post.html",
+                        "https://www.overcomingbias.com/?p=12345",
+                        "https://mason.gmu.edu/~rhanson/Varytax.html",
+                        "https://mason.gmu.edu/~rhanson/Missing.html",
+                        "https://www.example.com/",
+                    ],
+                )
+            ],
+        )
+
+        # Assert
+        internal_link_pks = set(
+            linking_item.internal_links.values_list("pk", flat=True)
+        )
+        assert internal_link_pks == {post.pk, essay.pk}
+        assert set(linking_item.external_links.values_list("url", flat=True)) == {
+            "https://mason.gmu.edu/~rhanson/Missing.html",
+            "https://www.example.com/",
+        }
+
+    def test_can_internalize_links_of_queryset(
+        self, make_item_data, django_assert_max_num_queries
+    ):
+        # Arrange
+        (linking_item,) = ContentItem.objects.save_items(
+            [None],
+            [
+                make_item_data(
+                    "Links",
+                    link_urls=["https://www.overcomingbias.com/2010/01/post.html"],
+                )
+            ],
+        )
+        (post,) = OBContentItem.objects.save_items(
+            [None],
+            [make_item_data("Post", item_id="2010/01/post", ob_post_number=12345)],
+        )
+        assert not linking_item.internal_links.exists()
+
+        # Act
+        with django_assert_max_num_queries(8):
+            link_count = ContentItem.objects.all().internalize_links()
+
+        # Assert
+        assert link_count == 1
+        assert list(linking_item.internal_links.values_list("pk", flat=True)) == [
+            post.pk
+        ]
+        assert not linking_item.external_links.exists()
+
+
+@pytest.mark.django_db
+class TestLoadConcrete:
+    def test_loads_items_as_concrete_models_in_order(self, make_item_data):
+        # Arrange
+        (essay,) = EssayContentItem.objects.save_items(
+            [None], [make_item_data("Essay", item_id="Varytax")]
+        )
+        (plain,) = ContentItem.objects.save_items([None], [make_item_data("Plain")])
+        (post,) = OBContentItem.objects.save_items(
+            [None],
+            [make_item_data("Post", item_id="2010/01/post", ob_post_number=12345)],
+        )
+        queryset = ContentItem.objects.order_by("-title")
+
+        # Act
+        items = queryset.load_concrete()
+
+        # Assert
+        assert [type(item) for item in items] == [
+            OBContentItem,
+            ContentItem,
+            EssayContentItem,
+        ]
+        assert [item.pk for item in items] == [post.pk, plain.pk, essay.pk]
+        assert [item.item_type for item in items] == [
+            "obapi.obcontentitem",
+            "obapi.contentitem",
+            "obapi.essaycontentitem",
+        ]
+
+    def test_uses_one_query_per_type(self, make_item_data, django_assert_num_queries):
+        # Arrange
+        EssayContentItem.objects.save_items(
+            [None] * 3,
+            [make_item_data(f"Essay {i}", item_id=f"Essay{i}") for i in range(3)],
+        )
+        ContentItem.objects.save_items([None] * 3, [make_item_data("Plain")] * 3)
+
+        # Act & assert
+        with django_assert_num_queries(3):
+            items = ContentItem.objects.load_concrete()
+        assert len(items) == 6
+
+    def test_content_url_uses_concrete_model(self, make_item_data):
+        # Arrange
+        (essay,) = EssayContentItem.objects.save_items(
+            [None], [make_item_data("Essay", item_id="Varytax")]
+        )
+        item = ContentItem.objects.get(pk=essay.pk)
+
+        # Act & assert
+        assert item.content_url == "https://mason.gmu.edu/~rhanson/Varytax.html"
+
+
+@pytest.mark.django_db
+class TestDeferBodies:
+    def test_bodies_are_deferred_by_default(
+        self, make_item_data, django_assert_num_queries
+    ):
+        # Arrange
+        OBContentItem.objects.save_items(
+            [None],
+            [
+                make_item_data(
+                    "Post",
+                    text_html="<p>Body</p>",
+                    text_plain="Body",
+                    item_id="2010/01/post",
+                    ob_post_number=12345,
+                )
+            ],
+        )
+
+        # Act & assert
+        post = OBContentItem.objects.get()
+        assert post.get_deferred_fields() == {"text_html", "text_plain"}
+        post = OBContentItem.objects.with_bodies().get()
+        assert not post.get_deferred_fields()
+        with django_assert_num_queries(0):
+            assert post.text_html == "<p>Body</p>"
+        (post,) = ContentItem.objects.load_concrete(with_bodies=True)
+        assert not post.get_deferred_fields()
+
+    def test_can_update_item_with_deferred_bodies(self, make_item_data):
+        # Arrange
+        (post,) = EssayContentItem.objects.save_items(
+            [None], [make_item_data("Essay", text_plain="Old", item_id="Varytax")]
+        )
+        post = EssayContentItem.objects.get()
+
+        # Act
+        EssayContentItem.objects.save_items(
+            [post], [make_item_data("New Essay", text_plain="New")]
+        )
+
+        # Assert
+        post = EssayContentItem.objects.with_bodies().get()
+        assert post.title == "New Essay"
+        assert post.text_plain == "New"
+
+
+@pytest.mark.django_db
+class TestCompressedText:
+    def test_text_is_stored_compressed(self, make_item_data):
+        # Arrange
+        text_html = "<p>A post body which repeats itself.</p>" * 20
+
+        # Act
+        (post,) = EssayContentItem.objects.save_items(
+            [None], [make_item_data("Essay", text_html=text_html, item_id="Varytax")]
+        )
+
+        # Assert
+        stored = EssayContentItem.objects.values_list("text_html", flat=True).get()
+        assert isinstance(stored, bytes)
+        assert len(stored) < len(text_html)
+        assert EssayContentItem.objects.with_bodies().get().text_html == text_html
+        assert EssayContentItem.objects.get().text_html == text_html
+        assert ContentItem.objects.get().description_html == ""
+
+
+@pytest.mark.django_db
+class TestBulkCreateInherited:
+    def test_creates_rows_for_each_model_in_hierarchy(self, make_item_data):
+        # Arrange
+        items = [
+            OBContentItem(
+                **make_item_data(f"Post {i}"),
+                text_html=f"<p>Post {i}</p>",
+                item_id=f"2010/01/post-{i}",
+                ob_post_number=10000 + i,
+            )
+            for i in range(5)
+        ]
+
+        # Act
+        OBContentItem.objects.bulk_create_inherited(items, batch_size=2)
+
+        # Assert
+        assert all(item.pk is not None for item in items)
+        assert ContentItem.objects.count() == 5
+        assert TextContentItem.objects.count() == 5
+        for i, item in enumerate(items):
+            saved_item = OBContentItem.objects.get(item_id=f"2010/01/post-{i}")
+            assert saved_item.pk == item.pk
+            assert saved_item.title == f"Post {i}"
+            assert saved_item.text_html == f"<p>Post {i}</p>"
+            assert saved_item.create_timestamp is not None
+            assert ContentItem.objects.get_subclass(pk=item.pk) == saved_item
+
+    def test_uses_one_insert_per_table(self, make_item_data, django_assert_num_queries):
+        # Arrange
+        items = [
+            OBContentItem(
+                **make_item_data(f"Post {i}"),
+                item_id=f"2010/01/post-{i}",
+                ob_post_number=10000 + i,
+            )
+            for i in range(20)
+        ]
+
+        # Act & assert
+        with django_assert_num_queries(3):
+            OBContentItem.objects.bulk_create_inherited(items)
+        assert OBContentItem.objects.count() == 20
 
 
 @pytest.mark.django_db
@@ -0,0 +1,99 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from obapi.models import EssayContentItem, Tag, Topic
+
+pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+from obapi.cooccurrence import CooccurrenceMatrix  # noqa: E402
+
+
+def related_names(matrix, obj, measure="count"):
+    return [
+        (related.name, score)
+        for related, score in matrix.related_objects(obj, measure=measure)
+    ]
+
+
+@pytest.mark.django_db
+class TestCooccurrenceMatrix:
+    def test_counts_shared_items(self, make_essaycontentitem):
+        # Arrange
+        Topic.objects.create(name="Law")
+        make_essaycontentitem("first", ["Law", "Norms", "Status"])
+        make_essaycontentitem("second", ["Law", "Norms"])
+        make_essaycontentitem("third", ["Status"])
+
+        # Act
+        matrix = CooccurrenceMatrix.build()
+
+        # Assert
+        law = Topic.objects.get(name="Law")
+        assert related_names(matrix, law) == [("Norms", 2.0), ("Status", 1.0)]
+        norms = Tag.objects.get(name="Norms")
+        jaccard = dict(related_names(matrix, norms, measure="jaccard"))
+        assert jaccard == {"Law": 1.0, "Status": pytest.approx(1 / 3)}
+
+    def test_related_limits_results(self, make_essaycontentitem):
+        # Arrange
+        make_essaycontentitem("first", [f"Tag {i}" for i in range(20)])
+        matrix = CooccurrenceMatrix.build()
+
+        # Act
+        related = matrix.related(Tag.objects.get(name="Tag 0"), k=5, measure="pmi")
+
+        # Assert
+        assert len(related) == 5
+
+    def test_refresh_applies_changes(self, make_essaycontentitem):
+        # Arrange
+        first = make_essaycontentitem("first", ["Law", "Norms"])
+        second = make_essaycontentitem("second", ["Law", "Norms"])
+        matrix = CooccurrenceMatrix.build()
+
+        # Act
+        EssayContentItem.objects.save_items(
+            [first], [{"title": "first", "classifier_names": ["Law", "Status"]}]
+        )
+        second.delete()
+        Tag.objects.filter(name__in=["Law", "Laws"]).merge_objects()
+        updated_count = matrix.refresh()
+
+        # Assert
+        assert updated_count == 2
+        status = Tag.objects.get(name="Status")
+        assert related_names(matrix, status) == [("Law", 1.0)]
+        rebuilt = CooccurrenceMatrix.build()
+        assert related_names(rebuilt, status) == related_names(matrix, status)
+
+    def test_save_and_load(self, make_essaycontentitem, tmp_path):
+        # Arrange
+        make_essaycontentitem("first", ["Law", "Norms"])
+        path = tmp_path / "matrix.npz"
+
+        # Act
+        CooccurrenceMatrix.build().save(path)
+        matrix = CooccurrenceMatrix.load(path)
+
+        # Assert
+        law = Tag.objects.get(name="Law")
+        assert related_names(matrix, law) == [("Norms", 1.0)]
+
+    def test_command_builds_then_refreshes(self, make_essaycontentitem, tmp_path):
+        # Arrange
+        path = tmp_path / "matrix.npz"
+        make_essaycontentitem("first", ["Law", "Norms"])
+        call_command("obapi_cooccurrence", "--path", path, stdout=io.StringIO())
+        make_essaycontentitem("second", ["Law", "Status"])
+
+        # Act
+        stdout = io.StringIO()
+        call_command("obapi_cooccurrence", "--path", path, stdout=stdout)
+
+        # Assert
+        assert "Updated 1 item(s)." in stdout.getvalue()
+        law = Tag.objects.get(name="Law")
+        related = related_names(CooccurrenceMatrix.load(path), law)
+        assert set(related) == {("Norms", 1.0), ("Status", 1.0)}
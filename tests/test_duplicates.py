@@ -0,0 +1,82 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from obapi.models import Tag, Topic
+
+pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+from obapi.cooccurrence import CooccurrenceMatrix  # noqa: E402
+from obapi.duplicates import find_duplicates  # noqa: E402
+
+
+@pytest.mark.django_db
+class TestFindDuplicates:
+    def test_finds_similar_names(self):
+        # Arrange
+        Tag.objects.create(name="Signaling")
+        Tag.objects.create(name="Signalling")
+        Tag.objects.create(name="Medicine")
+        Topic.objects.create(name="Signals")
+
+        # Act
+        candidates = find_duplicates(Tag, threshold=0.6)
+
+        # Assert
+        assert [(c.first_name, c.second_name) for c in candidates] == [
+            ("Signaling", "Signalling")
+        ]
+        assert 0.6 < candidates[0].similarity < 1
+
+    def test_compares_aliases(self):
+        # Arrange
+        Tag.objects.create_with_aliases(name="Futarchy", aliases=["prediction-markets"])
+        Tag.objects.create(name="Prediction Market")
+
+        # Act
+        candidates = find_duplicates(Tag, threshold=0.8)
+
+        # Assert
+        assert [(c.first_name, c.second_name) for c in candidates] == [
+            ("Futarchy", "Prediction Market")
+        ]
+
+    def test_shared_contexts_raise_score(self, make_essaycontentitem):
+        # Arrange
+        make_essaycontentitem("first", ["Law", "Norms", "Crime"])
+        make_essaycontentitem("second", ["Laws", "Norms", "Crime"])
+        make_essaycontentitem("third", ["Lawn", "Gardens"])
+        matrix = CooccurrenceMatrix.build()
+
+        # Act
+        candidates = find_duplicates(Tag, threshold=0.3, cooccurrence=matrix)
+
+        # Assert
+        scores = {frozenset([c.first_name, c.second_name]): c for c in candidates}
+        laws = scores[frozenset(["Law", "Laws"])]
+        lawn = scores[frozenset(["Law", "Lawn"])]
+        assert laws.context_similarity == pytest.approx(1)
+        assert lawn.context_similarity == 0
+        assert laws.score > lawn.score
+
+    def test_command_merges_candidates(self):
+        # Arrange
+        Tag.objects.create(name="Signaling")
+        Tag.objects.create(name="Signalling")
+
+        # Act
+        stdout = io.StringIO()
+        call_command(
+            "obapi_duplicates",
+            "--threshold",
+            "0.6",
+            "--cooccurrence",
+            "missing.npz",
+            "--merge",
+            stdout=stdout,
+        )
+
+        # Assert
+        assert "Merged 1 pair(s)." in stdout.getvalue()
+        assert Tag.objects.count() == 1
@@ -0,0 +1,211 @@
+import datetime
+
+import pytest
+from obapi import jobs
+from obapi.exceptions import IngestFailed, LeaseExpired
+from obapi.models import EssayContentItem, IngestBatch, IngestJob, Job
+from obapi.models.content import EssayContentItemQuerySet
+
+
+@pytest.fixture
+def offline_essays(monkeypatch, assemble_essays):
+    monkeypatch.setattr(EssayContentItemQuerySet, "assemble_by_ids", assemble_essays)
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("offline_essays")
+class TestIngestJob:
+    def test_creates_items_in_batches(self):
+        # Arrange
+        item_ids = ["first", "second", "missing", "third", "fourth"]
+
+        # Act
+        created_count = EssayContentItem.objects.bulk_create_items(
+            item_ids, batch_size=2
+        )
+
+        # Assert
+        assert created_count == 4
+        assert set(EssayContentItem.objects.values_list("item_id", flat=True)) == {
+            "first",
+            "second",
+            "third",
+            "fourth",
+        }
+        job = IngestJob.objects.get()
+        assert job.status == IngestJob.Status.COMPLETED
+        assert job.batches.count() == 3
+        assert job.failed_item_ids == ["missing"]
+
+    def test_resumes_from_failed_batch(self, assemble_essays, monkeypatch):
+        # Arrange
+        def assemble_or_fail(item_ids):
+            if "third" in item_ids:
+                raise ConnectionError("Download failed")
+            return assemble_essays(item_ids)
+
+        monkeypatch.setattr(
+            EssayContentItemQuerySet, "assemble_by_ids", assemble_or_fail
+        )
+        job = IngestJob.objects.plan(
+            EssayContentItem, ["first", "second", "third", "fourth"], batch_size=2
+        )
+        job.run()
+        failed_batch = job.batches.get(status=IngestBatch.Status.FAILED)
+        monkeypatch.setattr(
+            EssayContentItemQuerySet, "assemble_by_ids", assemble_essays
+        )
+
+        # Act
+        completed = job.run()
+
+        # Assert
+        assert "ConnectionError" in failed_batch.error
+        assert completed
+        assert job.status == IngestJob.Status.COMPLETED
+        assert job.created_count == 4
+        assert EssayContentItem.objects.count() == 4
+        # Only the failed batch was run again
+        assert sorted(job.batches.values_list("attempts", flat=True)) == [1, 2]
+
+    def test_failed_batches_are_raised(self, monkeypatch):
+        # Arrange
+        def fail(item_ids):
+            raise ConnectionError("Download failed")
+
+        monkeypatch.setattr(EssayContentItemQuerySet, "assemble_by_ids", fail)
+
+        # Act
+        with pytest.raises(IngestFailed, match="ConnectionError"):
+            EssayContentItem.objects.bulk_create_items(["a", "b"], batch_size=1)
+
+        # Assert
+        job = IngestJob.objects.get()
+        assert job.status == IngestJob.Status.FAILED
+        assert not EssayContentItem.objects.exists()
+
+    def test_other_errors_stop_the_job(self, monkeypatch):
+        # Arrange
+        def fail(item_ids):
+            raise TypeError("Bug")
+
+        monkeypatch.setattr(EssayContentItemQuerySet, "assemble_by_ids", fail)
+        job = IngestJob.objects.plan(EssayContentItem, ["a", "b"], batch_size=1)
+
+        # Act
+        with pytest.raises(TypeError):
+            job.run()
+
+        # Assert
+        assert job.status == IngestJob.Status.FAILED
+        assert list(job.batches.values_list("status", flat=True)) == [
+            IngestBatch.Status.FAILED,
+            IngestBatch.Status.PENDING,
+        ]
+
+    def test_resumes_jobs_in_background(self):
+        # Arrange
+        ingest_job = IngestJob.objects.plan(EssayContentItem, ["a", "b"], 1)
+        job = jobs.enqueue("obapi.resume_ingest_jobs", pks=[ingest_job.pk])
+
+        # Act
+        jobs.work(burst=True)
+
+        # Assert
+        job.refresh_from_db()
+        assert job.status == Job.Status.SUCCEEDED
+        assert job.result == {"completed_count": 1}
+        assert job.progress == 1
+        assert EssayContentItem.objects.count() == 2
+
+    def test_background_resume_fails_with_failed_batches(self, monkeypatch):
+        # Arrange
+        def fail(item_ids):
+            raise ConnectionError("Download failed")
+
+        monkeypatch.setattr(EssayContentItemQuerySet, "assemble_by_ids", fail)
+        ingest_job = IngestJob.objects.plan(EssayContentItem, ["a", "b"], 1)
+        job = jobs.enqueue("obapi.resume_ingest_jobs", pks=[ingest_job.pk])
+
+        # Act
+        jobs.work(burst=True)
+
+        # Assert
+        job.refresh_from_db()
+        assert job.status == Job.Status.FAILED
+        assert "IngestFailed" in job.error
+
+    def test_skips_existing_items(self):
+        # Arrange
+        EssayContentItem.objects.create_item("first")
+        job = IngestJob.objects.plan(EssayContentItem, ["first", "second"], 10)
+
+        # Act
+        job.run()
+
+        # Assert
+        assert job.created_count == 1
+        assert EssayContentItem.objects.count() == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("offline_essays")
+class TestIngestLeases:
+    def test_workers_claim_different_batches(self):
+        # Arrange
+        IngestJob.objects.plan(EssayContentItem, ["a", "b", "c"], batch_size=1)
+
+        # Act
+        claims = [IngestBatch.objects.claim(worker) for worker in ("w1", "w2", "w3")]
+
+        # Assert
+        assert len({batch.pk for batch in claims}) == 3
+        assert [batch.leased_by for batch in claims] == ["w1", "w2", "w3"]
+        assert IngestBatch.objects.claim("w4") is None
+
+    def test_expired_leases_can_be_reclaimed(self, assemble_essays):
+        # Arrange
+        job = IngestJob.objects.plan(EssayContentItem, ["a"], batch_size=1)
+        batch = IngestBatch.objects.claim(
+            "dead worker", lease_duration=datetime.timedelta(seconds=-1)
+        )
+
+        # Act
+        completed = job.run(worker="w2")
+
+        # Assert
+        assert completed
+        assert job.batches.get().attempts == 2
+        with pytest.raises(LeaseExpired):
+            batch.save_items(EssayContentItem, ["a"], assemble_essays(["a"]))
+        assert EssayContentItem.objects.count() == 1
+
+    def test_concurrent_plans_do_not_overlap(self):
+        # Arrange
+        IngestJob.objects.plan(EssayContentItem, ["a", "b"], batch_size=1)
+
+        # Act
+        second_job = IngestJob.objects.plan(EssayContentItem, ["b", "c"], batch_size=1)
+
+        # Assert
+        assert second_job.item_count == 1
+        assert list(second_job.batches.values_list("item_ids", flat=True)) == [["c"]]
+
+    def test_failed_items_are_planned_again(self, assemble_essays, monkeypatch):
+        # Arrange
+        def fail(item_ids):
+            raise ConnectionError("Download failed")
+
+        monkeypatch.setattr(EssayContentItemQuerySet, "assemble_by_ids", fail)
+        with pytest.raises(IngestFailed):
+            EssayContentItem.objects.bulk_create_items(["a", "b"])
+        monkeypatch.setattr(
+            EssayContentItemQuerySet, "assemble_by_ids", assemble_essays
+        )
+
+        # Act
+        created_count = EssayContentItem.objects.bulk_create_items(["a", "b", "c"])
+
+        # Assert
+        assert created_count == 3
+        assert EssayContentItem.objects.count() == 3
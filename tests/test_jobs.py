@@ -0,0 +1,128 @@
+import datetime
+
+import pytest
+from obapi import jobs
+from obapi.models import EssayContentItem, Job
+from obapi.models.content import EssayContentItemQuerySet
+
+
+@pytest.fixture
+def test_tasks(monkeypatch):
+    def add(job, a, b):
+        job.set_progress(1, 1)
+        return a + b
+
+    def fail(job):
+        raise RuntimeError("Task failed")
+
+    monkeypatch.setitem(jobs.TASKS, "test.add", add)
+    monkeypatch.setitem(jobs.TASKS, "test.fail", fail)
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("test_tasks")
+class TestJobs:
+    def test_runs_queued_jobs(self):
+        # Arrange
+        job = jobs.enqueue("test.add", a=1, b=2)
+
+        # Act
+        job_count = jobs.work(worker="test", burst=True)
+
+        # Assert
+        job.refresh_from_db()
+        assert job_count == 1
+        assert job.status == Job.Status.SUCCEEDED
+        assert job.result == 3
+        assert job.progress == 1
+        assert job.worker == "test"
+        assert job.finish_timestamp >= job.start_timestamp
+
+    def test_records_errors(self):
+        # Arrange
+        job = jobs.enqueue("test.fail")
+
+        # Act
+        jobs.work(burst=True)
+
+        # Assert
+        job.refresh_from_db()
+        assert job.status == Job.Status.FAILED
+        assert "RuntimeError: Task failed" in job.error
+
+    def test_jobs_are_claimed_once_in_order(self):
+        # Arrange
+        first = jobs.enqueue("test.add", a=1, b=1)
+        second = jobs.enqueue("test.add", a=2, b=2)
+
+        # Act
+        claimed = [Job.objects.claim("test") for _ in range(3)]
+
+        # Assert
+        assert claimed == [first, second, None]
+        assert set(Job.objects.values_list("status", flat=True)) == {"running"}
+
+    def test_rejects_unknown_tasks(self):
+        with pytest.raises(ValueError):
+            jobs.enqueue("test.unknown")
+
+    def test_reclaims_jobs_with_expired_leases(self):
+        # Arrange
+        job = jobs.enqueue("test.add", a=1, b=2)
+        dead_job = Job.objects.claim(
+            "dead worker", lease_duration=-datetime.timedelta(seconds=1)
+        )
+
+        # Act
+        job_count = jobs.work(worker="test", burst=True)
+
+        # Assert
+        job.refresh_from_db()
+        assert job_count == 1
+        assert job.status == Job.Status.SUCCEEDED
+        assert job.worker == "test"
+        assert job.lease_expires is None
+        # The dead worker can no longer record a result
+        assert not dead_job.finish(result=0)
+        job.refresh_from_db()
+        assert job.result == 3
+
+    def test_running_jobs_are_not_reclaimed(self):
+        # Arrange
+        jobs.enqueue("test.add", a=1, b=2)
+        Job.objects.claim("test")
+
+        # Act
+        claimed = Job.objects.claim("other")
+
+        # Assert
+        assert claimed is None
+
+
+@pytest.mark.django_db
+class TestContentTasks:
+    def test_update_items_reports_progress(
+        self, monkeypatch, assemble_essays, make_essaycontentitem
+    ):
+        # Arrange
+        monkeypatch.setattr(
+            EssayContentItemQuerySet, "assemble_by_ids", assemble_essays
+        )
+        items = [make_essaycontentitem(f"essay{i}", []) for i in range(3)]
+        job = jobs.enqueue(
+            "obapi.update_items",
+            model="obapi.essaycontentitem",
+            pks=[item.pk for item in items],
+        )
+
+        # Act
+        jobs.work(burst=True)
+
+        # Assert
+        job.refresh_from_db()
+        assert job.status == Job.Status.SUCCEEDED
+        assert job.result == {"updated_count": 3}
+        assert job.progress == 1
+        assert set(EssayContentItem.objects.values_list("title", flat=True)) == {
+            f"Assembled essay{i}" for i in range(3)
+        }
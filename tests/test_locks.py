@@ -0,0 +1,207 @@
+import datetime
+
+import pytest
+from obapi import locks, utils
+from obapi.exceptions import LeaseExpired, OperationInProgress
+from obapi.models import OperationLock
+
+HOUR = datetime.timedelta(hours=1)
+
+
+def hold_lock(name, holder="other host:1", duration=HOUR, arguments=""):
+    acquired, lock = OperationLock.objects.acquire(
+        name, holder, duration, arguments=arguments
+    )
+    assert acquired
+    return lock
+
+
+@pytest.mark.django_db
+class TestExclusiveOperation:
+    def test_runs_operation_and_stores_result(self):
+        # Arrange
+        @locks.exclusive_operation("test")
+        def operation(x):
+            return x * 2
+
+        # Act
+        result = operation(2)
+
+        # Assert
+        lock = OperationLock.objects.get(name="test")
+        assert result == 4
+        assert lock.result == 4
+        assert not lock.is_held
+        assert lock.generation == 1
+
+    def test_joins_running_operation(self, monkeypatch):
+        # Arrange
+        calls = []
+
+        @locks.exclusive_operation("test", load_result=lambda x, data: data + 1)
+        def operation(x):
+            calls.append(x)
+            return x
+
+        lock = hold_lock("test")
+        # Finish the other run while waiting
+        monkeypatch.setattr(
+            locks.time,
+            "sleep",
+            lambda seconds: OperationLock.objects.release(lock, result=10),
+        )
+
+        # Act
+        result = operation(1)
+
+        # Assert
+        assert result == 11
+        assert calls == []
+
+    def test_reruns_operation_if_running_operation_fails(self, monkeypatch):
+        # Arrange
+        @locks.exclusive_operation("test")
+        def operation():
+            return "done"
+
+        lock = hold_lock("test")
+        monkeypatch.setattr(
+            locks.time,
+            "sleep",
+            lambda seconds: OperationLock.objects.release(lock, error="Traceback"),
+        )
+
+        # Act
+        result = operation()
+
+        # Assert
+        assert result == "done"
+        assert OperationLock.objects.get(name="test").generation == 2
+
+    def test_raises_error_if_not_waiting(self):
+        # Arrange
+        @locks.exclusive_operation("test", wait=False)
+        def operation():
+            return "done"
+
+        hold_lock("test")
+
+        # Act, Assert
+        with pytest.raises(OperationInProgress):
+            operation()
+
+    def test_joins_running_operation_with_same_arguments(self, monkeypatch):
+        # Arrange
+        @locks.exclusive_operation("test", arguments=lambda x: {"x": x})
+        def operation(x):
+            return x
+
+        lock = hold_lock("test", arguments=utils.fingerprint({"x": 1}))
+        monkeypatch.setattr(
+            locks.time,
+            "sleep",
+            lambda seconds: OperationLock.objects.release(lock, result=10),
+        )
+
+        # Act
+        result = operation(1)
+
+        # Assert
+        assert result == 10
+
+    def test_raises_error_if_running_with_different_arguments(self):
+        # Arrange
+        @locks.exclusive_operation("test", arguments=lambda x: {"x": x})
+        def operation(x):
+            return x
+
+        hold_lock("test", arguments=utils.fingerprint({"x": 1}))
+
+        # Act, Assert
+        with pytest.raises(OperationInProgress, match="different arguments"):
+            operation(2)
+
+    def test_takes_over_expired_lock(self):
+        # Arrange
+        @locks.exclusive_operation("test", wait=False)
+        def operation():
+            return "done"
+
+        hold_lock("test", duration=-HOUR)
+
+        # Act
+        result = operation()
+
+        # Assert
+        assert result == "done"
+
+    def test_progress_renews_lease(self):
+        # Arrange
+        reports = []
+        renewed_locks = []
+
+        @locks.exclusive_operation("test", duration=HOUR, heartbeat="progress")
+        def operation(progress=None):
+            lock = OperationLock.objects.get(name="test")
+            OperationLock.objects.filter(pk=lock.pk).update(expires=lock.expires - HOUR)
+            progress(1, 2)
+            renewed_locks.append(OperationLock.objects.get(name="test"))
+
+        # Act
+        operation(progress=lambda done, total: reports.append((done, total)))
+
+        # Assert
+        (lock,) = renewed_locks
+        assert lock.is_held
+        assert (lock.progress_done, lock.progress_total) == (1, 2)
+        assert reports == [(1, 2)]
+
+    def test_progress_raises_error_if_lock_was_taken_over(self):
+        # Arrange
+        @locks.exclusive_operation("test", duration=-HOUR, heartbeat="progress")
+        def operation(progress=None):
+            hold_lock("test")
+            progress(1, 2)
+
+        # Act, Assert
+        with pytest.raises(LeaseExpired):
+            operation()
+
+    def test_waiting_callers_receive_progress(self, monkeypatch):
+        # Arrange
+        reports = []
+
+        @locks.exclusive_operation("test", heartbeat="progress")
+        def operation(progress=None):
+            return "done"
+
+        lock = hold_lock("test")
+        steps = iter(
+            [
+                lambda: OperationLock.objects.renew(lock, HOUR, 1, 2),
+                lambda: OperationLock.objects.release(lock, result="done"),
+            ]
+        )
+        monkeypatch.setattr(locks.time, "sleep", lambda seconds: next(steps)())
+
+        # Act
+        result = operation(progress=lambda done, total: reports.append((done, total)))
+
+        # Assert
+        assert result == "done"
+        assert reports == [(1, 2)]
+
+    def test_releases_lock_on_error(self):
+        # Arrange
+        @locks.exclusive_operation("test")
+        def operation():
+            raise ValueError("Failed")
+
+        # Act
+        with pytest.raises(ValueError):
+            operation()
+
+        # Assert
+        lock = OperationLock.objects.get(name="test")
+        assert not lock.is_held
+        assert "ValueError: Failed" in lock.error
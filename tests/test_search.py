@@ -0,0 +1,104 @@
+import datetime
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from obapi.models import ContentItem, EssayContentItem, OBContentItem
+
+
+def create_essay(item_id, title, text_plain):
+    return EssayContentItem.objects.save_item(
+        title=title,
+        publish_date=datetime.datetime(2010, 1, 1, tzinfo=datetime.timezone.utc),
+        item_id=item_id,
+        text_plain=text_plain,
+    )
+
+
+@pytest.mark.django_db
+class TestSearch:
+    def test_returns_ranked_results_with_snippets(self):
+        # Arrange
+        markets = create_essay(
+            "Markets",
+            "Prediction Markets",
+            "Prediction markets aggregate information about the future.",
+        )
+        medicine = create_essay(
+            "Medicine",
+            "Medicine",
+            "Much medicine is wasted. Markets could help allocate it.",
+        )
+        create_essay("Signals", "Signaling", "People signal their loyalty.")
+
+        # Act
+        results = ContentItem.objects.search("markets")
+
+        # Assert
+        assert [item.pk for item in results] == [markets.pk, medicine.pk]
+        assert results[0].search_rank > results[1].search_rank
+        assert "<b>" in results[1].search_snippet
+
+    def test_search_is_restricted_to_queryset(self):
+        # Arrange
+        create_essay("Markets", "Markets", "Prediction markets.")
+        plain = ContentItem.objects.save_item(
+            title="Markets Video",
+            description_html="<p>A talk on prediction markets.</p>",
+            publish_date=datetime.datetime(2010, 1, 1, tzinfo=datetime.timezone.utc),
+        )
+
+        # Act & assert
+        assert len(ContentItem.objects.search("prediction")) == 2
+        results = ContentItem.objects.filter(item_type="obapi.contentitem").search(
+            "prediction"
+        )
+        assert [item.pk for item in results] == [plain.pk]
+        assert OBContentItem.objects.search("prediction") == []
+
+    def test_index_is_updated(self):
+        # Arrange
+        essay = create_essay("Markets", "Markets", "Prediction markets.")
+
+        # Act
+        EssayContentItem.objects.save_item(item=essay, text_plain="Signaling.")
+
+        # Assert
+        assert ContentItem.objects.search("prediction") == []
+        assert len(ContentItem.objects.search("signaling")) == 1
+
+        # Act
+        essay.delete()
+
+        # Assert
+        assert ContentItem.objects.search("signaling") == []
+
+    def test_unchanged_items_are_not_reindexed(self):
+        # Arrange
+        essay = create_essay("Markets", "Markets", "Prediction markets.")
+
+        # Act
+        with CaptureQueriesContext(connection) as queries:
+            EssayContentItem.objects.save_items(
+                [essay],
+                [
+                    {
+                        "title": "Markets",
+                        "publish_date": essay.publish_date,
+                        "item_id": "Markets",
+                        "text_plain": "Prediction markets.",
+                    }
+                ],
+            )
+
+        # Assert
+        assert not [
+            query
+            for query in queries.captured_queries
+            if "obapi_contentitem_search" in query["sql"]
+        ]
+
+    @pytest.mark.parametrize("query", ['"unbalanced', "AND OR", "col:umn", ""])
+    def test_handles_query_syntax(self, query):
+        create_essay("Markets", "Markets", "Prediction markets.")
+        assert ContentItem.objects.search(query) == []
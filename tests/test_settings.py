@@ -13,6 +13,8 @@ INSTALLED_APPS = [
     "obapi",
 ]
 
+ROOT_URLCONF = "obapi.urls"
+
 # Secrets
 SECRET_KEY = os.getenv("DJANGO_SECRET_KEY", "fake-key")
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
@@ -1,5 +1,11 @@
 import pytest
-from obapi.utils import parse_duration, plaintext_to_html
+from obapi.utils import (
+    compress_text,
+    decompress_text,
+    parse_duration,
+    plaintext_to_html,
+    train_compression_dictionary,
+)
 
 
 class TestParseDuration:
@@ -34,3 +40,55 @@ class TestPlaintextToHTML:
         html_text = plaintext_to_html(text)
         assert html_text.startswith("<pre>")
         assert html_text.endswith("</pre>")
+
+
+class TestCompressText:
+    def test_round_trips_text(self):
+        text = "<p>Some repeated text, some repeated text. Ünïcode too.</p>" * 10
+        compressed = compress_text(text)
+        assert len(compressed) < len(text.encode())
+        assert decompress_text(compressed) == text
+
+    def test_round_trips_text_with_dictionary(self):
+        # Arrange
+        samples = [
+            "<p>Robin Hanson on prediction markets and signaling.</p>",
+            "<p>Robin Hanson on prediction markets and the future.</p>",
+        ]
+        dictionary = train_compression_dictionary(samples)
+        text = "<p>Robin Hanson on prediction markets and medicine.</p>"
+
+        # Act
+        compressed = compress_text(text, dictionary)
+
+        # Assert
+        assert len(compressed) < len(compress_text(text))
+        assert decompress_text(compressed, [dictionary]) == text
+        with pytest.raises(ValueError):
+            decompress_text(compressed)
+        with pytest.raises(ValueError, match="unknown dictionary"):
+            decompress_text(compressed, [b"the wrong dictionary"])
+
+    def test_picks_dictionary_by_id(self):
+        # Arrange
+        old_dictionary = train_compression_dictionary(
+            ["<p>Prediction markets.</p>"] * 2
+        )
+        new_dictionary = train_compression_dictionary(
+            ["<p>Signaling and status.</p>"] * 2
+        )
+        old_text = "<p>Prediction markets again.</p>"
+        new_text = "<p>Signaling and status again.</p>"
+
+        # Act
+        old_compressed = compress_text(old_text, old_dictionary)
+        new_compressed = compress_text(new_text, new_dictionary)
+
+        # Assert
+        dictionaries = [new_dictionary, old_dictionary]
+        assert decompress_text(old_compressed, dictionaries) == old_text
+        assert decompress_text(new_compressed, dictionaries) == new_text
+
+    def test_raises_error_for_unknown_format(self):
+        with pytest.raises(ValueError):
+            decompress_text(b"uncompressed text")